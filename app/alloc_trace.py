@@ -0,0 +1,165 @@
+"""
+Allocation Tracing
+tracemalloc snapshots and top-N allocation diffs for leak hunting
+
+The memory-leak chaos and a real leak look the same from outside: RSS
+grows. An AllocationTracer session starts tracemalloc, takes a baseline
+snapshot, and on each further snapshot returns the allocations that grew
+the most since the baseline (or since the previous snapshot), grouped by
+line, by file or by traceback.
+
+Overhead is bounded: tracemalloc stores `frames` frames per live allocation
+(1 by default, at most `max_frames`), which costs CPU on every allocation
+and memory for the traces while it runs, so every session stops itself
+after `seconds` (at most `max_seconds`). Only snapshots taken by the
+session are kept: the baseline and the latest one. If tracemalloc was
+already running (PYTHONTRACEMALLOC), it is left running on stop.
+"""
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Optional
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+# Allocations made by the tracing machinery itself are left out of diffs
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class TracingError(Exception):
+    """A session operation that does not fit the current state"""
+
+
+class AllocationTracer:
+    """One tracemalloc session at a time, stopped automatically at its deadline"""
+
+    def __init__(self, max_seconds: float = 600.0, max_frames: int = 25, clock=time.monotonic):
+        self.max_seconds = max_seconds
+        self.max_frames = max_frames
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._owns_tracing = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self.frames = 0
+        self.started_at: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.snapshots = 0
+        self.stop_reason: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._baseline is not None
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+    def start(self, seconds: float, frames: int = 1) -> Dict[str, Any]:
+        """Start tracing and take the baseline snapshot"""
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be between 0 and {self.max_seconds}")
+        if not 1 <= frames <= self.max_frames:
+            raise ValueError(f"frames must be between 1 and {self.max_frames}")
+        with self._lock:
+            if self.running:
+                raise TracingError("Allocation tracing is already running")
+            self._owns_tracing = not tracemalloc.is_tracing()
+            if self._owns_tracing:
+                tracemalloc.start(frames)
+            self.frames = tracemalloc.get_traceback_limit()
+            self._baseline = self._previous = self._take()
+            self.started_at = self.clock()
+            self.deadline = self.started_at + seconds
+            self.snapshots = 0
+            self.stop_reason = None
+            self._timer = threading.Timer(seconds, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self.status()
+
+    def _expire(self):
+        with self._lock:
+            if self.running:
+                self._stop_locked("deadline")
+
+    def stop(self, reason: str = "stopped") -> Dict[str, Any]:
+        with self._lock:
+            if not self.running:
+                raise TracingError("Allocation tracing is not running")
+            self._stop_locked(reason)
+        return self.status()
+
+    def _stop_locked(self, reason: str):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._owns_tracing:
+            tracemalloc.stop()
+        self._owns_tracing = False
+        self._baseline = self._previous = None
+        self.deadline = None
+        self.stop_reason = reason
+
+    def snapshot(self, top: int = 20, group_by: str = "lineno", since: str = "start") -> Dict[str, Any]:
+        """
+        Take a snapshot and diff it against the baseline (since="start") or
+        the previous snapshot (since="previous"); the `top` groups that grew
+        the most come first
+        """
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        if since not in ("start", "previous"):
+            raise ValueError("since must be start or previous")
+        with self._lock:
+            if not self.running:
+                raise TracingError("Allocation tracing is not running")
+            current = self._take()
+            reference = self._baseline if since == "start" else self._previous
+            self._previous = current
+            self.snapshots += 1
+            elapsed = self.clock() - self.started_at
+        stats = current.compare_to(reference, group_by)
+        return {
+            "group_by": group_by,
+            "since": since,
+            "elapsed_seconds": round(elapsed, 3),
+            "total_size_diff": sum(stat.size_diff for stat in stats),
+            "total_size": sum(stat.size for stat in stats),
+            "top": [self._render(stat, group_by) for stat in stats[:top]],
+        }
+
+    @staticmethod
+    def _render(stat: tracemalloc.StatisticDiff, group_by: str) -> Dict[str, Any]:
+        # Frames run from the oldest call to the allocation site
+        frame = stat.traceback[-1]
+        rendered: Dict[str, Any] = {
+            "file": frame.filename,
+            "line": frame.lineno if group_by != "filename" else None,
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+            "size": stat.size,
+            "count": stat.count,
+        }
+        if group_by == "traceback":
+            # Most recent call first
+            rendered["traceback"] = [f"{f.filename}:{f.lineno}" for f in reversed(stat.traceback)]
+        return rendered
+
+    def status(self) -> Dict[str, Any]:
+        running = self.running
+        return {
+            "running": running,
+            "frames": self.frames if running else None,
+            "remaining_seconds": round(max(0.0, self.deadline - self.clock()), 3) if running else None,
+            "snapshots": self.snapshots,
+            # Memory tracemalloc itself uses for the traces
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory() if running else 0,
+            "stopped": self.stop_reason,
+        }
@@ -0,0 +1,88 @@
+"""
+Compression Level Benchmark
+CPU time versus bytes saved for each encoding and level
+
+The payloads are the real /metrics exposition and OpenAPI schema of the
+application. Use the table to pick COMPRESSION_*_LEVEL for dynamic
+responses; static payloads are always compressed at the highest level.
+
+Usage (from the app directory):
+    python -m benchmarks.compression --repeat 20 --output compression-results.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from compression import ENCODERS, compress
+
+LEVELS = {
+    "gzip": [1, 4, 6, 9],
+    "br": [1, 4, 6, 9, 11],
+    "zstd": [1, 3, 6, 12, 19],
+}
+
+
+def sample_payloads() -> Dict[str, bytes]:
+    """The application's metrics page and OpenAPI schema"""
+    from prometheus_client import generate_latest
+    from main import app
+    return {
+        "metrics": generate_latest(),
+        "openapi": json.dumps(app.openapi()).encode("utf-8"),
+    }
+
+
+def measure(payload: bytes, encoding: str, level: int, repeat: int) -> Dict[str, Any]:
+    """Compress a payload `repeat` times and report ratio and speed"""
+    size = len(compress(payload, encoding, level))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compress(payload, encoding, level)
+    seconds = (time.perf_counter() - start) / repeat
+    return {
+        "encoding": encoding,
+        "level": level,
+        "original_bytes": len(payload),
+        "compressed_bytes": size,
+        "ratio": len(payload) / size,
+        "ms_per_payload": seconds * 1000,
+        "mb_per_second": len(payload) / seconds / 1e6,
+    }
+
+
+def run(payloads: Dict[str, bytes], repeat: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+    """Measure every available encoding and level for every payload"""
+    return {
+        name: [
+            measure(payload, encoding, level, repeat)
+            for encoding in ENCODERS
+            for level in LEVELS[encoding]
+        ]
+        for name, payload in payloads.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark compression levels")
+    parser.add_argument("--repeat", type=int, default=20, help="Compressions per measurement")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(sample_payloads(), args.repeat)
+    for name, rows in results.items():
+        print(f"{name} ({rows[0]['original_bytes']} bytes)")
+        print(f"  {'encoding':<8} {'level':>5} {'bytes':>8} {'ratio':>7} {'ms':>8} {'MB/s':>8}")
+        for r in rows:
+            print(f"  {r['encoding']:<8} {r['level']:>5} {r['compressed_bytes']:>8} "
+                  f"{r['ratio']:>7.2f} {r['ms_per_payload']:>8.3f} {r['mb_per_second']:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
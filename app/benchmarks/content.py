@@ -0,0 +1,128 @@
+"""
+Content Type Benchmark
+Encode and decode cost and payload size of JSON, MessagePack and CBOR
+
+The payloads are the application's own response and report shapes:
+HelloResponse, HealthResponse, a healing report as posted by the n8n
+workflow, and the /admin/healing-reports listing with ten reports. JSON is
+encoded the way the API renders it (compact separators, UTF-8).
+
+Usage (from the app directory):
+    python -m benchmarks.content --repeat 20000 --output content-results.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from content import CODECS
+from models import HealthResponse, HelloResponse
+
+
+def _json_dumps(content: Any) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+FORMATS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+    "application/json": (_json_dumps, json.loads),
+    **CODECS,
+}
+
+
+def sample_report(index: int = 0) -> Dict[str, Any]:
+    """A healing report shaped like the ones the n8n workflow posts"""
+    return {
+        "workflow_id": f"wf-{index:06d}",
+        "timestamp": "2026-01-01T00:00:00.000Z",
+        "original_alert": {
+            "chaos_type": "memory_leak",
+            "severity": "warning",
+            "summary": f"Memory usage above 800MB on microservice-demo-7d9f{index:04d}",
+        },
+        "healing_performed": {
+            "actions_taken": ["Stopped memory leak", "Triggered garbage collection"],
+            "healing_endpoint_called": True,
+            "immediate_heal_executed": True,
+        },
+        "validation_results": {
+            "tests_total": 2,
+            "tests_passed": 2,
+            "tests_failed": 0,
+            "success_rate": "100%",
+            "detailed_results": [
+                {"endpoint": "/healthz", "status": "passed"},
+                {"endpoint": "/ready", "status": "passed"},
+            ],
+        },
+        "overall_status": "success",
+        "stored_at": "2026-01-01T00:00:00",
+    }
+
+
+def sample_payloads() -> Dict[str, Any]:
+    """JSON-compatible content of the negotiated responses and request bodies"""
+    return {
+        "hello": HelloResponse(message="Hello, World!", timestamp=1700000000.123, version="1.0.0").model_dump(),
+        "health": HealthResponse(status="ready", timestamp=1700000000.123, version="1.0.0", uptime=3600.5).model_dump(),
+        "healing_report": sample_report(),
+        "healing_reports": {
+            "total_reports": 100,
+            "reports": [sample_report(i) for i in range(10)],
+            "summary": {"successful_healings": 90, "partial_healings": 7, "failed_healings": 3},
+        },
+    }
+
+
+def measure(content: Any, media_type: str, repeat: int) -> Dict[str, Any]:
+    """Encode and decode a payload `repeat` times in one format"""
+    encode, decode = FORMATS[media_type]
+    data = encode(content)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(content)
+    encode_seconds = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode(data)
+    decode_seconds = (time.perf_counter() - start) / repeat
+    return {
+        "media_type": media_type,
+        "bytes": len(data),
+        "encode_us": encode_seconds * 1e6,
+        "decode_us": decode_seconds * 1e6,
+    }
+
+
+def run(payloads: Dict[str, Any], repeat: int = 20000) -> Dict[str, List[Dict[str, Any]]]:
+    """Measure every available format for every payload"""
+    return {
+        name: [measure(content, media_type, repeat) for media_type in FORMATS]
+        for name, content in payloads.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark response content types")
+    parser.add_argument("--repeat", type=int, default=20000, help="Encodings per measurement")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(sample_payloads(), args.repeat)
+    for name, rows in results.items():
+        json_row = rows[0]
+        print(name)
+        print(f"  {'format':<20} {'bytes':>6} {'size':>6} {'enc us':>8} {'dec us':>8}")
+        for r in rows:
+            print(f"  {r['media_type']:<20} {r['bytes']:>6} {r['bytes'] / json_row['bytes']:>6.2f} "
+                  f"{r['encode_us']:>8.2f} {r['decode_us']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Healing Report Ingest Benchmark
+Reports per second through POST /admin/healing-report and the batch endpoint
+
+Requests go through the full middleware stack of the application in
+process (no sockets), so the numbers include body size limiting, parsing
+and validation of the typed report, and storage. Batches of several sizes
+are compared with one request per report; the report storage is restored
+afterwards.
+
+Usage (from the app directory):
+    python -m benchmarks.ingest --reports 2000 --output ingest-results.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.content import sample_report
+from warmup import asgi_response
+
+BATCH_SIZES = [1, 10, 100, 500]
+HEADERS = {"content-type": "application/json"}
+
+
+async def measure(app, reports: List[Dict[str, Any]], batch_size: int) -> Dict[str, Any]:
+    """Ingest `reports` in batches of `batch_size` (1 = the single endpoint)"""
+    if batch_size == 1:
+        bodies = [("/admin/healing-report", json.dumps(r).encode("utf-8")) for r in reports]
+    else:
+        bodies = [
+            ("/admin/healing-reports:batch",
+             json.dumps({"reports": reports[i:i + batch_size]}).encode("utf-8"))
+            for i in range(0, len(reports), batch_size)
+        ]
+    failed = 0
+    start = time.perf_counter()
+    for path, body in bodies:
+        status, _, _ = await asgi_response(app, "POST", path, headers=HEADERS, body=body)
+        failed += status != 200
+    seconds = time.perf_counter() - start
+    return {
+        "batch_size": batch_size,
+        "requests": len(bodies),
+        "reports": len(reports),
+        "failed": failed,
+        "request_bytes": sum(len(body) for _, body in bodies),
+        "reports_per_second": len(reports) / seconds,
+        "us_per_report": seconds / len(reports) * 1e6,
+    }
+
+
+async def run(app, storage: List[Dict[str, Any]], count: int = 2000,
+              batch_sizes: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Measure every batch size with the same `count` reports, then restore `storage`"""
+    reports = [sample_report(i) for i in range(count)]
+    saved = list(storage)
+    try:
+        return [await measure(app, reports, size) for size in batch_sizes or BATCH_SIZES]
+    finally:
+        storage[:] = saved
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark healing report ingestion")
+    parser.add_argument("--reports", type=int, default=2000, help="Reports ingested per batch size")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    from main import app, healing_reports_storage
+    results = asyncio.run(run(app, healing_reports_storage, args.reports))
+    print(f"{'batch':>6} {'requests':>9} {'failed':>7} {'reports/s':>10} {'us/report':>10}")
+    for r in results:
+        print(f"{r['batch_size']:>6} {r['requests']:>9} {r['failed']:>7} "
+              f"{r['reports_per_second']:>10.0f} {r['us_per_report']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
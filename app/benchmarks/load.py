@@ -0,0 +1,108 @@
+"""
+Saturation Load Test
+Closed-loop concurrency sweep that reports goodput past saturation
+
+Each level runs `concurrency` clients against the in-process app for a
+fixed duration. Goodput counts successful responses that met the latency
+SLO; shed requests (503 from the concurrency limiter) wait `--backoff-ms`
+before retrying, which defaults to the 1s Retry-After hint.
+
+Usage (from the app directory):
+    python -m benchmarks.load --levels 1,8,32,128,512 --duration 3 --slo-ms 100
+    python -m benchmarks.load --no-limiter        # same sweep with shedding disabled
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from warmup import asgi_request
+from benchmarks.suite import percentile
+
+
+async def run_level(app, concurrency: int, duration: float, slo: float,
+                    path: str = "/api/v1/hello", query: str = "name=load",
+                    backoff: float = 1.0) -> Dict[str, Any]:
+    """Run one closed-loop load level and return goodput statistics"""
+    counts = {"ok": 0, "good": 0, "shed": 0, "errors": 0}
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await asgi_request(app, "GET", path, query)
+            latency = time.perf_counter() - start
+            if status == 200:
+                counts["ok"] += 1
+                latencies.append(latency)
+                if latency <= slo:
+                    counts["good"] += 1
+            elif status == 503:
+                counts["shed"] += 1
+                await asyncio.sleep(backoff)
+            else:
+                counts["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "throughput": counts["ok"] / elapsed,
+        "goodput": counts["good"] / elapsed,
+        "shed_per_second": counts["shed"] / elapsed,
+        "errors": counts["errors"],
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def run_sweep(levels: List[int], duration: float, slo: float, app=None,
+                    limiter: bool = True, **kwargs) -> List[Dict[str, Any]]:
+    """Run every load level with the concurrency limiter on or off"""
+    if app is None:
+        from main import app
+    from main import settings
+
+    original = settings.CONCURRENCY_LIMIT_ENABLED
+    settings.CONCURRENCY_LIMIT_ENABLED = limiter
+    try:
+        return [await run_level(app, level, duration, slo, **kwargs) for level in levels]
+    finally:
+        settings.CONCURRENCY_LIMIT_ENABLED = original
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrency sweep past saturation")
+    parser.add_argument("--levels", default="1,8,32,128,512", help="Comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per level")
+    parser.add_argument("--slo-ms", type=float, default=100.0, help="Latency SLO for goodput")
+    parser.add_argument("--backoff-ms", type=float, default=1000.0, help="Client backoff after a 503")
+    parser.add_argument("--no-limiter", action="store_true", help="Disable the concurrency limiter")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.levels.split(",")]
+    results = asyncio.run(run_sweep(
+        levels, args.duration, args.slo_ms / 1000.0,
+        limiter=not args.no_limiter, backoff=args.backoff_ms / 1000.0
+    ))
+
+    print(f"{'clients':>8} {'throughput':>11} {'goodput':>9} {'shed/s':>9} {'p99 ms':>9}")
+    for r in results:
+        print(f"{r['concurrency']:>8} {r['throughput']:>11.1f} {r['goodput']:>9.1f} "
+              f"{r['shed_per_second']:>9.1f} {r['p99'] * 1000:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
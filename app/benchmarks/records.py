@@ -0,0 +1,124 @@
+"""
+Record Memory Benchmark
+Bytes per stored chaos event and healing report, dicts against records
+
+Builds `count` chaos events and healing reports both ways and measures the
+memory they hold with tracemalloc:
+
+- events as the dict log_chaos_event used to append (ISO timestamp string,
+  three keys) against ChaosEvent,
+- reports as model_dump(exclude_none=True) plus ISO stored_at and source
+  against StoredHealingReport.
+
+Every report is parsed from its own JSON body inside the measurement and
+the model is dropped once stored, as the endpoint does, so what is counted
+is exactly what storage keeps alive: containers, timestamps and the strings
+not shared with other records.
+
+Usage (from the app directory):
+    python -m benchmarks.records --count 100000 --output record-results.json
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.content import sample_report
+from models import ChaosEvent, HealingReport, StoredHealingReport
+
+EVENT_TYPES = ["memory_leak", "cpu_spike", "slow_responses", "error_injection", "healing_report"]
+
+
+def held_bytes(build: Callable[[], List[Any]]) -> int:
+    """Bytes still allocated once build() has returned its records"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = build()
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del records
+    return held
+
+
+def event_dicts(count: int) -> List[Dict[str, str]]:
+    return [
+        {"timestamp": datetime.now().isoformat(), "event_type": EVENT_TYPES[i % len(EVENT_TYPES)],
+         "details": f"Chaos event {i}"}
+        for i in range(count)
+    ]
+
+
+def event_records(count: int) -> List[ChaosEvent]:
+    # The event type arrives as a fresh string, like a query parameter would
+    return [
+        ChaosEvent("".join(EVENT_TYPES[i % len(EVENT_TYPES)]), f"Chaos event {i}", time.time())
+        for i in range(count)
+    ]
+
+
+def report_bodies(count: int) -> List[bytes]:
+    return [json.dumps(sample_report(i)).encode("utf-8") for i in range(count)]
+
+
+def report_dicts(bodies: List[bytes]) -> List[Dict[str, Any]]:
+    stored = []
+    for body in bodies:
+        record = HealingReport.model_validate_json(body).model_dump(exclude_none=True)
+        record["stored_at"] = datetime.now().isoformat()
+        record["source"] = "n8n_workflow"
+        stored.append(record)
+    return stored
+
+
+def report_records(bodies: List[bytes]) -> List[StoredHealingReport]:
+    return [StoredHealingReport(HealingReport.model_validate_json(body), time.time(), "n8n_workflow")
+            for body in bodies]
+
+
+def run(count: int = 100000, reports: Optional[int] = None) -> Dict[str, Any]:
+    """Bytes per record at `count` events and `reports` (default `count`) reports"""
+    reports = count if reports is None else reports
+    bodies = report_bodies(reports)
+    return {
+        "count": count,
+        "reports": reports,
+        "bytes_per_event": {
+            "dict": held_bytes(lambda: event_dicts(count)) / count,
+            "ChaosEvent": held_bytes(lambda: event_records(count)) / count,
+        },
+        "bytes_per_report": {
+            "dict": held_bytes(lambda: report_dicts(bodies)) / reports,
+            "StoredHealingReport": held_bytes(lambda: report_records(bodies)) / reports,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark memory per stored event and report")
+    parser.add_argument("--count", type=int, default=100000, help="Events per representation")
+    parser.add_argument("--reports", type=int, help="Reports per representation (default: --count)")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.count, args.reports)
+    print(f"bytes per record ({results['count']} events, {results['reports']} reports)")
+    for kind in ("bytes_per_event", "bytes_per_report"):
+        for name, size in results[kind].items():
+            print(f"  {kind[10:]:<7} {name:<20} {size:>8.0f}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Performance Regression Gate
+Compares a benchmark run against a stored baseline and fails on regressions
+
+Each scenario is measured over several runs. A metric only counts as
+regressed when the whole 95% confidence interval of the current runs lies
+beyond the baseline's own 95% interval widened by the allowed threshold,
+so run-to-run noise on either side does not fail the gate.
+
+Absolute req/s depend on the machine, and CI may schedule the job on a
+different node class than the one the baseline was recorded on. When both
+documents contain the reference scenario (`calibration` by default: fixed
+pure-Python work that runs no application code), every metric is divided by
+the mean of the reference in the same document before comparing, so only
+changes relative to the machine's speed are measured.
+
+Usage (from the app directory):
+    python -m benchmarks.regression perf-results.json \\
+        --baseline benchmarks/baseline.json --reference calibration \\
+        --max-throughput-drop 0.10 --max-p99-increase 0.15 \\
+        --junit-xml perf-results.xml --report perf-report.json
+"""
+import argparse
+import json
+import math
+import sys
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+# Two-sided 95% Student t critical values indexed by degrees of freedom
+_T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+    8: 2.306, 9: 2.262, 10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145,
+    15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    25: 2.060, 30: 2.042,
+}
+
+# Metric name -> True when a higher value is better
+METRICS = {
+    "throughput": True,
+    "p99": False,
+}
+
+
+def t_critical(df: int) -> float:
+    """Return the two-sided 95% t critical value for df degrees of freedom"""
+    if df <= 0:
+        return float("inf")
+    if df in _T_CRITICAL_95:
+        return _T_CRITICAL_95[df]
+    if df > 30:
+        return 1.96
+    # Use the next smaller tabulated df, which is slightly conservative
+    return _T_CRITICAL_95[max(k for k in _T_CRITICAL_95 if k < df)]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Return mean, sample standard deviation and 95% confidence interval"""
+    n = len(values)
+    if n == 0:
+        raise ValueError("cannot summarize an empty sample")
+    mean = sum(values) / n
+    if n == 1:
+        return {"n": 1, "mean": mean, "stdev": 0.0, "ci_low": mean, "ci_high": mean}
+    stdev = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    half_width = t_critical(n - 1) * stdev / math.sqrt(n)
+    return {
+        "n": n,
+        "mean": mean,
+        "stdev": stdev,
+        "ci_low": mean - half_width,
+        "ci_high": mean + half_width,
+    }
+
+
+def compare_metric(metric: str, baseline_values: List[float], current_values: List[float],
+                   threshold: float) -> Dict[str, Any]:
+    """Compare one metric of one scenario against its baseline"""
+    higher_is_better = METRICS[metric]
+    baseline = summarize(baseline_values)
+    current = summarize(current_values)
+
+    if baseline["mean"] == 0:
+        change = 0.0
+    else:
+        change = (current["mean"] - baseline["mean"]) / baseline["mean"]
+
+    if higher_is_better:
+        limit = baseline["ci_low"] * (1 - threshold)
+        regressed = current["ci_high"] < limit
+    else:
+        limit = baseline["ci_high"] * (1 + threshold)
+        regressed = current["ci_low"] > limit
+
+    return {
+        "metric": metric,
+        "baseline": baseline,
+        "current": current,
+        "change": change,
+        "threshold": threshold,
+        "limit": limit,
+        "status": "regressed" if regressed else "ok",
+    }
+
+
+def _reference_means(document: Dict[str, Any], reference: Optional[str],
+                     metrics: List[str]) -> Optional[Dict[str, float]]:
+    data = document["scenarios"].get(reference) if reference else None
+    if data is None:
+        return None
+    return {metric: summarize([run[metric] for run in data["runs"]])["mean"] for metric in metrics}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            thresholds: Dict[str, float], reference: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compare all scenarios present in both documents.
+
+    With a reference scenario present in both, metrics are compared as
+    ratios to that scenario's mean within the same document.
+    """
+    metrics = list(thresholds)
+    base_ref = _reference_means(baseline, reference, metrics)
+    cur_ref = _reference_means(current, reference, metrics)
+    normalized = base_ref is not None and cur_ref is not None
+
+    results = []
+    missing = []
+    for name, base_data in sorted(baseline["scenarios"].items()):
+        if normalized and name == reference:
+            continue
+        cur_data = current["scenarios"].get(name)
+        if cur_data is None:
+            missing.append(name)
+            continue
+        for metric, threshold in thresholds.items():
+            base_scale = base_ref[metric] if normalized else 1.0
+            cur_scale = cur_ref[metric] if normalized else 1.0
+            entry = compare_metric(
+                metric,
+                [run[metric] / base_scale for run in base_data["runs"]],
+                [run[metric] / cur_scale for run in cur_data["runs"]],
+                threshold,
+            )
+            entry["scenario"] = name
+            results.append(entry)
+
+    regressions = [r for r in results if r["status"] == "regressed"]
+    return {
+        "status": "failed" if regressions else "passed",
+        "regressions": len(regressions),
+        "reference": reference if normalized else None,
+        "missing_scenarios": missing,
+        "results": results,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a comparison report as a plain-text table"""
+    lines = [
+        f"{'scenario':<20} {'metric':<11} {'baseline':>12} {'current':>12} "
+        f"{'95% CI':>25} {'change':>8}  status"
+    ]
+    normalized = report.get("reference") is not None
+    if normalized:
+        lines.insert(0, f"(values relative to the {report['reference']} scenario of the same run)")
+    for r in report["results"]:
+        if normalized:
+            scale, unit = 1.0, "x "
+        elif r["metric"] != "throughput":
+            scale, unit = 1000.0, "ms"
+        else:
+            scale, unit = 1.0, "/s"
+        base = r["baseline"]["mean"] * scale
+        cur = r["current"]["mean"] * scale
+        ci = f"[{r['current']['ci_low'] * scale:.3f}, {r['current']['ci_high'] * scale:.3f}]"
+        lines.append(
+            f"{r['scenario']:<20} {r['metric']:<11} {base:>10.3f}{unit} {cur:>10.3f}{unit} "
+            f"{ci:>25} {r['change'] * 100:>+7.1f}%  {r['status'].upper()}"
+        )
+    for name in report["missing_scenarios"]:
+        lines.append(f"{name:<20} missing from current run")
+    lines.append("")
+    if report["status"] == "failed":
+        lines.append(f"❌ Performance regression gate failed: {report['regressions']} regression(s)")
+    else:
+        lines.append("✅ Performance regression gate passed")
+    return "\n".join(lines)
+
+
+def to_junit_xml(report: Dict[str, Any]) -> str:
+    """Render a comparison report as JUnit XML, one test case per scenario metric"""
+    cases = []
+    for r in report["results"]:
+        name = quoteattr(f"{r['scenario']}.{r['metric']}")
+        if r["status"] == "regressed":
+            message = (
+                f"{r['metric']} changed {r['change'] * 100:+.1f}% "
+                f"(baseline {r['baseline']['mean']:.6g}, current {r['current']['mean']:.6g}, "
+                f"limit {r['limit']:.6g})"
+            )
+            cases.append(
+                f'  <testcase classname="performance" name={name}>'
+                f'<failure message={quoteattr(message)}>{escape(message)}</failure></testcase>'
+            )
+        else:
+            cases.append(f'  <testcase classname="performance" name={name}/>')
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        f'<testsuite name="performance-regression" tests="{len(report["results"])}" '
+        f'failures="{report["regressions"]}">\n'
+        + "\n".join(cases)
+        + "\n</testsuite>\n"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline")
+    parser.add_argument("results", help="Benchmark results JSON from benchmarks.suite")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json", help="Baseline JSON")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.10,
+                        help="Allowed relative throughput drop (default: 0.10)")
+    parser.add_argument("--max-p99-increase", type=float, default=0.15,
+                        help="Allowed relative p99 latency increase (default: 0.15)")
+    parser.add_argument("--reference", default="calibration",
+                        help="Scenario to normalize by; 'none' compares absolute values "
+                             "(default: calibration)")
+    parser.add_argument("--junit-xml", help="Write a JUnit XML report to this file")
+    parser.add_argument("--report", help="Write the full comparison as JSON to this file")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.results) as fh:
+        current = json.load(fh)
+
+    reference = None if args.reference.lower() == "none" else args.reference
+    report = compare(baseline, current, {
+        "throughput": args.max_throughput_drop,
+        "p99": args.max_p99_increase,
+    }, reference=reference)
+    print(format_report(report))
+
+    if args.junit_xml:
+        with open(args.junit_xml, "w") as fh:
+            fh.write(to_junit_xml(report))
+    if args.report:
+        with open(args.report, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    return 1 if report["status"] == "failed" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Latency Sketch Benchmark
+Per-observation cost and accuracy of the in-process quantile sketches
+
+Compares adding one latency to a QuantileSketch, a WindowedSketch and
+LatencySketches.record (route sketch plus the all-routes sketch, as the
+metrics middleware does) against prometheus_client Histogram.observe, and
+reports the cost of reading quantiles and the relative error of p50/p95/p99
+against exact quantiles of the same log-normal latencies.
+
+Usage (from the app directory):
+    python -m benchmarks.sketches --observations 200000 --output sketch-results.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client import CollectorRegistry, Histogram
+
+from sketches import DEFAULT_QUANTILES, LatencySketches, QuantileSketch, WindowedSketch
+
+ROUTES = ["/api/v1/hello", "/api/v1/status", "/healthz", "/ready", "/metrics"]
+
+
+def sample_latencies(count: int, seed: int = 42) -> List[float]:
+    """Log-normal latencies around 2 ms with a long tail"""
+    rng = random.Random(seed)
+    return [rng.lognormvariate(-6.2, 0.8) for _ in range(count)]
+
+
+def time_per_call(func: Callable[[float], Any], values: List[float]) -> float:
+    """Nanoseconds per call of func(value)"""
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    return (time.perf_counter() - start) / len(values) * 1e9
+
+
+def measure_add(values: List[float]) -> Dict[str, float]:
+    """Per-observation cost in ns"""
+    sketch = QuantileSketch()
+    windowed = WindowedSketch()
+    sketches = LatencySketches()
+    routes = [ROUTES[i % len(ROUTES)] for i in range(len(values))]
+    histogram = Histogram("bench_latency_seconds", "", registry=CollectorRegistry())
+
+    start = time.perf_counter()
+    for route, value in zip(routes, values):
+        sketches.record(route, value)
+    record_ns = (time.perf_counter() - start) / len(values) * 1e9
+
+    return {
+        "QuantileSketch.add": time_per_call(sketch.add, values),
+        "WindowedSketch.add": time_per_call(windowed.add, values),
+        "LatencySketches.record": record_ns,
+        "Histogram.observe": time_per_call(histogram.observe, values),
+    }
+
+
+def measure_query(values: List[float], repeat: int = 200) -> Dict[str, float]:
+    """Microseconds to read quantiles after all values were recorded"""
+    sketches = LatencySketches(cache_ttl=0.0)
+    for i, value in enumerate(values):
+        sketches.record(ROUTES[i % len(ROUTES)], value)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sketches.overall()
+    overall_us = (time.perf_counter() - start) / repeat * 1e6
+    start = time.perf_counter()
+    for _ in range(repeat):
+        sketches.snapshot()
+    snapshot_us = (time.perf_counter() - start) / repeat * 1e6
+    return {"overall": overall_us, "snapshot": snapshot_us,
+            "buckets": len(sketches.total.merged().counts)}
+
+
+def measure_accuracy(values: List[float]) -> Dict[str, float]:
+    """Relative error of the sketch quantiles against exact ones"""
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    ordered = sorted(values)
+    errors = {}
+    for q, estimate in zip(DEFAULT_QUANTILES, sketch.quantiles(DEFAULT_QUANTILES)):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        errors[f"p{q * 100:g}"] = abs(estimate - exact) / exact
+    return errors
+
+
+def run(observations: int = 200000) -> Dict[str, Any]:
+    values = sample_latencies(observations)
+    return {
+        "observations": observations,
+        "add_ns": measure_add(values),
+        "query_us": measure_query(values),
+        "relative_error": measure_accuracy(values),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark latency quantile sketches")
+    parser.add_argument("--observations", type=int, default=200000, help="Latencies per measurement")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.observations)
+    print(f"per observation ({results['observations']} latencies)")
+    for name, ns in results["add_ns"].items():
+        print(f"  {name:<24} {ns:>8.0f} ns")
+    query = results["query_us"]
+    print(f"query: overall {query['overall']:.1f} us, per-route snapshot {query['snapshot']:.1f} us "
+          f"({query['buckets']} buckets)")
+    print("relative error: " + ", ".join(f"{k} {v:.2%}" for k, v in results["relative_error"].items()))
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
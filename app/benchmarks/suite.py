@@ -0,0 +1,251 @@
+"""
+Benchmark Suite
+In-process benchmarks for the request hot path (middleware stack and handlers)
+
+Requests are driven straight through the ASGI interface, so the numbers cover
+metrics_middleware, chaos_middleware and the route handlers without any
+socket or HTTP client overhead.
+
+Usage (from the app directory):
+    python -m benchmarks.suite --runs 5 --requests 2000 --output perf-results.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from rate_limit import RateLimiter, RateLimitMiddleware
+from warmup import asgi_request
+
+# Registered scenarios: name -> {"kind": "http" | "micro", ...}
+SCENARIOS: Dict[str, Dict[str, Any]] = {}
+
+
+def http_scenario(name: str, path: str, method: str = "GET", query: str = "",
+                  headers: Optional[Dict[str, str]] = None, body: bytes = b"",
+                  settings: Optional[Dict[str, Any]] = None):
+    """
+    Register a scenario that sends one request through the full ASGI app.
+    `settings` are overridden for the duration of the scenario.
+    """
+    SCENARIOS[name] = {
+        "kind": "http",
+        "method": method,
+        "path": path,
+        "query": query,
+        "headers": headers or {},
+        "body": body,
+        "settings": settings or {},
+    }
+
+
+def micro_scenario(name: str):
+    """Register a scenario that awaits a coroutine function once per iteration"""
+    def decorator(func: Callable[[], Awaitable[Any]]):
+        SCENARIOS[name] = {"kind": "micro", "func": func}
+        return func
+    return decorator
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Return the pct-th percentile of an already sorted list (nearest rank)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def _make_operation(scenario: Dict[str, Any], app) -> Callable[[], Awaitable[Any]]:
+    if scenario["kind"] == "micro":
+        return scenario["func"]
+
+    async def operation():
+        status = await asgi_request(
+            app, scenario["method"], scenario["path"], scenario["query"],
+            scenario["headers"], scenario["body"]
+        )
+        if status >= 500:
+            raise RuntimeError(f"benchmark request failed with status {status}")
+        return status
+
+    return operation
+
+
+async def run_once(operation: Callable[[], Awaitable[Any]], requests: int,
+                   concurrency: int) -> Dict[str, float]:
+    """Execute one measured run and return throughput and latency percentiles"""
+    latencies: List[float] = []
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await operation()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+    }
+
+
+async def run_scenario(name: str, app=None, runs: int = 5, requests: int = 1000,
+                       concurrency: int = 1, warmup: int = 100) -> Dict[str, Any]:
+    """Run a registered scenario several times and collect per-run statistics"""
+    scenario = SCENARIOS[name]
+    if app is None and scenario["kind"] == "http":
+        from main import app
+    operation = _make_operation(scenario, app)
+
+    from config import settings
+    overrides = scenario.get("settings", {})
+    saved = {key: getattr(settings, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    try:
+        for _ in range(warmup):
+            await operation()
+
+        results = []
+        for _ in range(runs):
+            results.append(await run_once(operation, requests, concurrency))
+    finally:
+        for key, value in saved.items():
+            setattr(settings, key, value)
+    return {"runs": results, "requests": requests, "concurrency": concurrency}
+
+
+async def run_suite(names: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+    """Run the selected scenarios (all by default) and build a results document"""
+    selected = names or sorted(SCENARIOS)
+    scenarios = {}
+    for name in selected:
+        scenarios[name] = await run_scenario(name, **kwargs)
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": scenarios,
+    }
+
+
+# Default scenarios
+http_scenario("hello", "/api/v1/hello", query="name=bench")
+http_scenario("healthz", "/healthz")
+http_scenario("status", "/api/v1/status")
+http_scenario("hello_server_timing", "/api/v1/hello", query="name=bench",
+              headers={"X-Server-Timing": "1"}, settings={"SERVER_TIMING_ALLOW_HEADER": True})
+
+
+@micro_scenario("calibration")
+async def _calibration():
+    # Fixed interpreter and event loop work that runs no application code.
+    # The regression gate divides by it to cancel out machine speed.
+    total = 0
+    for i in range(2000):
+        total += i * i
+    json.dumps({"total": total, "values": list(range(100))})
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return total
+
+
+@micro_scenario("hello_handler")
+async def _hello_handler():
+    from main import hello_world
+    return await hello_world("bench")
+
+
+@micro_scenario("phase_disabled")
+async def _phase_disabled():
+    # 100 instrumented blocks with timing off; divide per-op cost by 100
+    from server_timing import phase
+    for _ in range(100):
+        with phase("bench"):
+            pass
+
+
+async def _empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+# A key set larger than the table, so every lookup also pays for an LRU
+# eviction (the worst case); the limit itself is never reached
+_rate_limiter = RateLimiter({"/api/v1/hello": "1000000/second"}, max_clients=1000)
+_rate_limit_app = RateLimitMiddleware(
+    _empty_app, _rate_limiter, SimpleNamespace(RATE_LIMIT_ENABLED=True, RATE_LIMIT_KEY_HEADER=None)
+)
+_rate_limit_clients = itertools.cycle([f"10.0.{i // 256}.{i % 256}" for i in range(1500)])
+
+
+@micro_scenario("rate_limit_check")
+async def _rate_limit_check():
+    # 100 rule matches and bucket updates; divide per-op cost by 100
+    for _ in range(100):
+        rule = _rate_limiter.match("/api/v1/hello")
+        _rate_limiter.check(rule, next(_rate_limit_clients))
+
+
+@micro_scenario("rate_limit_middleware")
+async def _rate_limit_middleware():
+    # Middleware around an empty app; compare with the hello scenario
+    return await asgi_request(_rate_limit_app, "GET", "/api/v1/hello")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the in-process benchmark suite")
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs per scenario")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent workers per run")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured warmup requests")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    parser.add_argument("--list", action="store_true", help="List available scenarios")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in sorted(SCENARIOS):
+            print(name)
+        return 0
+
+    unknown = [name for name in args.scenarios or [] if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = asyncio.run(run_suite(
+        args.scenarios, runs=args.runs, requests=args.requests,
+        concurrency=args.concurrency, warmup=args.warmup
+    ))
+
+    for name, data in results["scenarios"].items():
+        best = max(run["throughput"] for run in data["runs"])
+        worst_p99 = max(run["p99"] for run in data["runs"])
+        print(f"{name:<24} {best:>10.1f} req/s  p99 {worst_p99 * 1000:>8.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
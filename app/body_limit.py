@@ -0,0 +1,80 @@
+"""
+Request Body Size Limits
+Per-path limits enforced before and while the body is read
+
+A request whose Content-Length exceeds the limit of its path is answered
+with 413 straight away, without calling the application. Bodies without a
+Content-Length (chunked uploads) or with a wrong one are counted as they
+arrive: the chunk that crosses the limit raises 413 from inside `receive`,
+so at most `limit` bytes plus one chunk are ever buffered and the handler
+never sees the oversized body.
+"""
+import json
+from typing import Dict
+
+from starlette.exceptions import HTTPException
+
+DETAIL = "Request body too large"
+
+
+class BodySizeLimitMiddleware:
+    """Pure ASGI middleware that caps request body sizes"""
+
+    def __init__(self, app, settings, rejected_counter=None):
+        self.app = app
+        self.settings = settings
+        self.rejected_counter = rejected_counter
+        self._body = json.dumps({"detail": DETAIL}).encode("utf-8")
+
+    def limit_for(self, path: str) -> int:
+        limits: Dict[str, int] = self.settings.REQUEST_BODY_LIMITS
+        return limits.get(path, self.settings.REQUEST_BODY_MAX_BYTES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        for key, value in scope["headers"]:
+            if key == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > limit:
+                    self._count(scope)
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    self._count(scope)
+                    raise HTTPException(status_code=413, detail=DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _count(self, scope):
+        if self.rejected_counter is not None:
+            path = scope["path"] if scope["path"] in self.settings.REQUEST_BODY_LIMITS else "other"
+            self.rejected_counter.labels(path=path).inc()
+
+    async def _reject(self, send):
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._body)).encode("latin-1")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._body})
@@ -0,0 +1,177 @@
+"""
+Chaos Cluster Coordination
+Broadcast chaos injections and heals to every replica
+
+/admin/chaos/inject and /admin/chaos/heal reach whichever pod the Service
+routes them to. With coordination on, the replica that takes the request
+publishes the desired chaos state of the whole cluster,
+
+    {"version": 7, "origin": "pod-a", "chaos": {"cpu_spike": {}, ...}, "updated_at": ...}
+
+and pushes it to every peer at once (a fixed list of base URLs and/or the
+addresses a DNS name such as a headless Service resolves to). Injections
+add a chaos type with its parameters; a heal empties the set.
+
+States are ordered by (version, origin), so applying one is idempotent: a
+replica that already has the same or a newer state ignores it, which makes
+retries, duplicate deliveries and a replica reaching itself through DNS
+harmless. Concurrent publishes resolve to the highest (version, origin),
+last writer wins. A replica answers every push with its own state, and the
+sender adopts it when it is newer; together with a periodic re-push this
+brings restarted or partitioned replicas up to date.
+
+The time from publishing until every peer has acknowledged the version is
+the convergence time.
+"""
+import asyncio
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+SYNC_PATH = "/admin/chaos/cluster/sync"
+
+
+def state_key(state: Dict[str, Any]) -> Tuple[int, str]:
+    return state["version"], state["origin"]
+
+
+class ChaosCluster:
+    """Versioned cluster-wide chaos state, pushed to peers on every change"""
+
+    def __init__(self, node_id: str, apply: Callable[..., Awaitable[None]], peers: List[str] = (),
+                 dns_name: Optional[str] = None, port: int = 8080,
+                 timeout: float = 2.0, retries: int = 2, sync_interval: float = 10.0,
+                 headers: Optional[Dict[str, str]] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 convergence_histogram=None, version_gauge=None, clock=time.time):
+        self.node_id = node_id
+        self.apply = apply
+        self.static_peers = [peer.rstrip("/") for peer in peers]
+        self.dns_name = dns_name
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.sync_interval = sync_interval
+        self.headers = headers or {}
+        self.transport = transport
+        self.convergence_histogram = convergence_histogram
+        self.version_gauge = version_gauge
+        self.clock = clock
+        self.state: Dict[str, Any] = {"version": 0, "origin": "", "chaos": {}, "updated_at": 0.0}
+        self.last_broadcast: Optional[Dict[str, Any]] = None
+        # Publishes and received states are applied one at a time
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def peers(self) -> List[str]:
+        """Static peers plus the current addresses of the DNS name"""
+        peers = list(self.static_peers)
+        if self.dns_name:
+            try:
+                infos = await asyncio.get_running_loop().getaddrinfo(
+                    self.dns_name, self.port, type=socket.SOCK_STREAM)
+            except socket.gaierror:
+                infos = []
+            for family, _, _, _, address in infos:
+                host = f"[{address[0]}]" if family == socket.AF_INET6 else address[0]
+                peers.append(f"http://{host}:{self.port}")
+        return sorted(set(peers))
+
+    async def publish(self, chaos_type: Optional[str], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Add a chaos type (or, with None, clear all) and push the new state to every peer"""
+        async with self._lock:
+            chaos = dict(self.state["chaos"]) if chaos_type is not None else {}
+            if chaos_type is not None:
+                chaos[chaos_type] = dict(params or {})
+            self._set({"version": self.state["version"] + 1, "origin": self.node_id, "chaos": chaos,
+                      "updated_at": self.clock()})
+            state = self.state
+        return await self.broadcast(state, measure=True)
+
+    async def receive(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a pushed state if it is newer; answers with the state now held"""
+        async with self._lock:
+            applied = state_key(state) > state_key(self.state)
+            if applied:
+                previous = self.state["chaos"]
+                self._set(dict(state))
+                await self.apply(state["chaos"], previous)
+            return {"applied": applied, "state": self.state}
+
+    def _set(self, state: Dict[str, Any]):
+        self.state = state
+        if self.version_gauge is not None:
+            self.version_gauge.set(state["version"])
+
+    async def broadcast(self, state: Dict[str, Any], measure: bool = False) -> Dict[str, Any]:
+        """Push a state to all peers concurrently and adopt any newer state they answer with"""
+        started = time.perf_counter()
+        peers = await self.peers()
+        # Pushes are rare; a client per broadcast keeps no connections across event loops
+        async with httpx.AsyncClient(timeout=self.timeout, headers=self.headers, transport=self.transport) as client:
+            answers = await asyncio.gather(*(self._push(client, peer, state) for peer in peers))
+        acknowledged = [peer for peer, answer in zip(peers, answers)
+                        if answer is not None and state_key(answer) >= state_key(state)]
+        result = {
+            "version": state["version"],
+            "peers": len(peers),
+            "acknowledged": len(acknowledged),
+            "unreachable": [peer for peer, answer in zip(peers, answers) if answer is None],
+            "convergence_seconds": None,
+        }
+        if len(acknowledged) == len(peers):
+            result["convergence_seconds"] = round(time.perf_counter() - started, 6)
+            if measure and self.convergence_histogram is not None:
+                self.convergence_histogram.observe(time.perf_counter() - started)
+        newest = max((answer for answer in answers if answer is not None), key=state_key, default=None)
+        if newest is not None and state_key(newest) > state_key(self.state):
+            await self.receive(newest)
+        self.last_broadcast = dict(result, at=self.clock())
+        return result
+
+    async def _push(self, client: httpx.AsyncClient, peer: str, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The peer's state after the push, or None if it could not be reached"""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(0.05 * 2 ** (attempt - 1))
+            try:
+                response = await client.post(peer + SYNC_PATH, json=state)
+                if response.status_code == 200:
+                    return response.json()["state"]
+            except (httpx.HTTPError, ValueError, KeyError):
+                pass
+        return None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the periodic re-push (inside the event loop)"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            # Pushing the current state, even version 0, also pulls newer ones
+            await self.broadcast(self.state)
+            await asyncio.sleep(self.sync_interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "state": self.state,
+            "static_peers": self.static_peers,
+            "dns_name": self.dns_name,
+            "last_broadcast": self.last_broadcast,
+        }
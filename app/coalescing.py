@@ -0,0 +1,60 @@
+"""
+Request Coalescing
+Single-flight execution of identical concurrent GET handlers
+
+While a coalesced handler is running for a given route and set of
+parameters, identical calls wait for that run instead of starting their own
+and all receive its result (or its exception). Nothing is cached: once the
+run finishes the next call starts a fresh one.
+
+Coalescing wraps the route handler only. Middleware, including the chaos
+middleware, still runs separately for every request, so an injected delay
+or error affects just the request it was injected into. The shared run is
+an independent task, so a leader that is cancelled (client disconnect,
+timeout) does not cancel the computation its followers are waiting for.
+"""
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Share one in-progress computation among identical concurrent calls"""
+
+    def __init__(self, settings, counter=None):
+        self.settings = settings
+        self.counter = counter
+        self.inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]], route: str = "") -> Any:
+        """Run func once for all concurrent callers with the same key"""
+        task = self.inflight.get(key)
+        if task is None:
+            role = "leader"
+            task = asyncio.ensure_future(func())
+            self.inflight[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        else:
+            role = "follower"
+        if self.counter is not None:
+            self.counter.labels(route=route, role=role).inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved when every waiter has gone away
+            task.exception()
+
+    def coalesce(self, route: str):
+        """Decorate a route handler so identical concurrent calls share one run"""
+        def decorator(handler: Callable[..., Awaitable[Any]]):
+            @functools.wraps(handler)
+            async def wrapper(*args, **kwargs):
+                if not self.settings.COALESCING_ENABLED:
+                    return await handler(*args, **kwargs)
+                key: Tuple = (route, args, tuple(sorted(kwargs.items())))
+                return await self.do(key, lambda: handler(*args, **kwargs), route)
+            return wrapper
+        return decorator
@@ -0,0 +1,259 @@
+"""
+Response Compression
+Negotiated gzip, brotli and zstd encoding with a size threshold
+
+Responses are compressed when the client accepts one of the supported
+encodings, the content type is text-like and the body is at least
+`minimum_size` bytes. Single-chunk bodies are compressed in one go (and get
+an exact Content-Length); streaming bodies are fed through an incremental
+encoder chunk by chunk, so nothing is buffered beyond the encoder's window.
+
+Static payloads (the OpenAPI schema) are rendered once, compressed once per
+encoding at the highest level and served from memory afterwards.
+
+brotli and zstandard are optional; encodings whose module is not installed
+are simply not offered.
+"""
+import zlib
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+# Encoding -> (encoder factory, highest level used for static payloads)
+ENCODERS: Dict[str, Tuple[Callable[[int], object], int]] = {"gzip": (_GzipEncoder, 9)}
+if brotli is not None:
+    ENCODERS["br"] = (_BrotliEncoder, 11)
+if zstandard is not None:
+    ENCODERS["zstd"] = (_ZstdEncoder, 19)
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress a complete body"""
+    encoder = ENCODERS[encoding][0](level)
+    return encoder.compress(data) + encoder.finish()
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}"""
+    accepted: Dict[str, float] = {}
+    for item in value.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(value: str, preference: Iterable[str]) -> Optional[str]:
+    """Pick the first preferred encoding the client accepts (q > 0)"""
+    accepted = parse_accept_encoding(value)
+    wildcard = accepted.get("*", 0.0)
+    for encoding in preference:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return (
+        content_type.startswith("text/")
+        or "json" in content_type
+        or "xml" in content_type
+        or "javascript" in content_type
+    )
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware that compresses responses for accepting clients"""
+
+    def __init__(self, app, settings, static_paths: Iterable[str] = ()):
+        self.app = app
+        self.settings = settings
+        self.static_paths = frozenset(static_paths)
+        self.preference = [e for e in settings.COMPRESSION_ENCODINGS if e in ENCODERS]
+        self.levels = {
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_LEVEL,
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        }
+        # Accept-Encoding values repeat across requests; cache negotiation
+        self._negotiated: Dict[bytes, Optional[str]] = {}
+        # path -> {"status", "headers", "body", "encoded": {encoding: bytes}}
+        self._static: Dict[str, Dict[str, object]] = {}
+
+    def clear_static_cache(self):
+        self._static.clear()
+
+    def _choose(self, scope) -> Optional[str]:
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                encoding = self._negotiated.get(value, False)
+                if encoding is False:
+                    if len(self._negotiated) >= 256:
+                        self._negotiated.clear()
+                    encoding = negotiate(value.decode("latin-1"), self.preference)
+                    self._negotiated[value] = encoding
+                return encoding
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] in self.static_paths and scope["method"] == "GET":
+            await self._serve_static(scope, receive, send)
+            return
+
+        encoding = self._choose(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingSend(send, encoding, self.levels[encoding],
+                                     self.settings.COMPRESSION_MINIMUM_SIZE)
+        await self.app(scope, receive, responder)
+
+    async def _serve_static(self, scope, receive, send):
+        entry = self._static.get(scope["path"])
+        if entry is None:
+            captured = {"body": []}
+
+            async def capture(message):
+                if message["type"] == "http.response.start":
+                    captured["start"] = message
+                else:
+                    captured["body"].append(message.get("body", b""))
+
+            await self.app(scope, receive, capture)
+            start = captured["start"]
+            body = b"".join(captured["body"])
+            if start["status"] != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+            entry = {"status": 200, "headers": headers, "body": body, "encoded": {}}
+            self._static[scope["path"]] = entry
+
+        headers = list(entry["headers"])
+        body = entry["body"]
+        encoding = self._choose(scope)
+        if encoding is not None and len(body) >= self.settings.COMPRESSION_MINIMUM_SIZE:
+            encoded = entry["encoded"]
+            if encoding not in encoded:
+                encoded[encoding] = compress(body, encoding, ENCODERS[encoding][1])
+            body = encoded[encoding]
+            headers += [(b"content-encoding", encoding.encode("latin-1")), (b"vary", b"Accept-Encoding")]
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": entry["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class _CompressingSend:
+    """ASGI send wrapper that compresses one response"""
+
+    def __init__(self, send, encoding: str, level: int, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            return
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            headers = MutableHeaders(raw=list(self.start_message.get("headers", [])))
+            if (
+                "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.encoder = ENCODERS[self.encoding][0](self.level)
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                # Streaming: the final length is unknown
+                del headers["content-length"]
+                body = self.encoder.compress(body)
+            else:
+                body = self.encoder.compress(body) + self.encoder.finish()
+                headers["content-length"] = str(len(body))
+            self.start_message["headers"] = headers.raw
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        body = self.encoder.compress(body)
+        if not more_body:
+            body += self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
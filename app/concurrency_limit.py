@@ -0,0 +1,176 @@
+"""
+Adaptive Concurrency Limiting
+Concurrency limit driven by queueing delay, with fast load shedding
+
+Latency alone does not say whether the service is overloaded: a mix of fast
+and slow routes moves the average, and a closed-loop client population
+always queues a little. The limiter therefore estimates queueing delay per
+request as its latency minus the no-load latency of its own route (a
+windowed minimum kept per request path) and smooths it over recent
+completions.
+
+While the smoothed queueing delay stays under `queue_delay_target` the limit
+grows additively (about +1 per `limit` completions, and only while at least
+half of it is in use). Above the target the limit is cut by a fraction that
+follows the gradient target / delay, at most once per `decrease_interval`.
+Requests over the limit are rejected immediately with 503 and Retry-After
+instead of queueing, so admitted requests keep their latency when the
+service is past saturation.
+"""
+import json
+import time
+from typing import Dict, Hashable, Iterable, List, Optional
+
+
+class GradientLimiter:
+    """Concurrency limit that follows the queueing-delay gradient"""
+
+    def __init__(self, initial_limit: int = 50, min_limit: int = 10, max_limit: int = 500,
+                 queue_delay_target: float = 0.05, smoothing: float = 0.2,
+                 decrease_interval: float = 0.1, short_window: int = 10,
+                 baseline_window: int = 1000, max_routes: int = 256):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_delay_target = queue_delay_target
+        self.smoothing = smoothing
+        self.decrease_interval = decrease_interval
+        self.short_alpha = 2.0 / (short_window + 1)
+        self.baseline_window = baseline_window
+        self.max_routes = max_routes
+        self.inflight = 0
+        self.reset()
+
+    def reset(self):
+        """Forget learned latencies and return to the initial limit (tests)"""
+        self.limit = float(self.initial_limit)
+        self.queue_delay = 0.0
+        # route -> [baseline, minimum of the current window, samples in window]
+        self._routes: Dict[Optional[Hashable], List] = {}
+        self._last_decrease = 0.0
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    @property
+    def gradient(self) -> float:
+        if self.queue_delay <= self.queue_delay_target:
+            return 1.0
+        return max(0.5, self.queue_delay_target / self.queue_delay)
+
+    def try_acquire(self) -> bool:
+        """Admit a request if the limit allows it"""
+        if self.inflight >= int(self.limit):
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self, latency: float, route: Optional[Hashable] = None):
+        """Record a finished request and adjust the limit"""
+        inflight = self.inflight
+        self.inflight -= 1
+        delay = latency - self._update_baseline(route, latency)
+        self.queue_delay += self.short_alpha * (delay - self.queue_delay)
+
+        gradient = self.gradient
+        if gradient < 1.0:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.decrease_interval:
+                self._last_decrease = now
+                limit = self.limit * (1.0 - self.smoothing * (1.0 - gradient))
+                self.limit = max(float(self.min_limit), limit)
+        elif inflight * 2 >= self.limit:
+            # Only grow while at least half the limit is in use
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def baseline(self, route: Optional[Hashable] = None) -> Optional[float]:
+        """No-load latency of a route"""
+        entry = self._routes.get(route)
+        return None if entry is None else entry[0]
+
+    def _update_baseline(self, route: Optional[Hashable], latency: float) -> float:
+        # Windowed minimum so the baseline can recover after a slow period
+        routes = self._routes
+        entry = routes.get(route)
+        if entry is None:
+            if len(routes) >= self.max_routes:
+                # Unbounded path cardinality (404 scans) shares one baseline
+                route = None
+                entry = routes.get(None)
+            if entry is None:
+                entry = routes[route] = [latency, latency, 0]
+        if latency < entry[0]:
+            entry[0] = latency
+        if latency < entry[1]:
+            entry[1] = latency
+        entry[2] += 1
+        if entry[2] >= self.baseline_window:
+            entry[0], entry[1], entry[2] = entry[1], float("inf"), 0
+        return entry[0]
+
+    def snapshot(self) -> Dict[str, float]:
+        """Current limiter state for diagnostics"""
+        return {
+            "limit": self.current_limit,
+            "inflight": self.inflight,
+            "queue_delay": self.queue_delay,
+            "gradient": self.gradient,
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    """Pure ASGI middleware that sheds requests over the adaptive limit"""
+
+    def __init__(self, app, limiter: GradientLimiter, settings, exempt_paths: Iterable[str] = (),
+                 exempt_prefixes: Iterable[str] = (), limit_gauge=None, shed_counter=None):
+        self.app = app
+        self.limiter = limiter
+        self.settings = settings
+        self.exempt_paths = frozenset(exempt_paths)
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.limit_gauge = limit_gauge
+        self.shed_counter = shed_counter
+        self._body = json.dumps({"detail": "Service overloaded, retry later"}).encode("utf-8")
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.settings.CONCURRENCY_LIMIT_ENABLED
+            or scope["path"] in self.exempt_paths
+            or scope["path"].startswith(self.exempt_prefixes)
+            # Cold warmup latencies would skew the gradient
+            or scope.get("warmup")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter
+        if not limiter.try_acquire():
+            if self.shed_counter is not None:
+                self.shed_counter.inc()
+            await self._reject(send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            latency = time.perf_counter() - start
+            # Artificial delays (chaos) are not a sign of overload
+            latency -= scope.get("state", {}).get("chaos_delay", 0.0)
+            limiter.release(max(0.0, latency), scope["path"])
+            if self.limit_gauge is not None:
+                self.limit_gauge.set(limiter.current_limit)
+
+    async def _reject(self, send):
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._body)).encode("latin-1")),
+                (b"retry-after", str(self.settings.CONCURRENCY_RETRY_AFTER).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._body})
@@ -4,7 +4,7 @@ Using Pydantic Settings for environment-based configuration
 """
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -27,8 +27,157 @@ class Settings(BaseSettings):
     JAEGER_ENDPOINT: Optional[str] = None
     JAEGER_PORT: int = 6831
     
-    # Health check configuration
-    STARTUP_DELAY: int = 2
+    # Health check configuration (extra delay after warmup, before ready)
+    STARTUP_DELAY: int = 0
+    
+    # Background readiness checks: each runs on its own interval and /ready reads
+    # the cached verdict. A check fails after FALL consecutive failures and
+    # recovers after RISE consecutive successes; the tracing check only runs
+    # with JAEGER_ENDPOINT set (HEALTH_CHECK_DISK_DIR defaults to the temp directory)
+    HEALTH_CHECKS_ENABLED: bool = True
+    HEALTH_CHECK_INTERVALS: Dict[str, float] = {"event_loop": 2.0, "disk": 10.0, "tracing": 30.0}
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    HEALTH_CHECK_FALL: int = 3
+    HEALTH_CHECK_RISE: int = 2
+    HEALTH_CHECK_DISK_DIR: Optional[str] = None
+    HEALTH_CHECK_MAX_LOOP_LAG_MS: float = 500.0
+    
+    # Admin configuration (X-Admin-Token required on guarded endpoints when set)
+    ADMIN_TOKEN: Optional[str] = None
+    
+    # Profiling configuration
+    PROFILING_ENABLED: bool = True
+    PROFILE_MAX_SECONDS: int = 60
+    
+    # tracemalloc allocation diffs (ADMIN_TOKEN required; sessions stop at their deadline)
+    ALLOC_TRACE_ENABLED: bool = True
+    ALLOC_TRACE_MAX_SECONDS: int = 600
+    ALLOC_TRACE_MAX_FRAMES: int = 25
+    
+    # Event loop monitor configuration
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: int = 100
+    LOOP_LAG_THRESHOLD_MS: int = 100
+    LOOP_MONITOR_DEBUG: bool = False
+    
+    # Runtime metrics collector (GC, memory, FDs, threads, tasks)
+    RUNTIME_METRICS_ENABLED: bool = True
+    RUNTIME_METRICS_CACHE_SECONDS: float = 5.0
+    
+    # Adaptive concurrency limit and load shedding (off until tuned per deployment)
+    CONCURRENCY_LIMIT_ENABLED: bool = False
+    CONCURRENCY_LIMIT_INITIAL: int = 50
+    CONCURRENCY_LIMIT_MIN: int = 10
+    CONCURRENCY_LIMIT_MAX: int = 500
+    CONCURRENCY_QUEUE_DELAY_TARGET_MS: float = 50.0
+    CONCURRENCY_RETRY_AFTER: int = 1
+    
+    # Per-client rate limiting (route template -> "<count>/<period>", e.g. "100/minute")
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_RULES: Dict[str, str] = {"/api/v1/hello": "120/minute"}
+    RATE_LIMIT_KEY_HEADER: Optional[str] = None
+    # Proxies in front of the pod that append to RATE_LIMIT_KEY_HEADER
+    # (the OpenShift router is one)
+    RATE_LIMIT_TRUSTED_PROXIES: int = 1
+    RATE_LIMIT_MAX_CLIENTS: int = 100000
+    
+    # Graceful drain (readiness off -> propagation delay -> reject new work -> wait for in-flight)
+    DRAIN_PROPAGATION_DELAY: float = 5.0
+    DRAIN_TIMEOUT: float = 20.0
+    
+    # Response compression (encodings in server preference order; br/zstd need brotli/zstandard)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_ENCODINGS: List[str] = ["zstd", "br", "gzip"]
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_LEVEL: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    
+    # Single-flight coalescing of identical concurrent GETs (hello, status)
+    COALESCING_ENABLED: bool = False
+    
+    # Request body size limits in bytes (per path, else the default)
+    REQUEST_BODY_MAX_BYTES: int = 1048576
+    REQUEST_BODY_LIMITS: Dict[str, int] = {
+        "/admin/healing-report": 65536,
+        "/admin/healing-reports:batch": 4194304,
+    }
+    
+    # Outbound webhooks for chaos and health events (no URLs = disabled)
+    WEBHOOK_URLS: List[str] = []
+    WEBHOOK_BATCH_SIZE: int = 50
+    WEBHOOK_FLUSH_INTERVAL_MS: float = 200.0
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_TIMEOUT: float = 5.0
+    WEBHOOK_MAX_RETRIES: int = 3
+    WEBHOOK_RETRY_BASE_MS: float = 100.0
+    WEBHOOK_RETRY_MAX_MS: float = 5000.0
+    WEBHOOK_BREAKER_FAILURES: int = 5
+    WEBHOOK_BREAKER_RESET: float = 30.0
+    WEBHOOK_MAX_CONNECTIONS: int = 10
+    
+    # loop_block chaos: synchronous sleeps on the event loop thread
+    # (the cap keeps single blocks under the 2-3s probe timeouts)
+    CHAOS_LOOP_BLOCK_MS: float = 200.0
+    CHAOS_LOOP_BLOCK_INTERVAL_MS: float = 1000.0
+    CHAOS_LOOP_BLOCK_MAX_MS: float = 1000.0
+    
+    # io_pressure chaos: workers writing, reading and fsyncing scratch files
+    # (CHAOS_IO_DIR defaults to the system temp directory; at most CHAOS_IO_MAX_MB on disk)
+    CHAOS_IO_DIR: Optional[str] = None
+    CHAOS_IO_MAX_MB: int = 256
+    CHAOS_IO_WORKERS: int = 4
+    CHAOS_IO_BLOCK_KB: int = 64
+    CHAOS_IO_MB_PER_SECOND: float = 20.0
+    CHAOS_IO_IOPS: float = 200.0
+    CHAOS_IO_FSYNC_EVERY: int = 1
+    
+    # response_stream chaos defaults: throttle rate and where truncate/reset cut the body
+    CHAOS_STREAM_BYTES_PER_SECOND: int = 16384
+    CHAOS_STREAM_AFTER_BYTES: int = 1024
+    
+    # Cluster-wide chaos: inject/heal on one replica is pushed to its peers
+    # (base URLs and/or a DNS name such as a headless Service, resolved on every push)
+    CHAOS_CLUSTER_ENABLED: bool = False
+    CHAOS_CLUSTER_PEERS: List[str] = []
+    CHAOS_CLUSTER_DNS: Optional[str] = None
+    CHAOS_CLUSTER_PORT: int = 8080
+    CHAOS_CLUSTER_NODE_ID: Optional[str] = None
+    CHAOS_CLUSTER_TIMEOUT: float = 2.0
+    CHAOS_CLUSTER_RETRIES: int = 2
+    CHAOS_CLUSTER_SYNC_INTERVAL: float = 10.0
+    
+    # In-process healer: heal active chaos within a second of a policy breach
+    HEALER_ENABLED: bool = False
+    HEALER_CHECK_INTERVAL_MS: float = 250.0
+    HEALER_BREACH_CHECKS: int = 2
+    HEALER_COOLDOWN_SECONDS: float = 5.0
+    HEALER_WINDOW_SECONDS: int = 10
+    HEALER_MIN_REQUESTS: int = 20
+    HEALER_MAX_ERROR_RATE: float = 0.1
+    HEALER_MAX_P95_MS: float = 1000.0
+    HEALER_MAX_LOOP_LAG_MS: float = 250.0
+    HEALER_MAX_RSS_MB: Optional[float] = 384.0
+    
+    # In-process latency quantiles per route (relative accuracy, sliding window)
+    LATENCY_SKETCH_ENABLED: bool = True
+    LATENCY_SKETCH_ACCURACY: float = 0.01
+    LATENCY_SKETCH_WINDOW_SECONDS: float = 60.0
+    LATENCY_SKETCH_SLOTS: int = 6
+    
+    # In-process per-second metrics history (ring of the last N seconds)
+    METRICS_HISTORY_ENABLED: bool = True
+    METRICS_HISTORY_SECONDS: int = 900
+    
+    # Accept-driven MessagePack/CBOR responses and request bodies (JSON stays the default)
+    CONTENT_NEGOTIATION_ENABLED: bool = True
+    CONTENT_TYPES: List[str] = ["application/msgpack", "application/cbor"]
+    
+    # Server-Timing breakdown (always on, or per request via X-Server-Timing: 1)
+    # The per-request opt-in reveals internal timings to any client; keep it
+    # off outside of debugging sessions
+    SERVER_TIMING_ENABLED: bool = False
+    SERVER_TIMING_ALLOW_HEADER: bool = False
     
     model_config = ConfigDict(
         env_file=".env",
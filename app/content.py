@@ -0,0 +1,183 @@
+"""
+Content Negotiation
+Accept-driven JSON, MessagePack or CBOR for API responses and request bodies
+
+Routes use NegotiatedRoute, which picks a response codec from the Accept
+header and decodes MessagePack and CBOR request bodies. Responses are
+rendered by NegotiatedResponse from the same JSON-compatible content FastAPI
+produces for JSON, so the schema is identical in every format; only the
+wire encoding changes. JSON stays the default for missing or unmatched
+Accept headers, error responses and anything returning its own Response.
+
+A binary request body is decoded once and handed to FastAPI as the JSON
+body of a rebuilt request (new headers in the scope, a `receive` replaying
+the re-encoded body), so body validation works unchanged.
+
+msgpack and cbor2 are optional; formats whose module is not installed are
+simply not offered.
+"""
+import json
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional dependency
+    cbor2 = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# Media type -> (encode, decode)
+CODECS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {}
+# Accepted aliases -> canonical media type
+ALIASES: Dict[str, str] = {}
+if msgpack is not None:
+    CODECS[MSGPACK] = (msgpack.packb, msgpack.unpackb)
+    ALIASES.update({MSGPACK: MSGPACK, "application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK})
+if cbor2 is not None:
+    CODECS[CBOR] = (cbor2.dumps, cbor2.loads)
+    ALIASES[CBOR] = CBOR
+
+_response_type: ContextVar[Optional[str]] = ContextVar("response_media_type", default=None)
+# Accept values repeat across requests; cache negotiation
+_negotiated: Dict[str, Optional[str]] = {}
+
+
+def parse_accept(value: str) -> Dict[str, float]:
+    """Parse an Accept header into {media type: q}"""
+    accepted: Dict[str, float] = {}
+    for item in value.split(","):
+        media_type, *params = item.split(";")
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, number = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        accepted[media_type] = max(q, accepted.get(media_type, 0.0))
+    return accepted
+
+
+def negotiate(value: str, preference: Iterable[str]) -> Optional[str]:
+    """
+    Pick a binary media type when the client prefers it to JSON.
+
+    Returns None for JSON. Wildcards never select a binary format: only a
+    client that names MessagePack or CBOR gets one.
+    """
+    accepted = parse_accept(value)
+    best, best_q = None, 0.0
+    for media_type in preference:
+        q = max((q for alias, q in accepted.items() if ALIASES.get(alias) == media_type), default=0.0)
+        if q > best_q:
+            best, best_q = media_type, q
+    json_q = max(accepted.get(JSON, 0.0), accepted.get("application/*", 0.0), accepted.get("*/*", 0.0))
+    # A binary format named as explicitly as JSON wins the tie
+    return best if best is not None and best_q >= json_q else None
+
+
+def decoder_for(content_type: Optional[str]) -> Optional[Callable[[bytes], Any]]:
+    """Decoder for a binary request Content-Type, None for JSON and others"""
+    if not content_type:
+        return None
+    media_type = ALIASES.get(content_type.split(";", 1)[0].strip().lower())
+    return None if media_type is None else CODECS[media_type][1]
+
+
+class NegotiatedResponse(JSONResponse):
+    """JSON response that is encoded as MessagePack or CBOR when negotiated"""
+
+    def render(self, content: Any) -> bytes:
+        media_type = _response_type.get()
+        if media_type is None:
+            return super().render(content)
+        self.media_type = media_type
+        return CODECS[media_type][0](content)
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        self.raw_headers.append((b"vary", b"Accept"))
+
+
+class NegotiatedRoute(APIRoute):
+    """APIRoute that negotiates the response format and decodes binary bodies"""
+
+    settings = None
+    preference: Tuple[str, ...] = ()
+
+    @classmethod
+    def configure(cls, settings):
+        """Set the settings every route reads (the router creates the instances)"""
+        cls.settings = settings
+        cls.preference = tuple(t for t in settings.CONTENT_TYPES if t in CODECS)
+        _negotiated.clear()
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            settings = self.settings
+            if settings is None or not settings.CONTENT_NEGOTIATION_ENABLED:
+                return await handler(request)
+
+            decode = decoder_for(request.headers.get("content-type"))
+            if decode is not None:
+                request = await self._decode_body(request, decode)
+
+            token = _response_type.set(self._choose(request.headers.get("accept")))
+            try:
+                return await handler(request)
+            finally:
+                _response_type.reset(token)
+
+        return negotiated_handler
+
+    def _choose(self, accept: Optional[str]) -> Optional[str]:
+        if not accept or not self.preference:
+            return None
+        media_type = _negotiated.get(accept, False)
+        if media_type is False:
+            if len(_negotiated) >= 256:
+                _negotiated.clear()
+            media_type = negotiate(accept, self.preference)
+            _negotiated[accept] = media_type
+        return media_type
+
+    @staticmethod
+    async def _decode_body(request: Request, decode: Callable[[bytes], Any]) -> Request:
+        """The same request with its binary body re-encoded as JSON"""
+        body = await request.body()
+        if body:
+            try:
+                body = json.dumps(decode(body), separators=(",", ":")).encode("utf-8")
+            except Exception:
+                raise HTTPException(status_code=400, detail="Request body could not be decoded")
+        headers = [(k, v) for k, v in request.scope["headers"] if k not in (b"content-type", b"content-length")]
+        headers += [(b"content-type", JSON.encode("latin-1")), (b"content-length", str(len(body)).encode("latin-1"))]
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The body is consumed; anything further is the disconnect
+            return await request.receive()
+
+        return Request(dict(request.scope, headers=headers), receive)
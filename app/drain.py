@@ -0,0 +1,158 @@
+"""
+Graceful Drain
+Take the pod out of rotation before in-flight requests are cut off
+
+A drain runs in three steps:
+1. readiness is flipped to not ready, so the pod is removed from Service
+   endpoints and router backends;
+2. after `propagation_delay` (time for endpoint updates to reach every
+   router) new work is rejected with 503 and Connection: close;
+3. the drain waits for the in-flight request count to reach zero, up to
+   `timeout` seconds. Requests still running at the deadline are reported
+   as abandoned.
+
+Probes, metrics and admin endpoints keep working throughout. In-flight
+requests are counted by DrainMiddleware, which wraps the whole stack; the
+http_requests_in_flight gauge is maintained inside the chaos middleware and
+would miss requests that are sitting in an injected delay.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+SERVING = "serving"
+PROPAGATING = "propagating"
+DRAINING = "draining"
+DRAINED = "drained"
+
+
+class DrainController:
+    """Runs at most one drain and tracks whether new work is accepted"""
+
+    def __init__(self, on_start: Optional[Callable[[], None]] = None, poll_interval: float = 0.05,
+                 duration_gauge=None, abandoned_counter=None, draining_gauge=None):
+        self.active = 0
+        self.on_start = on_start
+        self.poll_interval = poll_interval
+        self.duration_gauge = duration_gauge
+        self.abandoned_counter = abandoned_counter
+        self.draining_gauge = draining_gauge
+        self.reset()
+
+    def reset(self):
+        """Return to serving (startup, tests)"""
+        self.state = SERVING
+        self.result: Optional[Dict[str, Any]] = None
+        self.started_at: Optional[float] = None
+        self._task: Optional[asyncio.Future] = None
+        self._waiting_requests = 0
+        if self.draining_gauge is not None:
+            self.draining_gauge.set(0)
+
+    @property
+    def accepting(self) -> bool:
+        """Whether new non-exempt requests are admitted"""
+        return self.state in (SERVING, PROPAGATING)
+
+    def start(self, propagation_delay: float, timeout: float) -> asyncio.Future:
+        """Start a drain in the background, or return the one already running"""
+        if self._task is None:
+            # Readiness flips right away; the rest happens in the task
+            self.started_at = time.monotonic()
+            self.state = PROPAGATING
+            if self.draining_gauge is not None:
+                self.draining_gauge.set(1)
+            if self.on_start is not None:
+                self.on_start()
+            self._task = asyncio.ensure_future(self._run(propagation_delay, timeout))
+        return self._task
+
+    async def drain(self, propagation_delay: float, timeout: float,
+                    from_request: bool = False) -> Dict[str, Any]:
+        """
+        Start (or join) a drain and wait for it to finish.
+
+        Callers that are themselves in-flight requests pass from_request=True
+        so the drain does not wait for them.
+        """
+        task = self.start(propagation_delay, timeout)
+        if from_request:
+            self._waiting_requests += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if from_request:
+                self._waiting_requests -= 1
+
+    def _pending(self) -> int:
+        return max(0, self.active - self._waiting_requests)
+
+    async def _run(self, propagation_delay: float, timeout: float) -> Dict[str, Any]:
+        if propagation_delay > 0:
+            await asyncio.sleep(propagation_delay)
+
+        self.state = DRAINING
+        deadline = time.monotonic() + timeout
+        while self._pending() > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+
+        abandoned = self._pending()
+        duration = time.monotonic() - self.started_at
+        self.state = DRAINED
+        if self.duration_gauge is not None:
+            self.duration_gauge.set(duration)
+        if abandoned and self.abandoned_counter is not None:
+            self.abandoned_counter.inc(abandoned)
+        self.result = {"duration": duration, "abandoned": abandoned}
+        return self.result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current drain state for the admin endpoint"""
+        return {
+            "state": self.state,
+            "in_flight": self.active,
+            "elapsed": None if self.started_at is None else time.monotonic() - self.started_at,
+            "result": self.result,
+        }
+
+
+class DrainMiddleware:
+    """Pure ASGI middleware that counts in-flight requests and rejects new work while draining"""
+
+    def __init__(self, app, controller: DrainController, exempt_paths: Iterable[str] = (),
+                 exempt_prefixes: Iterable[str] = ()):
+        self.app = app
+        self.controller = controller
+        self.exempt_paths = frozenset(exempt_paths)
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self._body = json.dumps({"detail": "Service is draining"}).encode("utf-8")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        if (
+            controller.accepting
+            or scope["path"] in self.exempt_paths
+            or scope["path"].startswith(self.exempt_prefixes)
+        ):
+            controller.active += 1
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                controller.active -= 1
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._body)).encode("latin-1")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._body})
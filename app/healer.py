@@ -0,0 +1,254 @@
+"""
+Autonomous Healing
+In-process healer that stops active chaos as soon as the service degrades
+
+The n8n path (Prometheus rule -> Alertmanager -> n8n -> /admin/chaos/heal)
+takes minutes. The healer closes the loop inside the process instead: a
+task checks every `check_interval` seconds
+
+- the error rate and p95 latency of API requests over a sliding window of
+  per-second buckets (RequestWindowMiddleware feeds it; it sits outside the
+  chaos middleware, so injected errors and delays count),
+- event-loop lag, measured as the lateness of its own wake-ups,
+- process RSS,
+
+against the configured limits. After `breach_checks` consecutive breaching
+checks it runs the regular healing logic (the same code as
+/admin/chaos/heal), stores a healing report with source "self" and clears
+the window so that only post-healing traffic is judged. The service counts
+as recovered after `breach_checks` consecutive healthy checks; the time
+from the first breaching check to recovery is observed per healed chaos
+type. A breach with no chaos active is counted but not acted on.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+class RequestWindow:
+    """Request count, error count and latency histogram per second over a sliding window"""
+
+    def __init__(self, seconds: int = 10, bounds: Sequence[float] = LATENCY_BOUNDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.seconds = seconds
+        self.bounds = tuple(bounds)
+        self.clock = clock
+        self.clear()
+
+    def clear(self):
+        # slot: [second, requests, errors, latency bucket counts]
+        self._slots = [[-1, 0, 0, [0] * len(self.bounds)] for _ in range(self.seconds)]
+
+    def record(self, latency: float, error: bool):
+        second = int(self.clock())
+        slot = self._slots[second % self.seconds]
+        if slot[0] != second:
+            slot[0], slot[1], slot[2], slot[3] = second, 0, 0, [0] * len(self.bounds)
+        slot[1] += 1
+        if error:
+            slot[2] += 1
+        for i, bound in enumerate(self.bounds):
+            if latency <= bound:
+                slot[3][i] += 1
+                break
+
+    def totals(self):
+        """(requests, errors, latency bucket counts) over the window"""
+        oldest = int(self.clock()) - self.seconds
+        requests = errors = 0
+        counts = [0] * len(self.bounds)
+        for second, slot_requests, slot_errors, slot_counts in self._slots:
+            if second > oldest:
+                requests += slot_requests
+                errors += slot_errors
+                for i, count in enumerate(slot_counts):
+                    counts[i] += count
+        return requests, errors, counts
+
+    def quantile(self, q: float, counts: Optional[List[int]] = None) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile, None without data"""
+        if counts is None:
+            counts = self.totals()[2]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for bound, count in zip(self.bounds, counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return self.bounds[-1]
+
+
+class RequestWindowMiddleware:
+    """Pure ASGI middleware that records outcome and latency of API requests"""
+
+    def __init__(self, app, window: RequestWindow, settings, exempt_prefixes=()):
+        self.app = app
+        self.window = window
+        self.settings = settings
+        self.exempt_prefixes = tuple(exempt_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.settings.HEALER_ENABLED
+            or scope["path"].startswith(self.exempt_prefixes)
+            or scope.get("warmup")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # An exception escaping here becomes a 500 further out
+            self.window.record(time.perf_counter() - start, status >= 500)
+
+
+class Healer:
+    """Checks the policies and heals active chaos on a sustained breach"""
+
+    def __init__(self, window: RequestWindow, heal: Callable[[], List[str]],
+                 active_chaos: Callable[[], List[str]],
+                 report: Callable[[str, List[str], Dict[str, float]], None],
+                 rss_reader: Optional[Callable[[], Optional[int]]] = None,
+                 check_interval: float = 0.25, breach_checks: int = 2, cooldown: float = 5.0,
+                 min_requests: int = 20, max_error_rate: float = 0.1, max_p95: float = 1.0,
+                 max_loop_lag: float = 0.25, max_rss: Optional[float] = None,
+                 recover_histogram=None, breach_counter=None, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.heal = heal
+        self.active_chaos = active_chaos
+        self.report = report
+        self.rss_reader = rss_reader
+        self.check_interval = check_interval
+        self.breach_checks = breach_checks
+        self.cooldown = cooldown
+        self.min_requests = min_requests
+        self.max_error_rate = max_error_rate
+        self.max_p95 = max_p95
+        self.max_loop_lag = max_loop_lag
+        self.max_rss = max_rss
+        self.recover_histogram = recover_histogram
+        self.breach_counter = breach_counter
+        self.clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self.reset()
+
+    def reset(self):
+        """Forget the current episode (startup, tests)"""
+        self.breaching = 0
+        self.healthy = 0
+        self.onset: Optional[float] = None
+        self.healed: List[str] = []
+        self.last_heal = float("-inf")
+        self.last_breaches: Dict[str, float] = {}
+        self.heals = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.check_interval
+            await asyncio.sleep(self.check_interval)
+            # A late wake-up is time the loop spent blocked
+            self.check(max(0.0, loop.time() - expected))
+
+    def evaluate(self, loop_lag: float = 0.0) -> Dict[str, float]:
+        """Signals that are over their limit right now, with their values"""
+        breaches: Dict[str, float] = {}
+        requests, errors, counts = self.window.totals()
+        if requests >= self.min_requests:
+            error_rate = errors / requests
+            if error_rate > self.max_error_rate:
+                breaches["error_rate"] = error_rate
+            p95 = self.window.quantile(0.95, counts)
+            if p95 is not None and p95 > self.max_p95:
+                breaches["latency_p95"] = p95
+        if loop_lag > self.max_loop_lag:
+            breaches["loop_lag"] = loop_lag
+        if self.max_rss is not None and self.rss_reader is not None:
+            rss = self.rss_reader()
+            if rss is not None and rss > self.max_rss:
+                breaches["rss"] = float(rss)
+        return breaches
+
+    def check(self, loop_lag: float = 0.0) -> Dict[str, float]:
+        """Run one policy check; heals or records recovery as needed"""
+        now = self.clock()
+        breaches = self.evaluate(loop_lag)
+        self.last_breaches = breaches
+        if not breaches:
+            self.breaching = 0
+            if self.onset is not None:
+                self.healthy += 1
+                if self.healthy >= self.breach_checks:
+                    self._recovered(now)
+            return breaches
+
+        self.healthy = 0
+        self.breaching += 1
+        if self.onset is None:
+            self.onset = now
+        if self.breaching == self.breach_checks and self.breach_counter is not None:
+            for signal in breaches:
+                self.breach_counter.labels(signal=signal).inc()
+        if self.breaching >= self.breach_checks and now - self.last_heal >= self.cooldown:
+            active = self.active_chaos()
+            if active:
+                self.last_heal = now
+                self.heals += 1
+                actions = self.heal()
+                self.healed.extend(t for t in active if t not in self.healed)
+                for chaos_type in active:
+                    self.report(chaos_type, actions, breaches)
+                # Judge recovery on post-healing traffic only
+                self.window.clear()
+        return breaches
+
+    def _recovered(self, now: float):
+        if self.recover_histogram is not None:
+            for chaos_type in self.healed:
+                self.recover_histogram.labels(chaos_type=chaos_type).observe(now - self.onset)
+        self.onset = None
+        self.healed = []
+        self.healthy = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current healer state for status endpoints"""
+        return {
+            "running": self.running,
+            "breaches": dict(self.last_breaches),
+            "episode_seconds": None if self.onset is None else self.clock() - self.onset,
+            "heals": self.heals,
+        }
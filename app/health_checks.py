@@ -0,0 +1,189 @@
+"""
+Background Health Checks
+Dependency checks run on their own schedule; probes read the cached result
+
+Readiness depends on more than startup having finished: the disk must be
+writable, the tracing agent resolvable, the event loop responsive. Running
+those checks inside every kubelet probe would put their cost (and their
+timeouts) on the probe path. Instead each HealthCheck runs in a background
+task at its own interval, bounded by its own timeout, and the scheduler
+keeps the composite verdict up to date as check states change. /ready
+reads a single attribute.
+
+Hysteresis keeps a flaky dependency from flapping readiness: a check turns
+failing only after `fall` consecutive failures and passing again only after
+`rise` consecutive successes. The very first result is taken as is, so a
+dependency that is down at startup keeps the pod out of rotation straight
+away. A check that has not run yet counts as passing. Failing checks only
+affect the composite when they are `critical`.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+PENDING = "pending"
+PASSING = "passing"
+FAILING = "failing"
+
+
+class HealthCheck:
+    """One dependency check: its schedule, limits and latest results"""
+
+    def __init__(self, name: str, probe: Callable[[], Awaitable[Any]], interval: float = 5.0,
+                 timeout: float = 1.0, fall: int = 3, rise: int = 2, critical: bool = True):
+        if interval <= 0 or timeout <= 0:
+            raise ValueError("interval and timeout must be positive")
+        if fall < 1 or rise < 1:
+            raise ValueError("fall and rise must be at least 1")
+        self.name = name
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.fall = fall
+        self.rise = rise
+        self.critical = critical
+
+        self.status = PENDING
+        self.consecutive_failures = 0
+        self.consecutive_successes = 0
+        self.runs = 0
+        self.last_latency: Optional[float] = None
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_detail: Any = None
+        self.last_change: Optional[float] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "critical": self.critical,
+            "latency_ms": None if self.last_latency is None else round(self.last_latency * 1000, 3),
+            "last_checked": self.last_checked,
+            "last_change": self.last_change,
+            "consecutive_failures": self.consecutive_failures,
+            "consecutive_successes": self.consecutive_successes,
+            "runs": self.runs,
+            "error": self.last_error,
+            "detail": self.last_detail,
+            "interval_seconds": self.interval,
+            "timeout_seconds": self.timeout,
+        }
+
+
+class HealthChecker:
+    """Schedules HealthChecks and maintains the composite verdict"""
+
+    def __init__(self, checks: Iterable[HealthCheck] = (), latency_histogram=None, status_gauge=None,
+                 clock: Callable[[], float] = time.time):
+        self.checks: Dict[str, HealthCheck] = {}
+        self.latency_histogram = latency_histogram
+        self.status_gauge = status_gauge
+        self.clock = clock
+        # Critical checks currently failing; empty means healthy
+        self._failing: Set[str] = set()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        for check in checks:
+            self.add(check)
+
+    def add(self, check: HealthCheck):
+        if check.name in self.checks:
+            raise ValueError(f"Duplicate health check: {check.name}")
+        self.checks[check.name] = check
+
+    @property
+    def healthy(self) -> bool:
+        """Composite verdict, kept current by every check run (O(1))"""
+        return not self._failing
+
+    @property
+    def failing(self):
+        return sorted(self._failing)
+
+    async def run_check(self, check: HealthCheck) -> bool:
+        """Run one check once and fold the result into its state; returns whether it passed"""
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(check.probe(), check.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            detail, error = None, f"timed out after {check.timeout:g}s"
+        except Exception as e:
+            detail, error = None, f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - started
+
+        check.runs += 1
+        check.last_latency = latency
+        check.last_checked = self.clock()
+        check.last_error = error
+        check.last_detail = detail
+        if self.latency_histogram is not None:
+            self.latency_histogram.labels(check=check.name).observe(latency)
+
+        if error is None:
+            check.consecutive_successes += 1
+            check.consecutive_failures = 0
+            if check.status == PENDING or (check.status == FAILING and check.consecutive_successes >= check.rise):
+                self._set_status(check, PASSING)
+        else:
+            check.consecutive_failures += 1
+            check.consecutive_successes = 0
+            if check.status == PENDING or (check.status == PASSING and check.consecutive_failures >= check.fall):
+                self._set_status(check, FAILING)
+        return error is None
+
+    def _set_status(self, check: HealthCheck, status: str):
+        check.status = status
+        check.last_change = check.last_checked
+        if status == FAILING and check.critical:
+            self._failing.add(check.name)
+        else:
+            self._failing.discard(check.name)
+        if self.status_gauge is not None:
+            self.status_gauge.labels(check=check.name).set(1 if status == PASSING else 0)
+
+    async def run_all(self):
+        """Run every check once, concurrently (startup)"""
+        await asyncio.gather(*(self.run_check(check) for check in self.checks.values()))
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks.values())
+
+    def start(self):
+        """Start one background task per check (inside the event loop)"""
+        for name, check in self.checks.items():
+            if name not in self._tasks or self._tasks[name].done():
+                self._tasks[name] = asyncio.create_task(self._run(check))
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        self._tasks = {}
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, check: HealthCheck):
+        while True:
+            await asyncio.sleep(check.interval)
+            await self.run_check(check)
+
+    def reset(self):
+        """Forget all results (tests)"""
+        self._failing.clear()
+        for check in self.checks.values():
+            check.status = PENDING
+            check.consecutive_failures = check.consecutive_successes = check.runs = 0
+            check.last_latency = check.last_checked = check.last_error = check.last_detail = None
+            check.last_change = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "running": self.running,
+            "failing": self.failing,
+            "checks": {name: check.snapshot() for name, check in self.checks.items()},
+        }
@@ -0,0 +1,188 @@
+"""
+Metrics History
+Per-second request aggregates for the last N seconds, kept in process
+
+Recent request rates and error ratios otherwise need Prometheus. The
+history is a ring of `seconds` rows in preallocated arrays, one column per
+aggregate:
+
+- requests, 5xx responses, latency sum and maximum,
+- counts per latency bucket (a flat rows x buckets array; quantiles over a
+  window are read from the summed buckets),
+- maximum in-flight requests and the RSS sampled by the background task.
+
+A row is reused when its second comes round again. Recording a request
+updates a handful of array cells in place and allocates no containers;
+all aggregation happens when the history is read.
+"""
+import asyncio
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+class MetricsHistory:
+    """Ring buffer of per-second request aggregates"""
+
+    def __init__(self, seconds: int = 900, bounds: Sequence[float] = LATENCY_BOUNDS,
+                 clock: Callable[[], float] = time.time):
+        self.seconds = seconds
+        self.bounds = tuple(bounds)
+        self.clock = clock
+        buckets = len(self.bounds)
+        self._epoch = array("q", [-1]) * seconds
+        self._requests = array("q", [0]) * seconds
+        self._errors = array("q", [0]) * seconds
+        self._latency_sum = array("d", [0.0]) * seconds
+        self._latency_max = array("d", [0.0]) * seconds
+        self._inflight_max = array("q", [0]) * seconds
+        self._rss = array("d", [0.0]) * seconds
+        self._buckets = array("q", [0]) * (seconds * buckets)
+        self.inflight = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def reset(self):
+        """Forget all rows (tests)"""
+        for i in range(self.seconds):
+            self._epoch[i] = -1
+        self.inflight = 0
+
+    def _row(self, epoch: int) -> int:
+        row = epoch % self.seconds
+        if self._epoch[row] != epoch:
+            self._epoch[row] = epoch
+            self._requests[row] = 0
+            self._errors[row] = 0
+            self._latency_sum[row] = 0.0
+            self._latency_max[row] = 0.0
+            self._inflight_max[row] = self.inflight
+            self._rss[row] = 0.0
+            buckets = len(self.bounds)
+            start = row * buckets
+            for i in range(start, start + buckets):
+                self._buckets[i] = 0
+        return row
+
+    def begin(self):
+        """A request started"""
+        self.inflight += 1
+        row = self._row(int(self.clock()))
+        if self.inflight > self._inflight_max[row]:
+            self._inflight_max[row] = self.inflight
+
+    def end(self, latency: float, status: int):
+        """A request finished"""
+        self.inflight -= 1
+        row = self._row(int(self.clock()))
+        self._requests[row] += 1
+        if status >= 500:
+            self._errors[row] += 1
+        self._latency_sum[row] += latency
+        if latency > self._latency_max[row]:
+            self._latency_max[row] = latency
+        self._buckets[row * len(self.bounds) + bisect_left(self.bounds, latency)] += 1
+
+    def sample(self, rss: Optional[float] = None):
+        """Once a second: make sure the row exists even without traffic and store RSS"""
+        row = self._row(int(self.clock()))
+        if rss is not None:
+            self._rss[row] = rss
+
+    def start(self, rss_reader: Optional[Callable[[], Optional[float]]] = None, interval: float = 1.0):
+        """Sample every `interval` seconds in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(rss_reader, interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, rss_reader, interval: float):
+        while True:
+            self.sample(rss_reader() if rss_reader is not None else None)
+            await asyncio.sleep(interval)
+
+    def _quantile(self, counts: List[int], total: int, q: float, maximum: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile, capped at the largest latency"""
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for bound, count in zip(self.bounds, counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, maximum)
+        return maximum
+
+    def _aggregate(self, first: int, last: int) -> Dict[str, Any]:
+        """Aggregate whole seconds first..last (inclusive)"""
+        buckets = len(self.bounds)
+        requests = errors = inflight_max = 0
+        latency_sum = latency_max = 0.0
+        rss = None
+        counts = [0] * buckets
+        for epoch in range(first, last + 1):
+            row = epoch % self.seconds
+            if self._epoch[row] != epoch:
+                continue
+            requests += self._requests[row]
+            errors += self._errors[row]
+            latency_sum += self._latency_sum[row]
+            latency_max = max(latency_max, self._latency_max[row])
+            inflight_max = max(inflight_max, self._inflight_max[row])
+            if self._rss[row]:
+                rss = self._rss[row]
+            start = row * buckets
+            for i in range(buckets):
+                counts[i] += self._buckets[start + i]
+        span = last - first + 1
+
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            "requests": requests,
+            "request_rate": round(requests / span, 3),
+            "errors": errors,
+            "error_ratio": round(errors / requests, 4) if requests else 0.0,
+            "latency_avg_ms": ms(latency_sum / requests) if requests else None,
+            "latency_max_ms": ms(latency_max) if requests else None,
+            "latency_p50_ms": ms(self._quantile(counts, requests, 0.5, latency_max)),
+            "latency_p95_ms": ms(self._quantile(counts, requests, 0.95, latency_max)),
+            "latency_p99_ms": ms(self._quantile(counts, requests, 0.99, latency_max)),
+            "inflight_max": inflight_max,
+            "rss_bytes": rss,
+        }
+
+    def query(self, window: int = 60, step: int = 10) -> Dict[str, Any]:
+        """
+        Aggregates over the last `window` complete seconds, overall and in
+        `step`-second intervals (oldest first). The current second is still
+        filling up and is left out.
+        """
+        window = max(1, min(window, self.seconds - 1))
+        step = max(1, min(step, window))
+        last = int(self.clock()) - 1
+        first = last - window + 1
+        series = []
+        for start in range(first, last + 1, step):
+            end = min(start + step - 1, last)
+            point = self._aggregate(start, end)
+            point["timestamp"] = start
+            series.append(point)
+        return {
+            "window_seconds": window,
+            "step_seconds": step,
+            "end": last + 1,
+            "summary": self._aggregate(first, last),
+            "series": series,
+        }
@@ -0,0 +1,191 @@
+"""
+I/O Pressure
+Disk write, read and fsync load from a worker pool, for io_pressure chaos
+
+Each worker owns one scratch file in a fresh directory and alternates
+writes of `block_size` bytes with reads of a block it wrote earlier, calling
+fsync after every `fsync_every` writes (0 never syncs, leaving writeback to
+the kernel). Reads drop the file's page cache first where the platform
+allows it, so they reach the disk instead of memory.
+
+All workers share one pacer: operations are spaced so that neither
+`mb_per_second` nor `iops` is exceeded; on a slow disk the achieved rate is
+lower, which is what the byte, operation and fsync latency metrics show.
+Files wrap around at `max_bytes` split across workers, so the scratch space
+is bounded however long the session runs, and stop() removes the directory.
+
+Stopping a session that is mid-fsync on a slow disk can take seconds, and
+so can removing the scratch files: stop(wait=False) only signals the
+workers and leaves joining them and the cleanup to a background thread.
+"""
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class IOPressure:
+    """One I/O pressure session at a time over a bounded scratch directory"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024,
+                 workers: int = 4, block_size: int = 64 * 1024, bytes_counter=None,
+                 ops_counter=None, fsync_histogram=None, clock=time.monotonic):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.block_size = block_size
+        self.bytes_counter = bytes_counter
+        self.ops_counter = ops_counter
+        self.fsync_histogram = fsync_histogram
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._next_slot = 0.0
+        self.scratch: Optional[str] = None
+        self.mb_per_second = 0.0
+        self.iops = 0.0
+        self.fsync_every = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.totals = {"write_bytes": 0, "read_bytes": 0, "write": 0, "read": 0, "fsync": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self.scratch is not None
+
+    def start(self, mb_per_second: float, iops: float, fsync_every: int = 1) -> Dict[str, Any]:
+        """Create the scratch directory and start the workers"""
+        if mb_per_second <= 0 or iops <= 0:
+            raise ValueError("mb_per_second and iops must be positive")
+        if fsync_every < 0:
+            raise ValueError("fsync_every must not be negative")
+        with self._lock:
+            if self.running:
+                raise RuntimeError("I/O pressure is already running")
+            self.scratch = tempfile.mkdtemp(prefix="chaos-io-", dir=self.directory)
+            # A fresh event per session: workers of a stopped session that are
+            # still finishing a slow call must not be revived by this start
+            self._stop = threading.Event()
+            self.mb_per_second = mb_per_second
+            self.iops = iops
+            self.fsync_every = fsync_every
+            self.totals = dict.fromkeys(self.totals, 0)
+            self.started_at = self.clock()
+            self.stopped_at = None
+            self._next_slot = self.started_at
+            file_size = max(self.block_size, self.max_bytes // self.workers // self.block_size * self.block_size)
+            self._threads = [
+                threading.Thread(target=self._work,
+                                 args=(os.path.join(self.scratch, f"worker-{i}"), file_size, self._stop),
+                                 name=f"chaos-io-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self.status()
+
+    def stop(self, timeout: float = 5.0, wait: bool = True) -> Dict[str, Any]:
+        """Stop the workers and remove the scratch directory (in the background unless `wait`)"""
+        with self._lock:
+            stopping = self.running
+            if stopping:
+                self._stop.set()
+                threads, self._threads = self._threads, []
+                scratch, self.scratch = self.scratch, None
+                self.stopped_at = self.clock()
+        if stopping:
+            if wait:
+                self._clean_up(threads, scratch, timeout)
+            else:
+                threading.Thread(target=self._clean_up, args=(threads, scratch, timeout),
+                                 name="chaos-io-cleanup", daemon=True).start()
+        return self.status()
+
+    @staticmethod
+    def _clean_up(threads: List[threading.Thread], scratch: str, timeout: float):
+        # Workers take the lock for every operation, so this runs outside it
+        for thread in threads:
+            thread.join(timeout)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    def _wait_turn(self, stop: threading.Event) -> bool:
+        """Wait for the next operation slot; False once stopped"""
+        interval = max(1.0 / self.iops, self.block_size / (self.mb_per_second * 1024 * 1024))
+        with self._lock:
+            # Idle time is not saved up for a burst later
+            slot = max(self._next_slot, self.clock())
+            self._next_slot = slot + interval
+        delay = slot - self.clock()
+        if delay > 0:
+            return not stop.wait(delay)
+        return not stop.is_set()
+
+    def _record(self, op: str, size: int = 0):
+        with self._lock:
+            self.totals[op] += 1
+            if size:
+                self.totals[f"{op}_bytes"] += size
+        if self.ops_counter is not None:
+            self.ops_counter.labels(op=op).inc()
+        if size and self.bytes_counter is not None:
+            self.bytes_counter.labels(op=op).inc(size)
+
+    def _work(self, path: str, file_size: int, stop: threading.Event):
+        block = os.urandom(self.block_size)
+        blocks = file_size // self.block_size
+        written = 0
+        read_next = False
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            while self._wait_turn(stop):
+                try:
+                    if read_next and written:
+                        read_next = False
+                        offset = random.randrange(min(written, blocks)) * self.block_size
+                        if hasattr(os, "posix_fadvise"):
+                            os.posix_fadvise(fd, offset, self.block_size, os.POSIX_FADV_DONTNEED)
+                        self._record("read", len(os.pread(fd, self.block_size, offset)))
+                        continue
+                    read_next = True
+                    os.pwrite(fd, block, written % blocks * self.block_size)
+                    written += 1
+                    self._record("write", self.block_size)
+                    if self.fsync_every and written % self.fsync_every == 0:
+                        start = time.perf_counter()
+                        os.fsync(fd)
+                        if self.fsync_histogram is not None:
+                            self.fsync_histogram.observe(time.perf_counter() - start)
+                        self._record("fsync")
+                except OSError:
+                    # A full or failing disk is part of the scenario; keep the pace
+                    with self._lock:
+                        self.totals["errors"] += 1
+        finally:
+            os.close(fd)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = dict(self.totals)
+        end = self.clock() if self.running else self.stopped_at
+        elapsed = end - self.started_at if self.started_at is not None else 0.0
+
+        def rate(value: float) -> float:
+            return round(value / elapsed, 2) if elapsed > 0 else 0.0
+
+        return {
+            "running": self.running,
+            "directory": self.scratch,
+            "target": {"mb_per_second": self.mb_per_second, "iops": self.iops, "fsync_every": self.fsync_every},
+            "achieved": {
+                "write_mb_per_second": rate(totals["write_bytes"] / (1024 * 1024)),
+                "read_mb_per_second": rate(totals["read_bytes"] / (1024 * 1024)),
+                "iops": rate(totals["write"] + totals["read"]),
+                "fsyncs_per_second": rate(totals["fsync"]),
+            },
+            "totals": totals,
+            "elapsed_seconds": round(elapsed, 3),
+        }
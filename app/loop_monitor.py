@@ -0,0 +1,132 @@
+"""
+Event Loop Health Monitor
+Measures asyncio event-loop lag and detects blocking callbacks
+
+A monitor task sleeps for a fixed interval and records how late it wakes up.
+Any extra delay is time during which the loop was busy running something
+else - a synchronous call inside an async handler, a long GC pause or GIL
+contention from a CPU-bound thread.
+
+In debug mode a watchdog thread also checks the task's heartbeat. When the
+loop has been stuck for longer than the threshold it captures the stack of
+the event-loop thread, i.e. the callback that is blocking right now.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+
+class LoopMonitor:
+    """Sample event-loop lag and count callbacks that block past a threshold"""
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1, debug: bool = False,
+                 lag_histogram=None, slow_callback_counter=None, max_stacks: int = 5):
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self.lag_histogram = lag_histogram
+        self.slow_callback_counter = slow_callback_counter
+        self.max_stacks = max_stacks
+
+        self.samples = 0
+        self.slow_callbacks = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.slow_callback_stacks = []
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, lag: float):
+        """Record one lag observation"""
+        lag = max(0.0, lag)
+        self.samples += 1
+        self.last_lag = lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        if self.lag_histogram is not None:
+            self.lag_histogram.observe(lag)
+        if lag >= self.threshold:
+            self.slow_callbacks += 1
+            if self.slow_callback_counter is not None:
+                self.slow_callback_counter.inc()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - expected)
+
+    def _capture_stack(self) -> Optional[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        return "".join(traceback.format_stack(frame))
+
+    def _watch(self):
+        # Heartbeat only moves while the loop is responsive, so a stale
+        # heartbeat means some callback is still running
+        reported_heartbeat = None
+        while not self._stop.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for >= self.threshold and heartbeat != reported_heartbeat:
+                reported_heartbeat = heartbeat
+                stack = self._capture_stack()
+                if stack:
+                    self.slow_callback_stacks.append({
+                        "captured_at": time.time(),
+                        "stalled_for": stalled_for,
+                        "stack": stack,
+                    })
+                    del self.slow_callback_stacks[:-self.max_stacks]
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.debug:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        """Stop the monitor task and watchdog thread"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return current loop health for status endpoints"""
+        data = {
+            "monitoring": self.running,
+            "lag_last_ms": round(self.last_lag * 1000, 3),
+            "lag_max_ms": round(self.max_lag * 1000, 3),
+            "threshold_ms": round(self.threshold * 1000, 3),
+            "samples": self.samples,
+            "slow_callbacks": self.slow_callbacks,
+        }
+        if self.debug:
+            data["slow_callback_stacks"] = list(self.slow_callback_stacks)
+        return data
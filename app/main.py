@@ -3,30 +3,52 @@ Microservice Demo Application
 FastAPI-based REST API with health checks, metrics, and tracing
 """
 import asyncio
+import hmac
 import logging
 import os
+import socket
+import tempfile
 import time
 import math
 from contextlib import asynccontextmanager
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Set
 import threading
 import random
 import gc
 from datetime import datetime, timedelta
 
-from fastapi import FastAPI, Response, HTTPException, Request
+from fastapi import FastAPI, Response, HTTPException, Request, Depends, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY
 from opentelemetry import trace
-from opentelemetry.exporter.jaeger.thrift import JaegerExporter
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
 import structlog
 
 from config import settings
-from models import HelloResponse, HealthResponse
+from models import HelloResponse, HealthResponse, ReadinessResponse, HealingReport, HealingReportBatch, ChaosClusterState, ChaosEvent, StoredHealingReport, iso_timestamp
+from profiler import StackSampler, profile_lock
+from alloc_trace import AllocationTracer, TracingError
+from io_pressure import IOPressure
+from response_chaos import ResponseChaos, ResponseChaosMiddleware
+from chaos_cluster import ChaosCluster
+from loop_monitor import LoopMonitor
+from health_checks import HealthCheck, HealthChecker
+import server_timing
+from server_timing import ServerTimingMiddleware, phase
+from runtime_metrics import RuntimeCollector, read_rss
+from warmup import WARMUP_SCOPE_KEY, warm_up
+from concurrency_limit import GradientLimiter, ConcurrencyLimitMiddleware
+from rate_limit import RateLimiter, RateLimitMiddleware
+from coalescing import SingleFlight
+from drain import DrainController, DrainMiddleware
+from compression import CompressionMiddleware
+from content import NegotiatedResponse, NegotiatedRoute
+from body_limit import BodySizeLimitMiddleware
+from webhooks import WebhookDispatcher
+from history import MetricsHistory
+from metric_cache import LabelCache
+from healer import Healer, RequestWindow, RequestWindowMiddleware
+from sketches import LatencySketches
 
 # Configure structured logging
 structlog.configure(
@@ -49,13 +71,13 @@ structlog.configure(
 logger = structlog.get_logger()
 
 # Prometheus metrics - Handle multiple registrations gracefully
-def create_or_get_metric(metric_class, name, description, labelnames=None, registry=REGISTRY):
+def create_or_get_metric(metric_class, name, description, labelnames=None, registry=REGISTRY, **kwargs):
     """Create a metric or return existing one if already registered"""
     try:
         if labelnames:
-            return metric_class(name, description, labelnames, registry=registry)
+            return metric_class(name, description, labelnames, registry=registry, **kwargs)
         else:
-            return metric_class(name, description, registry=registry)
+            return metric_class(name, description, registry=registry, **kwargs)
     except ValueError as e:
         if "Duplicated timeseries" in str(e):
             # Metric already exists, find and return it
@@ -65,16 +87,66 @@ def create_or_get_metric(metric_class, name, description, labelnames=None, regis
             # If not found, create with a new registry for tests
             test_registry = CollectorRegistry()
             if labelnames:
-                return metric_class(name, description, labelnames, registry=test_registry)
+                return metric_class(name, description, labelnames, registry=test_registry, **kwargs)
             else:
-                return metric_class(name, description, registry=test_registry)
+                return metric_class(name, description, registry=test_registry, **kwargs)
         raise
 
+def register_collector(collector, registry=REGISTRY):
+    """Register a custom collector, ignoring duplicate registrations"""
+    try:
+        registry.register(collector)
+    except ValueError as e:
+        if "Duplicated timeseries" not in str(e):
+            raise
+    return collector
+
 REQUEST_COUNT = create_or_get_metric(Counter, 'http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
 REQUEST_DURATION = create_or_get_metric(Histogram, 'http_request_duration_seconds', 'HTTP request duration')
+# (method, path, status) -> http_requests_total child, resolved once per combination
+REQUEST_COUNT_CHILDREN = LabelCache(REQUEST_COUNT)
 ACTIVE_REQUESTS = create_or_get_metric(Gauge, 'http_requests_in_flight', 'Active HTTP requests')
 APPLICATION_READY = create_or_get_metric(Gauge, 'application_ready', 'Application readiness status')
 APPLICATION_HEALTHY = create_or_get_metric(Gauge, 'application_healthy', 'Application health status')
+CONCURRENCY_LIMIT = create_or_get_metric(Gauge, 'http_concurrency_limit', 'Current adaptive concurrency limit')
+REQUESTS_SHED = create_or_get_metric(Counter, 'http_requests_shed_total', 'Requests rejected by the concurrency limiter')
+REQUESTS_RATE_LIMITED = create_or_get_metric(
+    Counter, 'http_requests_rate_limited_total', 'Requests rejected by the per-client rate limiter', ['route']
+)
+REQUESTS_BODY_TOO_LARGE = create_or_get_metric(
+    Counter, 'http_requests_body_too_large_total', 'Requests rejected for exceeding the body size limit', ['path']
+)
+REQUESTS_COALESCED = create_or_get_metric(
+    Counter, 'http_requests_coalesced_total',
+    'Coalesced handler calls (leader runs the handler, followers share its result)', ['route', 'role']
+)
+APPLICATION_DRAINING = create_or_get_metric(Gauge, 'application_draining', 'Whether a graceful drain is in progress or done')
+DRAIN_DURATION = create_or_get_metric(Gauge, 'application_drain_duration_seconds', 'Duration of the last graceful drain')
+DRAIN_ABANDONED = create_or_get_metric(
+    Counter, 'application_drain_abandoned_requests_total', 'Requests still in flight when a drain deadline passed'
+)
+APPLICATION_WARMUP = create_or_get_metric(Gauge, 'application_warmup_seconds', 'Time spent warming up before readiness')
+REQUEST_PHASE_DURATION = create_or_get_metric(
+    Histogram, 'http_request_phase_duration_seconds', 'Time spent per request phase (Server-Timing enabled requests only)',
+    ['phase'],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+# Per-route latency quantiles for status endpoints (no Prometheus round-trip)
+latency_sketches = LatencySketches(
+    window=settings.LATENCY_SKETCH_WINDOW_SECONDS,
+    slots=settings.LATENCY_SKETCH_SLOTS,
+    relative_accuracy=settings.LATENCY_SKETCH_ACCURACY
+)
+
+# tracemalloc sessions for /admin/memory/trace
+allocation_tracer = AllocationTracer(
+    max_seconds=settings.ALLOC_TRACE_MAX_SECONDS,
+    max_frames=settings.ALLOC_TRACE_MAX_FRAMES
+)
+
+# Per-second request aggregates for /admin/metrics/history
+metrics_history = MetricsHistory(seconds=settings.METRICS_HISTORY_SECONDS)
 
 # Application state
 app_state = {
@@ -90,6 +162,9 @@ chaos_state = {
     "slow_responses_active": False,
     "error_injection_active": False,
     "cpu_spike_active": False,
+    "loop_block_active": False,
+    "io_pressure_active": False,
+    "response_stream_active": False,
     "memory_objects": [],
     "chaos_history": []
 }
@@ -98,11 +173,188 @@ chaos_state = {
 chaos_events_counter = create_or_get_metric(Counter, 'chaos_events_total', 'Total number of chaos events', ['chaos_type', 'event_type'])
 chaos_healing_counter = create_or_get_metric(Counter, 'chaos_healing_total', 'Total number of healing events', ['chaos_type', 'source'])
 chaos_memory_usage = create_or_get_metric(Gauge, 'chaos_memory_usage_mb', 'Current memory usage from chaos scenarios')
+chaos_time_to_recover = create_or_get_metric(
+    Histogram, 'chaos_time_to_recover_seconds', 'Time from a detected policy breach to recovery after self-healing',
+    ['chaos_type'], buckets=(0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+chaos_loop_block_seconds = create_or_get_metric(
+    Histogram, 'chaos_loop_block_seconds', 'Event loop time blocked by each loop_block chaos injection',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+chaos_io_bytes = create_or_get_metric(
+    Counter, 'chaos_io_bytes_total', 'Bytes written and read by io_pressure chaos', ['op']
+)
+chaos_io_operations = create_or_get_metric(
+    Counter, 'chaos_io_operations_total', 'Writes, reads and fsyncs done by io_pressure chaos', ['op']
+)
+chaos_io_fsync_seconds = create_or_get_metric(
+    Histogram, 'chaos_io_fsync_seconds', 'fsync latency under io_pressure chaos',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+chaos_cluster_convergence = create_or_get_metric(
+    Histogram, 'chaos_cluster_convergence_seconds', 'Time from publishing a cluster chaos state until every peer has it',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+chaos_cluster_version = create_or_get_metric(
+    Gauge, 'chaos_cluster_state_version', 'Version of the cluster chaos state held by this replica'
+)
+chaos_response_stream_counter = create_or_get_metric(
+    Counter, 'chaos_response_stream_total', 'Responses throttled, truncated or reset by response_stream chaos', ['mode']
+)
+healer_breaches_counter = create_or_get_metric(
+    Counter, 'healer_policy_breaches_total', 'Sustained healing policy breaches by signal', ['signal']
+)
 healing_reports_storage = []
 
+io_pressure = IOPressure(
+    directory=settings.CHAOS_IO_DIR,
+    max_bytes=settings.CHAOS_IO_MAX_MB * 1024 * 1024,
+    workers=settings.CHAOS_IO_WORKERS,
+    block_size=settings.CHAOS_IO_BLOCK_KB * 1024,
+    bytes_counter=chaos_io_bytes,
+    ops_counter=chaos_io_operations,
+    fsync_histogram=chaos_io_fsync_seconds
+)
+response_chaos = ResponseChaos()
+
+# Outbound webhook metrics
+WEBHOOK_EVENT_LATENCY = create_or_get_metric(
+    Histogram, 'webhook_event_delivery_seconds', 'Time from emitting an event to its acknowledgement by a receiver',
+    ['target'], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+WEBHOOK_REQUESTS = create_or_get_metric(
+    Counter, 'webhook_requests_total', 'Webhook delivery attempts by result', ['target', 'result']
+)
+WEBHOOK_EVENTS_DROPPED = create_or_get_metric(
+    Counter, 'webhook_events_dropped_total', 'Webhook events that were not delivered', ['reason']
+)
+WEBHOOK_QUEUE_DEPTH = create_or_get_metric(Gauge, 'webhook_queue_depth', 'Webhook events waiting for delivery')
+WEBHOOK_CIRCUIT_OPEN = create_or_get_metric(
+    Gauge, 'webhook_circuit_open', 'Whether the circuit breaker of a webhook receiver is open', ['target']
+)
+
+webhook_dispatcher = WebhookDispatcher(
+    settings.WEBHOOK_URLS,
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    flush_interval=settings.WEBHOOK_FLUSH_INTERVAL_MS / 1000.0,
+    queue_size=settings.WEBHOOK_QUEUE_SIZE,
+    timeout=settings.WEBHOOK_TIMEOUT,
+    max_retries=settings.WEBHOOK_MAX_RETRIES,
+    retry_base=settings.WEBHOOK_RETRY_BASE_MS / 1000.0,
+    retry_max=settings.WEBHOOK_RETRY_MAX_MS / 1000.0,
+    breaker_failures=settings.WEBHOOK_BREAKER_FAILURES,
+    breaker_reset=settings.WEBHOOK_BREAKER_RESET,
+    max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+    latency_histogram=WEBHOOK_EVENT_LATENCY,
+    requests_counter=WEBHOOK_REQUESTS,
+    dropped_counter=WEBHOOK_EVENTS_DROPPED,
+    queue_gauge=WEBHOOK_QUEUE_DEPTH,
+    circuit_gauge=WEBHOOK_CIRCUIT_OPEN
+)
+
+# Event loop health metrics
+EVENT_LOOP_LAG = create_or_get_metric(
+    Histogram, 'event_loop_lag_seconds', 'Event loop scheduling lag',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+EVENT_LOOP_SLOW_CALLBACKS = create_or_get_metric(
+    Counter, 'event_loop_slow_callbacks_total', 'Event loop stalls longer than the lag threshold'
+)
+
+# Process runtime metrics, computed at scrape time
+runtime_collector = RuntimeCollector(cache_ttl=settings.RUNTIME_METRICS_CACHE_SECONDS)
+if settings.RUNTIME_METRICS_ENABLED:
+    register_collector(runtime_collector)
+    runtime_collector.install()
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_MS / 1000.0,
+    threshold=settings.LOOP_LAG_THRESHOLD_MS / 1000.0,
+    debug=settings.LOOP_MONITOR_DEBUG or settings.LOG_LEVEL.upper() == "DEBUG",
+    lag_histogram=EVENT_LOOP_LAG,
+    slow_callback_counter=EVENT_LOOP_SLOW_CALLBACKS
+)
+
+def mark_not_ready():
+    """Take the pod out of rotation (first step of a drain)"""
+    app_state["ready"] = False
+    APPLICATION_READY.set(0)
+    logger.warning("Draining: readiness disabled")
+
+drain_controller = DrainController(
+    on_start=mark_not_ready,
+    duration_gauge=DRAIN_DURATION,
+    abandoned_counter=DRAIN_ABANDONED,
+    draining_gauge=APPLICATION_DRAINING
+)
+
+# Background readiness checks; /ready only reads health_checker.healthy
+HEALTH_CHECK_DURATION = create_or_get_metric(
+    Histogram, 'health_check_duration_seconds', 'Duration of background readiness checks', ['check']
+)
+HEALTH_CHECK_PASSING = create_or_get_metric(
+    Gauge, 'health_check_passing', 'Whether a background readiness check is passing (after hysteresis)', ['check']
+)
+
+async def check_event_loop():
+    """Fails when the event loop wakes up too late"""
+    loop = asyncio.get_running_loop()
+    expected = loop.time() + 0.01
+    await asyncio.sleep(0.01)
+    lag = max(0.0, loop.time() - expected)
+    if loop_monitor.running:
+        lag = max(lag, loop_monitor.last_lag)
+    if lag * 1000 > settings.HEALTH_CHECK_MAX_LOOP_LAG_MS:
+        raise RuntimeError(f"event loop lag {lag * 1000:.0f}ms over {settings.HEALTH_CHECK_MAX_LOOP_LAG_MS:g}ms")
+    return {"lag_ms": round(lag * 1000, 3)}
+
+def write_probe_file(directory: str):
+    fd, path = tempfile.mkstemp(prefix=".health-", dir=directory)
+    try:
+        os.write(fd, b"ok")
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+        os.unlink(path)
+
+async def check_disk():
+    """Fails when a small file cannot be written and fsynced"""
+    directory = settings.HEALTH_CHECK_DISK_DIR or tempfile.gettempdir()
+    await asyncio.to_thread(write_probe_file, directory)
+    return {"directory": directory}
+
+async def check_tracing():
+    """Fails when the Jaeger agent host does not resolve (spans go over UDP, so there is nothing to connect to)"""
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        settings.JAEGER_ENDPOINT, settings.JAEGER_PORT, type=socket.SOCK_DGRAM)
+    return {"agent": f"{settings.JAEGER_ENDPOINT}:{settings.JAEGER_PORT}", "addresses": len(infos)}
+
+HEALTH_CHECK_PROBES = {"event_loop": check_event_loop, "disk": check_disk}
+if settings.TRACING_ENABLED and settings.JAEGER_ENDPOINT:
+    HEALTH_CHECK_PROBES["tracing"] = check_tracing
+
+health_checker = HealthChecker(
+    [
+        HealthCheck(
+            name, probe,
+            interval=settings.HEALTH_CHECK_INTERVALS.get(name, 10.0),
+            timeout=settings.HEALTH_CHECK_TIMEOUT,
+            fall=settings.HEALTH_CHECK_FALL,
+            rise=settings.HEALTH_CHECK_RISE
+        )
+        for name, probe in HEALTH_CHECK_PROBES.items()
+    ],
+    latency_histogram=HEALTH_CHECK_DURATION,
+    status_gauge=HEALTH_CHECK_PASSING
+)
+
 def setup_tracing():
     """Configure OpenTelemetry tracing"""
     if settings.TRACING_ENABLED:
+        # SDK and exporter are imported here so they are never loaded when tracing is off
+        from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        
         resource = Resource(attributes={
             SERVICE_NAME: "microservice-demo"
         })
@@ -110,24 +362,67 @@ def setup_tracing():
         provider = TracerProvider(resource=resource)
         
         if settings.JAEGER_ENDPOINT:
+            from opentelemetry.exporter.jaeger.thrift import JaegerExporter
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            
             jaeger_exporter = JaegerExporter(
                 agent_host_name=settings.JAEGER_ENDPOINT,
-                agent_port=6831,
+                agent_port=settings.JAEGER_PORT,
             )
             span_processor = BatchSpanProcessor(jaeger_exporter)
             provider.add_span_processor(span_processor)
         
         trace.set_tracer_provider(provider)
 
+# Side-effect free GET routes exercised during warmup, once per negotiated format
+WARMUP_ROUTES = [
+    ("GET", "/api/v1/hello?name=warmup"),
+    ("GET", "/api/v1/status"),
+    ("GET", "/"),
+    ("GET", "/openapi.json"),
+] + [("GET", "/api/v1/status", {"Accept": media_type}) for media_type in settings.CONTENT_TYPES]
+
+def warmup_models():
+    """Response model instances used to prime serializers during warmup"""
+    now = time.time()
+    return [
+        HelloResponse(message="Hello, warmup!", timestamp=now, version=app_state["version"]),
+        HealthResponse(status="ready", timestamp=now, version=app_state["version"], uptime=0.0),
+    ]
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     logger.info("Starting microservice demo application", version=app_state["version"])
+    drain_controller.reset()
     setup_tracing()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    runtime_collector.attach_loop(asyncio.get_running_loop())
+    webhook_dispatcher.start()
+    if settings.HEALER_ENABLED:
+        healer.start()
+    if settings.METRICS_HISTORY_ENABLED:
+        metrics_history.start(read_rss)
+    if settings.CHAOS_CLUSTER_ENABLED:
+        # The first push also pulls the state of replicas that are already running
+        chaos_cluster.start()
     
-    # Simulate startup delay
-    await asyncio.sleep(2)
+    # Warm up routes, validators and encoders before accepting traffic
+    warmup = await warm_up(app, WARMUP_ROUTES, warmup_models())
+    APPLICATION_WARMUP.set(warmup["duration"])
+    logger.info("Warmup completed", duration=warmup["duration"], routes=warmup["routes"])
+    
+    if settings.HEALTH_CHECKS_ENABLED:
+        # First results are taken as is: a dependency down at startup keeps the pod unready
+        health_checker.reset()
+        await health_checker.run_all()
+        health_checker.start()
+        logger.info("Health checks started", failing=health_checker.failing)
+    
+    if settings.STARTUP_DELAY > 0:
+        await asyncio.sleep(settings.STARTUP_DELAY)
     app_state["ready"] = True
     APPLICATION_READY.set(1)
     APPLICATION_HEALTHY.set(1)
@@ -136,18 +431,45 @@ async def lifespan(app: FastAPI):
     
     yield
     
-    # Shutdown
+    # Shutdown. uvicorn closes its listeners and waits for open connections
+    # to finish before it runs lifespan shutdown, so by now nothing is in
+    # flight and this drain returns at once. Only the preStop hook, which
+    # calls /admin/drain while the server is still serving, actually drains;
+    # here the instance is merely marked drained if the hook did not run.
     logger.info("Shutting down application")
-    app_state["ready"] = False
-    APPLICATION_READY.set(0)
+    result = await drain_controller.drain(0, settings.DRAIN_TIMEOUT)
+    logger.info("Drain completed", **result)
+    await healer.stop()
+    await metrics_history.stop()
+    if allocation_tracer.running:
+        allocation_tracer.stop("shutdown")
+    # Leave no scratch files behind if io_pressure chaos is still running
+    await asyncio.to_thread(io_pressure.stop)
+    await chaos_cluster.stop()
+    await health_checker.stop()
+    await webhook_dispatcher.stop(settings.WEBHOOK_TIMEOUT)
+    await loop_monitor.stop()
+    runtime_collector.attach_loop(None)
 
 # Create FastAPI application
 app = FastAPI(
     title="Microservice Demo",
     description="A demo microservice with health checks, metrics, and tracing",
     version=app_state["version"],
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=NegotiatedResponse
 )
+# Routes answer in JSON, MessagePack or CBOR depending on Accept
+NegotiatedRoute.configure(settings)
+app.router.route_class = NegotiatedRoute
+
+# Cap request body sizes while the body streams in (innermost, next to the
+# handlers that read it)
+app.add_middleware(BodySizeLimitMiddleware, settings=settings, rejected_counter=REQUESTS_BODY_TOO_LARGE)
+
+# Compress large text responses. Added before CORS so that CORS headers are
+# still set per request for cached static payloads (the OpenAPI schema).
+app.add_middleware(CompressionMiddleware, settings=settings, static_paths=(app.openapi_url,))
 
 # Add CORS middleware
 app.add_middleware(
@@ -160,29 +482,47 @@ app.add_middleware(
 
 # Instrument FastAPI with OpenTelemetry
 if settings.TRACING_ENABLED:
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
     FastAPIInstrumentor.instrument_app(app)
 
 @app.middleware("http")
 async def metrics_middleware(request, call_next):
     """Middleware to collect Prometheus metrics"""
-    start_time = time.time()
+    if request.scope.get(WARMUP_SCOPE_KEY):
+        # Warmup exercises the stack before readiness; it is not traffic
+        return await call_next(request)
+    start_time = time.perf_counter()
     ACTIVE_REQUESTS.inc()
+    timings = server_timing.current()
+    history = settings.METRICS_HISTORY_ENABLED
+    if history:
+        metrics_history.begin()
+    status = 500
     
     try:
         response = await call_next(request)
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
+        status = response.status_code
+        
+        if timings is not None:
+            timings.add("app", duration)
+            handler_end = timings.marks.get("handler_end")
+            if handler_end is not None:
+                timings.add("serialize", time.perf_counter() - handler_end)
         
-        REQUEST_COUNT.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status=response.status_code
-        ).inc()
+        REQUEST_COUNT_CHILDREN.get(request.method, request.url.path, status).inc()
         
         REQUEST_DURATION.observe(duration)
+        if settings.LATENCY_SKETCH_ENABLED:
+            # The router leaves the matched route in the scope; group by its template
+            route = request.scope.get("route")
+            latency_sketches.record(route.path if route is not None else "unmatched", duration)
         
         return response
     finally:
         ACTIVE_REQUESTS.dec()
+        if history:
+            metrics_history.end(time.perf_counter() - start_time, status)
 
 # Health check endpoints
 @app.get("/healthz", response_model=HealthResponse, tags=["Health"])
@@ -199,15 +539,35 @@ async def liveness_check():
         version=app_state["version"]
     )
 
-@app.get("/ready", response_model=HealthResponse, tags=["Health"])
-async def readiness_check():
-    """Readiness probe endpoint"""
+@app.get("/ready", response_model=ReadinessResponse, response_model_exclude_none=True, tags=["Health"])
+async def readiness_check(response: Response = None, verbose: bool = False):
+    """
+    Readiness probe endpoint
+    
+    Reads the cached verdict of the background health checks; nothing is
+    checked inline. `?verbose=1` adds every check's state and latency and
+    answers 503 with that body instead of an error when not ready.
+    """
     logger.debug("Readiness check requested")
     
+    ready = app_state["ready"] and health_checker.healthy
+    if verbose:
+        if not ready and response is not None:
+            response.status_code = 503
+        return ReadinessResponse(
+            status="ready" if ready else "not_ready",
+            timestamp=time.time(),
+            version=app_state["version"],
+            uptime=time.time() - app_state["startup_time"],
+            checks=health_checker.snapshot()["checks"],
+            failing=health_checker.failing
+        )
     if not app_state["ready"]:
         raise HTTPException(status_code=503, detail="Application not ready")
+    if not ready:
+        raise HTTPException(status_code=503, detail=f"Health checks failing: {', '.join(health_checker.failing)}")
     
-    return HealthResponse(
+    return ReadinessResponse(
         status="ready",
         timestamp=time.time(),
         version=app_state["version"],
@@ -224,27 +584,36 @@ async def metrics():
     )
 
 # API endpoints
+single_flight = SingleFlight(settings, counter=REQUESTS_COALESCED)
+
 @app.get("/api/v1/hello", response_model=HelloResponse, tags=["API"])
+@single_flight.coalesce("/api/v1/hello")
 async def hello_world(name: str = "World"):
     """Hello world API endpoint"""
     tracer = trace.get_tracer(__name__)
     
-    with tracer.start_as_current_span("hello_request") as span:
+    with phase("trace"), tracer.start_as_current_span("hello_request") as span:
         span.set_attribute("user.name", name)
         
-        logger.info("Hello request received", name=name)
+        with phase("log"):
+            logger.info("Hello request received", name=name)
         
-        response = HelloResponse(
-            message=f"Hello, {name}!",
-            timestamp=time.time(),
-            version=app_state["version"]
-        )
+        with phase("validate"):
+            response = HelloResponse(
+                message=f"Hello, {name}!",
+                timestamp=time.time(),
+                version=app_state["version"]
+            )
         
         span.set_attribute("response.message", response.message)
-        
-        return response
+    
+    timings = server_timing.current()
+    if timings is not None:
+        timings.mark("handler_end")
+    return response
 
 @app.get("/api/v1/status", tags=["API"])
+@single_flight.coalesce("/api/v1/status")
 async def application_status():
     """Application status endpoint"""
     return {
@@ -253,10 +622,167 @@ async def application_status():
         "status": "running" if app_state["ready"] else "starting",
         "uptime": time.time() - app_state["startup_time"],
         "environment": settings.ENVIRONMENT,
-        "log_level": settings.LOG_LEVEL
+        "log_level": settings.LOG_LEVEL,
+        "event_loop": loop_monitor.snapshot(),
+        "rate_limits": rate_limiter.snapshot() if settings.RATE_LIMIT_ENABLED else None,
+        "latency_ms": latency_sketches.overall() if settings.LATENCY_SKETCH_ENABLED else None
     }
 
 # Admin endpoints
+async def verify_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Require the X-Admin-Token header on guarded endpoints when ADMIN_TOKEN is set"""
+    if settings.ADMIN_TOKEN and not (
+        x_admin_token and hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN)
+    ):
+        raise HTTPException(status_code=403, detail="Invalid or missing admin token")
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Require the X-Admin-Token header, refusing the endpoint entirely when ADMIN_TOKEN is unset"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoint disabled: ADMIN_TOKEN is not configured")
+    await verify_admin_token(x_admin_token)
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1")
+
+async def require_admin_token_or_loopback(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Require the X-Admin-Token header, or a loopback caller (the preStop hook) when ADMIN_TOKEN is unset"""
+    if settings.ADMIN_TOKEN:
+        await verify_admin_token(x_admin_token)
+    elif request.client is None or request.client.host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="ADMIN_TOKEN is not configured; only loopback callers are allowed")
+
+@app.get("/admin/latency", tags=["Admin"])
+async def latency_quantiles(q: Optional[List[float]] = Query(None)):
+    """
+    ⏱️ Latency quantiles per route over the sketch window
+    
+    Values are in milliseconds and within LATENCY_SKETCH_ACCURACY (relative)
+    of the true quantile. Pass q=0.999 (repeatable) for other quantiles.
+    """
+    if not settings.LATENCY_SKETCH_ENABLED:
+        raise HTTPException(status_code=404, detail="Latency sketches are disabled")
+    quantiles = q or [0.5, 0.95, 0.99]
+    if any(not 0.0 <= value <= 1.0 for value in quantiles):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    return latency_sketches.snapshot(quantiles)
+
+@app.get("/admin/metrics/history", tags=["Admin"])
+async def metrics_history_window(window: int = Query(60, ge=1), step: int = Query(10, ge=1)):
+    """
+    📈 Request rate, error ratio, latency, in-flight and RSS per second
+    
+    Aggregates over the last `window` complete seconds (at most
+    METRICS_HISTORY_SECONDS - 1) as a summary and as a series of `step`-second
+    points. Latency quantiles are bucket upper bounds in milliseconds.
+    """
+    if not settings.METRICS_HISTORY_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics history is disabled")
+    return metrics_history.query(window, step)
+
+@app.get("/admin/profile", tags=["Admin"], dependencies=[Depends(require_admin_token)])
+async def profile(
+    seconds: float = 5.0,
+    output_format: str = Query("collapsed", alias="format"),
+    interval_ms: float = 10.0
+):
+    """
+    🔬 Sample the stacks of all threads (event loop and chaos threads included)
+    
+    Returns collapsed stacks (format=collapsed, for flamegraph.pl / speedscope)
+    or a speedscope JSON document (format=speedscope). Only one profile can
+    run at a time. At the default 10ms interval the overhead is well under 1%
+    of a CPU core.
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not 0 < seconds <= settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be between 0 and {settings.PROFILE_MAX_SECONDS}"
+        )
+    if not 1.0 <= interval_ms <= 1000.0:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if output_format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail=f"Unknown profile format: {output_format}")
+    
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    try:
+        logger.info("Profiling started", seconds=seconds, interval_ms=interval_ms)
+        sampler = StackSampler(interval=interval_ms / 1000.0)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+        logger.info("Profiling finished", samples=sampler.sample_count)
+    finally:
+        profile_lock.release()
+    
+    if output_format == "speedscope":
+        return sampler.speedscope()
+    return PlainTextResponse(sampler.collapsed())
+
+def require_alloc_trace():
+    if not settings.ALLOC_TRACE_ENABLED:
+        raise HTTPException(status_code=404, detail="Allocation tracing is disabled")
+
+@app.post("/admin/memory/trace/start", tags=["Admin"],
+          dependencies=[Depends(require_admin_token), Depends(require_alloc_trace)])
+async def start_allocation_trace(seconds: float = 120.0, frames: int = 1):
+    """
+    🧠 Start tracemalloc and take the baseline snapshot
+    
+    Tracing slows every allocation down and holds the traces in memory, so
+    the session stops itself after `seconds` (ALLOC_TRACE_MAX_SECONDS at
+    most). `frames` > 1 records call stacks for group_by=traceback.
+    """
+    try:
+        status = await asyncio.to_thread(allocation_tracer.start, seconds, frames)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TracingError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info("Allocation tracing started", seconds=seconds, frames=frames)
+    return status
+
+@app.post("/admin/memory/trace/snapshot", tags=["Admin"],
+          dependencies=[Depends(require_admin_token), Depends(require_alloc_trace)])
+async def allocation_trace_snapshot(
+    top: int = Query(20, ge=1, le=100),
+    group_by: str = "lineno",
+    since: str = "start"
+):
+    """
+    📸 Snapshot allocations and return the top growth
+    
+    Groups (group_by=lineno, filename or traceback) are diffed against the
+    baseline (since=start) or the previous snapshot (since=previous) and
+    sorted by size growth.
+    """
+    try:
+        return await asyncio.to_thread(allocation_tracer.snapshot, top, group_by, since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TracingError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/memory/trace/stop", tags=["Admin"],
+          dependencies=[Depends(require_admin_token), Depends(require_alloc_trace)])
+async def stop_allocation_trace():
+    """⏹️ Stop tracing and drop the snapshots"""
+    try:
+        return allocation_tracer.stop()
+    except TracingError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/memory/trace", tags=["Admin"],
+         dependencies=[Depends(require_admin_token), Depends(require_alloc_trace)])
+async def allocation_trace_status():
+    """Current tracing session, if any"""
+    return allocation_tracer.status()
+
 @app.post("/admin/health/toggle", tags=["Admin"])
 async def toggle_health():
     """Toggle application health status (for testing)"""
@@ -264,11 +790,43 @@ async def toggle_health():
     APPLICATION_HEALTHY.set(1 if app_state["healthy"] else 0)
     
     logger.warning("Health status toggled", healthy=app_state["healthy"])
+    webhook_dispatcher.emit("health", healthy=app_state["healthy"])
     
     return {"healthy": app_state["healthy"]}
 
+@app.post("/admin/drain", tags=["Admin"], dependencies=[Depends(require_admin_token_or_loopback)])
+async def drain(
+    wait: bool = False,
+    propagation_delay: Optional[float] = None,
+    timeout: Optional[float] = None
+):
+    """
+    🚰 Gracefully drain this instance
+    
+    Disables readiness, waits `propagation_delay` seconds for endpoint
+    updates, then rejects new API requests and waits up to `timeout` seconds
+    for in-flight requests to finish. With wait=true the call returns when
+    the drain is done (use it from a preStop hook); otherwise it returns
+    immediately. A drain cannot be undone; the instance is expected to exit.
+    """
+    propagation_delay = settings.DRAIN_PROPAGATION_DELAY if propagation_delay is None else propagation_delay
+    timeout = settings.DRAIN_TIMEOUT if timeout is None else timeout
+    if propagation_delay < 0 or timeout < 0:
+        raise HTTPException(status_code=400, detail="propagation_delay and timeout must not be negative")
+    
+    if wait:
+        await drain_controller.drain(propagation_delay, timeout, from_request=True)
+    else:
+        drain_controller.start(propagation_delay, timeout)
+    return drain_controller.snapshot()
+
 @app.post("/admin/chaos/inject", tags=["chaos"])
-async def inject_chaos(chaos_type: str = "random"):
+async def inject_chaos(chaos_type: str = "random", block_ms: Optional[float] = None,
+                       interval_ms: Optional[float] = None, mb_per_second: Optional[float] = None,
+                       iops: Optional[float] = None, fsync_every: Optional[int] = None,
+                       mode: Optional[str] = None, bytes_per_second: Optional[int] = None,
+                       after_bytes: Optional[int] = None, route: Optional[str] = None,
+                       percent: Optional[float] = None):
     """
     🔴 CHAOS ENGINEERING: Inject problems into the system
     
@@ -277,8 +835,34 @@ async def inject_chaos(chaos_type: str = "random"):
     - slow_responses: Artificial delays in responses  
     - error_injection: Random 500 errors
     - cpu_spike: High CPU usage burst
-    - random: Randomly select one of the above
+    - loop_block: Blocking work on the event loop thread, block_ms every
+      interval_ms (not picked by random: it stalls every request and probe)
+    - io_pressure: Disk writes, reads and fsyncs at up to mb_per_second and
+      iops, with an fsync after every fsync_every writes (not picked by random)
+    - response_stream: mode=throttle (bytes_per_second), truncate or reset
+      (after_bytes) response bodies, for percent of the responses under
+      route (not picked by random)
+    - random: Randomly select one of the first four
+    
+    With CHAOS_CLUSTER_ENABLED the injection is pushed to every replica
+    (unless it was already active here, which applies nothing).
     """
+    params = dict(block_ms=block_ms, interval_ms=interval_ms, mb_per_second=mb_per_second, iops=iops,
+                  fsync_every=fsync_every, mode=mode, bytes_per_second=bytes_per_second,
+                  after_bytes=after_bytes, route=route, percent=percent)
+    params = {name: value for name, value in params.items() if value is not None}
+    result = await activate_chaos(chaos_type, **params)
+    # Only params that took effect here are published
+    if settings.CHAOS_CLUSTER_ENABLED and result["status"] != "already_active":
+        result["cluster"] = await chaos_cluster.publish(result["chaos_type"], params)
+    return result
+
+async def activate_chaos(chaos_type: str, block_ms: Optional[float] = None, interval_ms: Optional[float] = None,
+                         mb_per_second: Optional[float] = None, iops: Optional[float] = None,
+                         fsync_every: Optional[int] = None, mode: Optional[str] = None,
+                         bytes_per_second: Optional[int] = None, after_bytes: Optional[int] = None,
+                         route: Optional[str] = None, percent: Optional[float] = None) -> Dict[str, Any]:
+    """Activate one chaos scenario on this replica"""
     if not app_state["healthy"]:
         raise HTTPException(status_code=503, detail="Service unhealthy, chaos injection disabled")
     
@@ -314,16 +898,73 @@ async def inject_chaos(chaos_type: str = "random"):
             result["details"] = "CPU spike started - 30 seconds of high CPU usage"
         else:
             result["status"] = "already_active"
+    
+    elif chaos_type == "loop_block":
+        block_ms = settings.CHAOS_LOOP_BLOCK_MS if block_ms is None else block_ms
+        interval_ms = settings.CHAOS_LOOP_BLOCK_INTERVAL_MS if interval_ms is None else interval_ms
+        if not 0 < block_ms <= settings.CHAOS_LOOP_BLOCK_MAX_MS:
+            raise HTTPException(status_code=400,
+                                detail=f"block_ms must be between 0 and {settings.CHAOS_LOOP_BLOCK_MAX_MS:g}")
+        if interval_ms < 10:
+            raise HTTPException(status_code=400, detail="interval_ms must be at least 10")
+        if not chaos_state["loop_block_active"]:
+            chaos_state["loop_block_active"] = True
+            task = asyncio.create_task(loop_block_task(block_ms / 1000.0, interval_ms / 1000.0))
+            loop_block_tasks.add(task)
+            task.add_done_callback(loop_block_tasks.discard)
+            log_chaos_event("loop_block", "Event loop blocking started")
+            result["details"] = f"Event loop blocked for {block_ms:g}ms every {interval_ms:g}ms"
+        else:
+            result["status"] = "already_active"
+    
+    elif chaos_type == "io_pressure":
+        mb_per_second = settings.CHAOS_IO_MB_PER_SECOND if mb_per_second is None else mb_per_second
+        iops = settings.CHAOS_IO_IOPS if iops is None else iops
+        fsync_every = settings.CHAOS_IO_FSYNC_EVERY if fsync_every is None else fsync_every
+        if not chaos_state["io_pressure_active"]:
+            try:
+                # Creating the scratch directory touches the disk under test
+                await asyncio.to_thread(io_pressure.start, mb_per_second, iops, fsync_every)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except OSError as e:
+                raise HTTPException(status_code=400, detail=f"Cannot create I/O scratch directory: {e}")
+            except RuntimeError:
+                # A concurrent injection started it while this one waited
+                result["status"] = "already_active"
+                return result
+            chaos_state["io_pressure_active"] = True
+            log_chaos_event("io_pressure", "I/O pressure injection started")
+            fsync = f"fsync every {fsync_every} writes" if fsync_every else "no fsync"
+            result["details"] = (f"I/O pressure started - up to {mb_per_second:g}MB/s and {iops:g} IOPS, "
+                                 f"{fsync}")
+        else:
+            result["status"] = "already_active"
+    
+    elif chaos_type == "response_stream":
+        bytes_per_second = settings.CHAOS_STREAM_BYTES_PER_SECOND if bytes_per_second is None else bytes_per_second
+        after_bytes = settings.CHAOS_STREAM_AFTER_BYTES if after_bytes is None else after_bytes
+        route = "/" if route is None else route
+        percent = 100.0 if percent is None else percent
+        # Reconfiguring replaces the active rule
+        try:
+            response_chaos.configure(mode or "throttle", bytes_per_second, after_bytes, route, percent)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        chaos_state["response_stream_active"] = True
+        log_chaos_event("response_stream", f"Response stream chaos ({response_chaos.mode}) activated")
+        if response_chaos.mode == "throttle":
+            effect = f"bodies throttled to {bytes_per_second} bytes/s"
+        else:
+            effect = f"bodies {'truncated' if response_chaos.mode == 'truncate' else 'reset'} after {after_bytes} bytes"
+        result["details"] = f"Response stream chaos activated - {effect} for {percent:g}% of {route} responses"
     else:
         raise HTTPException(status_code=400, detail=f"Unknown chaos type: {chaos_type}")
     
     return result
 
-@app.post("/admin/chaos/heal", tags=["chaos"])
-async def heal_chaos():
-    """
-    ✅ CHAOS HEALING: Stop all chaos engineering problems
-    """
+def stop_all_chaos() -> List[str]:
+    """Stop every active chaos scenario; returns the actions taken"""
     healing_actions = []
     
     if chaos_state["memory_leak_active"]:
@@ -348,63 +989,237 @@ async def heal_chaos():
         healing_actions.append("cpu_spike_stopped")
         log_chaos_event("healing", "CPU spike stopped")
     
-    return {
+    if chaos_state["loop_block_active"]:
+        chaos_state["loop_block_active"] = False
+        for task in list(loop_block_tasks):
+            task.cancel()
+        healing_actions.append("loop_block_stopped")
+        log_chaos_event("healing", "Event loop blocking stopped")
+    
+    if chaos_state["io_pressure_active"]:
+        chaos_state["io_pressure_active"] = False
+        # Workers stuck in a slow fsync are joined and files removed off the event loop
+        io_pressure.stop(wait=False)
+        healing_actions.append("io_pressure_stopped")
+        log_chaos_event("healing", "I/O pressure stopped; scratch files are removed in the background")
+    
+    if chaos_state["response_stream_active"]:
+        chaos_state["response_stream_active"] = False
+        response_chaos.clear()
+        healing_actions.append("response_stream_stopped")
+        log_chaos_event("healing", "Response stream chaos disabled")
+    
+    return healing_actions
+
+@app.post("/admin/chaos/heal", tags=["chaos"])
+async def heal_chaos():
+    """
+    ✅ CHAOS HEALING: Stop all chaos engineering problems
+    """
+    healing_actions = stop_all_chaos()
+    
+    result = {
         "status": "healed",
         "actions_taken": healing_actions,
         "timestamp": datetime.now().isoformat(),
         "message": "All chaos scenarios stopped"
     }
+    if settings.CHAOS_CLUSTER_ENABLED:
+        result["cluster"] = await chaos_cluster.publish(None)
+    return result
+
+# Chaos types whose injection replaces the parameters of an active one
+RECONFIGURABLE_CHAOS = {"response_stream"}
+
+async def apply_cluster_chaos(chaos: Dict[str, Dict[str, Any]], previous: Dict[str, Dict[str, Any]]):
+    """Bring this replica in line with a newer cluster chaos state"""
+    # A type that is no longer wanted means a heal happened in between. Other
+    # types only answer already_active to new params, so they are restarted
+    changed = [chaos_type for chaos_type, params in previous.items()
+               if chaos.get(chaos_type, params) != params and chaos_type not in RECONFIGURABLE_CHAOS]
+    if not chaos or changed or any(chaos_type not in chaos for chaos_type in previous):
+        stop_all_chaos()
+        previous = {}
+    for chaos_type, params in chaos.items():
+        if chaos_type in previous and previous[chaos_type] == params:
+            continue
+        try:
+            await activate_chaos(chaos_type, **params)
+        except (HTTPException, TypeError) as e:
+            logger.warning("Cluster chaos not applied", chaos_type=chaos_type, error=str(getattr(e, "detail", e)))
+
+chaos_cluster = ChaosCluster(
+    settings.CHAOS_CLUSTER_NODE_ID or f"{socket.gethostname()}-{os.getpid()}",
+    apply_cluster_chaos,
+    peers=settings.CHAOS_CLUSTER_PEERS,
+    dns_name=settings.CHAOS_CLUSTER_DNS,
+    port=settings.CHAOS_CLUSTER_PORT,
+    timeout=settings.CHAOS_CLUSTER_TIMEOUT,
+    retries=settings.CHAOS_CLUSTER_RETRIES,
+    sync_interval=settings.CHAOS_CLUSTER_SYNC_INTERVAL,
+    headers={"X-Admin-Token": settings.ADMIN_TOKEN} if settings.ADMIN_TOKEN else None,
+    convergence_histogram=chaos_cluster_convergence,
+    version_gauge=chaos_cluster_version
+)
+
+async def require_chaos_cluster():
+    """404 unless cluster coordination is enabled"""
+    if not settings.CHAOS_CLUSTER_ENABLED:
+        raise HTTPException(status_code=404, detail="Chaos cluster coordination is disabled")
+
+@app.post("/admin/chaos/cluster/sync", tags=["chaos"],
+          dependencies=[Depends(verify_admin_token), Depends(require_chaos_cluster)])
+async def chaos_cluster_sync(state: ChaosClusterState):
+    """
+    🔁 Receive the cluster chaos state pushed by a peer
+    
+    Applied only if newer than the state held here (by version, then
+    origin); answers with the state held afterwards either way.
+    """
+    return await chaos_cluster.receive(state.model_dump())
+
+@app.get("/admin/chaos/cluster", tags=["chaos"], dependencies=[Depends(require_chaos_cluster)])
+async def chaos_cluster_status():
+    """
+    🌐 Cluster chaos state, peers and the last push
+    """
+    return dict(chaos_cluster.snapshot(), peers=await chaos_cluster.peers())
+
+def active_chaos_types() -> List[str]:
+    """Chaos scenarios that are currently active"""
+    return [
+        chaos_type
+        for chaos_type in ("memory_leak", "slow_responses", "error_injection", "cpu_spike", "loop_block",
+                           "io_pressure", "response_stream")
+        if chaos_state[f"{chaos_type}_active"]
+    ]
 
 @app.get("/admin/chaos/status", tags=["chaos"])
 async def chaos_status():
     """
     📊 Get current chaos engineering status
     """
-    active_chaos = []
-    if chaos_state["memory_leak_active"]:
-        active_chaos.append("memory_leak")
-    if chaos_state["slow_responses_active"]:
-        active_chaos.append("slow_responses")
-    if chaos_state["error_injection_active"]:
-        active_chaos.append("error_injection")
-    if chaos_state["cpu_spike_active"]:
-        active_chaos.append("cpu_spike")
+    active_chaos = active_chaos_types()
     
     return {
         "active_chaos": active_chaos,
         "chaos_count": len(active_chaos),
         "memory_objects_count": len(chaos_state["memory_objects"]),
-        "recent_events": chaos_state["chaos_history"][-10:],  # Last 10 events
+        "recent_events": [dict(event) for event in chaos_state["chaos_history"][-10:]],  # Last 10 events
         "system_impact": {
             "any_chaos_active": len(active_chaos) > 0,
             "estimated_memory_usage_mb": len(chaos_state["memory_objects"]),
-            "performance_degraded": chaos_state["slow_responses_active"] or chaos_state["cpu_spike_active"]
-        }
+            "performance_degraded": (chaos_state["slow_responses_active"] or chaos_state["cpu_spike_active"]
+                                     or chaos_state["loop_block_active"] or chaos_state["io_pressure_active"]
+                                     or chaos_state["response_stream_active"])
+        },
+        "io_pressure": io_pressure.status(),
+        "response_stream": response_chaos.snapshot(),
+        "healer": dict(healer.snapshot(), enabled=settings.HEALER_ENABLED)
     }
 
+HEALING_REPORTS_KEPT = 100
+
+def ingest_healing_report(report: HealingReport, stored_at: float, source: str = "n8n_workflow") -> str:
+    """Store one validated report and count it; returns its chaos type"""
+    healing_reports_storage.append(StoredHealingReport(report, stored_at, source))
+    chaos_type = report.original_alert.chaos_type
+    chaos_healing_counter.labels(chaos_type=chaos_type, source=source).inc()
+    return chaos_type
+
+def trim_healing_reports():
+    """Keep only the most recent reports"""
+    if len(healing_reports_storage) > HEALING_REPORTS_KEPT:
+        del healing_reports_storage[:-HEALING_REPORTS_KEPT]
+
+def store_self_healing_report(chaos_type: str, actions: List[str], breaches: Dict[str, float]):
+    """Record an action of the in-process healer as a healing report"""
+    now = datetime.now()
+    summary = ", ".join(f"{signal}={value:.3g}" for signal, value in breaches.items())
+    report = HealingReport(
+        workflow_id=f"self-{now.strftime('%Y%m%dT%H%M%S.%f')}",
+        timestamp=now.isoformat(),
+        original_alert={"chaos_type": chaos_type, "severity": "critical", "summary": f"Policy breach: {summary}"},
+        healing_performed={"actions_taken": actions, "healing_endpoint_called": False, "immediate_heal_executed": True},
+        overall_status="success" if actions else "failed"
+    )
+    ingest_healing_report(report, now.timestamp(), source="self")
+    trim_healing_reports()
+    log_chaos_event("self_healing", f"Healed {chaos_type} after policy breach: {summary}")
+    logger.warning("Self-healing executed", chaos_type=chaos_type, actions=actions, breaches=breaches)
+
+request_window = RequestWindow(seconds=settings.HEALER_WINDOW_SECONDS)
+cluster_heal_tasks: Set[asyncio.Task] = set()
+
+def heal_for_healer() -> List[str]:
+    """Healer heals are cluster-wide, like /admin/chaos/heal, when coordination is on"""
+    healing_actions = stop_all_chaos()
+    if settings.CHAOS_CLUSTER_ENABLED:
+        # The healer checks synchronously; the publish runs beside it
+        task = asyncio.get_running_loop().create_task(chaos_cluster.publish(None))
+        cluster_heal_tasks.add(task)
+        task.add_done_callback(cluster_heal_tasks.discard)
+    return healing_actions
+
+healer = Healer(
+    request_window,
+    heal=heal_for_healer,
+    active_chaos=active_chaos_types,
+    report=store_self_healing_report,
+    rss_reader=read_rss,
+    check_interval=settings.HEALER_CHECK_INTERVAL_MS / 1000.0,
+    breach_checks=settings.HEALER_BREACH_CHECKS,
+    cooldown=settings.HEALER_COOLDOWN_SECONDS,
+    min_requests=settings.HEALER_MIN_REQUESTS,
+    max_error_rate=settings.HEALER_MAX_ERROR_RATE,
+    max_p95=settings.HEALER_MAX_P95_MS / 1000.0,
+    max_loop_lag=settings.HEALER_MAX_LOOP_LAG_MS / 1000.0,
+    max_rss=None if settings.HEALER_MAX_RSS_MB is None else settings.HEALER_MAX_RSS_MB * 1024 * 1024,
+    recover_histogram=chaos_time_to_recover,
+    breach_counter=healer_breaches_counter
+)
+
 @app.post("/admin/healing-report", tags=["chaos"])
-async def store_healing_report(report: dict):
+async def store_healing_report(report: HealingReport):
     """
     📤 Store healing report from n8n workflow
     """
-    report["stored_at"] = datetime.now().isoformat()
-    healing_reports_storage.append(report)
-    
-    # Keep only last 100 reports
-    if len(healing_reports_storage) > 100:
-        healing_reports_storage[:] = healing_reports_storage[-100:]
-    
-    # Update metrics
-    chaos_type = report.get("original_alert", {}).get("chaos_type", "unknown")
-    chaos_healing_counter.labels(chaos_type=chaos_type, source="n8n_workflow").inc()
+    stored_at = time.time()
+    chaos_type = ingest_healing_report(report, stored_at)
+    trim_healing_reports()
     
     log_chaos_event("healing_report", f"Stored healing report for {chaos_type}")
     
     return {
         "status": "stored",
-        "report_id": report.get("workflow_id"),
+        "report_id": report.workflow_id,
         "chaos_type": chaos_type,
-        "timestamp": report["stored_at"]
+        "timestamp": iso_timestamp(stored_at)
+    }
+
+@app.post("/admin/healing-reports:batch", tags=["chaos"])
+async def store_healing_reports_batch(batch: HealingReportBatch):
+    """
+    📦 Store many healing reports in one request
+    
+    Each report is validated like a single POST /admin/healing-report; the
+    whole batch is rejected (422) if any report is invalid.
+    """
+    stored_at = time.time()
+    chaos_types: Dict[str, int] = {}
+    for report in batch.reports:
+        chaos_type = ingest_healing_report(report, stored_at)
+        chaos_types[chaos_type] = chaos_types.get(chaos_type, 0) + 1
+    trim_healing_reports()
+    
+    log_chaos_event("healing_report", f"Stored {len(batch.reports)} healing reports")
+    
+    return {
+        "status": "stored",
+        "stored": len(batch.reports),
+        "report_ids": [report.workflow_id for report in batch.reports],
+        "chaos_types": chaos_types,
+        "timestamp": iso_timestamp(stored_at)
     }
 
 @app.get("/admin/healing-reports", tags=["chaos"])
@@ -414,7 +1229,7 @@ async def get_healing_reports():
     """
     return {
         "total_reports": len(healing_reports_storage),
-        "reports": healing_reports_storage[-10:],  # Last 10 reports
+        "reports": [dict(report) for report in healing_reports_storage[-10:]],  # Last 10 reports
         "summary": {
             "successful_healings": len([r for r in healing_reports_storage if r.get("overall_status") == "success"]),
             "partial_healings": len([r for r in healing_reports_storage if r.get("overall_status") == "partial_success"]),
@@ -442,32 +1257,92 @@ async def root():
 async def chaos_middleware(request: Request, call_next):
     """Middleware to inject chaos into responses"""
     
-    # Skip chaos for admin and monitoring endpoints
-    if request.url.path.startswith(("/admin", "/healthz", "/ready", "/metrics")):
+    # Skip chaos for admin and monitoring endpoints and for warmup
+    if request.url.path.startswith(("/admin", "/healthz", "/ready", "/metrics")) or request.scope.get(WARMUP_SCOPE_KEY):
         response = await call_next(request)
         return response
     
     # Error injection chaos
     if chaos_state["error_injection_active"] and random.random() < 0.3:  # 30% chance
-        log_chaos_event("error_injection", f"Injected 500 error for {request.url.path}")
+        # Per-request injections are not pushed to webhooks: the activation
+        # event already was, and one event per request would flood receivers
+        log_chaos_event("error_injection", f"Injected 500 error for {request.url.path}", notify=False)
         raise HTTPException(status_code=500, detail="Chaos-induced server error")
     
     # Slow response chaos
     if chaos_state["slow_responses_active"]:
         delay = random.uniform(2, 5)  # 2-5 second delay
+        request.state.chaos_delay = delay  # Not real load; the concurrency limiter ignores it
         await asyncio.sleep(delay)
-        log_chaos_event("slow_responses", f"Injected {delay:.2f}s delay for {request.url.path}")
+        log_chaos_event("slow_responses", f"Injected {delay:.2f}s delay for {request.url.path}", notify=False)
     
     response = await call_next(request)
     return response
 
-def log_chaos_event(event_type: str, details: str):
-    """Log chaos engineering events"""
-    chaos_state["chaos_history"].append({
-        "timestamp": datetime.now().isoformat(),
-        "event_type": event_type,
-        "details": details
-    })
+# Feeds the healer's sliding window. Added right after the chaos middleware so
+# that it wraps it and sees injected errors and delays like a client would.
+app.add_middleware(
+    RequestWindowMiddleware,
+    window=request_window,
+    settings=settings,
+    exempt_prefixes=("/admin", "/healthz", "/ready", "/metrics")
+)
+
+# Adaptive concurrency limit. It wraps the other middleware so that shed
+# requests cost as little as possible; injected chaos delays are subtracted
+# from its latency samples. Probes and admin endpoints are always admitted.
+concurrency_limiter = GradientLimiter(
+    initial_limit=settings.CONCURRENCY_LIMIT_INITIAL,
+    min_limit=settings.CONCURRENCY_LIMIT_MIN,
+    max_limit=settings.CONCURRENCY_LIMIT_MAX,
+    queue_delay_target=settings.CONCURRENCY_QUEUE_DELAY_TARGET_MS / 1000.0
+)
+CONCURRENCY_LIMIT.set(concurrency_limiter.current_limit)
+app.add_middleware(
+    ConcurrencyLimitMiddleware,
+    limiter=concurrency_limiter,
+    settings=settings,
+    exempt_paths=("/healthz", "/ready", "/metrics"),
+    exempt_prefixes=("/admin/",),
+    limit_gauge=CONCURRENCY_LIMIT,
+    shed_counter=REQUESTS_SHED
+)
+
+# Per-client rate limits. Added after the concurrency limiter so that a
+# client over its own limit is rejected before it can take a shared slot.
+rate_limiter = RateLimiter(settings.RATE_LIMIT_RULES, max_clients=settings.RATE_LIMIT_MAX_CLIENTS)
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=rate_limiter,
+    settings=settings,
+    limited_counter=REQUESTS_RATE_LIMITED
+)
+
+# Counts in-flight requests for the drain. Once a drain stops accepting
+# work, new requests get 503 before anything else runs; probes, metrics and
+# admin endpoints are still served.
+app.add_middleware(
+    DrainMiddleware,
+    controller=drain_controller,
+    exempt_paths=("/healthz", "/ready", "/metrics"),
+    exempt_prefixes=("/admin/",)
+)
+
+# Response stream chaos acts on the bytes as they leave, after compression
+# and outside everything that measures the application itself
+app.add_middleware(
+    ResponseChaosMiddleware,
+    chaos=response_chaos,
+    exempt_prefixes=("/admin", "/healthz", "/ready", "/metrics"),
+    affected_counter=chaos_response_stream_counter
+)
+
+# Server-Timing must wrap every other middleware, so it is added last
+app.add_middleware(ServerTimingMiddleware, settings=settings, histogram=REQUEST_PHASE_DURATION)
+
+def log_chaos_event(event_type: str, details: str, notify: bool = True):
+    """Log chaos engineering events (and push them to webhooks unless notify=False)"""
+    chaos_state["chaos_history"].append(ChaosEvent(event_type, details, time.time()))
     # Keep only last 50 events
     if len(chaos_state["chaos_history"]) > 50:
         chaos_state["chaos_history"] = chaos_state["chaos_history"][-50:]
@@ -477,12 +1352,16 @@ def log_chaos_event(event_type: str, details: str):
     
     # Update memory usage gauge
     chaos_memory_usage.set(len(chaos_state["memory_objects"]))
+    
+    if notify:
+        webhook_dispatcher.emit("chaos", event_type=event_type, details=details)
 
 def memory_leak_thread():
     """Create a memory leak by allocating objects"""
     while chaos_state["memory_leak_active"]:
-        # Allocate 1MB of data every second
-        data = ["x" * 1024 for _ in range(1024)]
+        # Allocate 1MB of data every second (a literal "x" * 1024 would be
+        # folded into one shared constant, leaking only the list)
+        data = [bytes(1024) for _ in range(1024)]
         chaos_state["memory_objects"].append(data)
         time.sleep(1)
         if len(chaos_state["memory_objects"]) > 100:  # Limit to ~100MB
@@ -497,6 +1376,19 @@ def cpu_spike_thread():
             math.sqrt(i * random.random())
     chaos_state["cpu_spike_active"] = False
 
+loop_block_tasks: Set[asyncio.Task] = set()
+
+async def loop_block_task(block: float, interval: float):
+    """Block the event loop thread for `block` seconds every `interval` seconds"""
+    while chaos_state["loop_block_active"]:
+        await asyncio.sleep(interval)
+        if not chaos_state["loop_block_active"]:
+            break
+        start = time.perf_counter()
+        # Deliberately synchronous: every request, probe and timer waits
+        time.sleep(block)
+        chaos_loop_block_seconds.observe(time.perf_counter() - start)
+
 if __name__ == "__main__":
     import uvicorn
     import asyncio
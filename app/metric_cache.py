@@ -0,0 +1,44 @@
+"""
+Metric Child Cache
+Resolve labelled Prometheus children once instead of on every request
+
+`metric.labels(method=..., endpoint=..., status=...)` validates the keyword
+names, converts every value with str(), builds a tuple and looks the child
+up under the metric's lock, on every call. LabelCache keeps the children it
+has seen in a plain dict keyed by the raw label values, so a repeat lookup
+is a single dict.get (atomic under the GIL, no lock). Misses go through
+labels(), which creates or returns the same child, so two threads missing at
+once store the same object and exposition is unchanged.
+
+Values that str() differently but map to the same label (200 and "200")
+get separate cache entries pointing to the same child. The cache holds at
+most `max_size` entries; beyond that lookups fall back to labels() so that
+unbounded label values (raw paths of 404 scans) do not grow it.
+"""
+from typing import Any, Dict, Tuple
+
+
+class LabelCache:
+    """Label values (positional, in labelnames order) -> child metric"""
+
+    __slots__ = ("metric", "max_size", "_children")
+
+    def __init__(self, metric, max_size: int = 4096):
+        self.metric = metric
+        self.max_size = max_size
+        self._children: Dict[Tuple[Any, ...], Any] = {}
+
+    def get(self, *values):
+        """Child for the label values, as metric.labels(*values)"""
+        child = self._children.get(values)
+        if child is None:
+            child = self.metric.labels(*values)
+            if len(self._children) < self.max_size:
+                self._children[values] = child
+        return child
+
+    def clear(self):
+        self._children.clear()
+
+    def __len__(self) -> int:
+        return len(self._children)
@@ -1,8 +1,11 @@
 """
 Pydantic Models for API Responses
 """
-from pydantic import BaseModel
-from typing import Optional
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
 class HelloResponse(BaseModel):
@@ -38,4 +41,226 @@ class HealthResponse(BaseModel):
                 "version": "1.0.0",
                 "uptime": 3600.0
             }
-        } 
\ No newline at end of file
+        }
+
+
+class ReadinessResponse(HealthResponse):
+    """Readiness probe response; checks and failing only with ?verbose=1"""
+    checks: Optional[Dict[str, Dict[str, Any]]] = None
+    failing: Optional[List[str]] = None
+
+
+# Healing reports posted by the n8n workflow. Every string and list is
+# bounded so that one report has a known maximum size; unknown fields (such
+# as the raw responses of the validation requests) are dropped.
+class HealingAlert(BaseModel):
+    """The alert a healing run responded to"""
+    model_config = ConfigDict(extra="ignore")
+
+    chaos_type: str = Field("unknown", max_length=64)
+    severity: Optional[str] = Field(None, max_length=32)
+    summary: Optional[str] = Field(None, max_length=1024)
+
+
+class HealingActions(BaseModel):
+    """What the workflow did to heal the service"""
+    model_config = ConfigDict(extra="ignore")
+
+    actions_taken: List[str] = Field(default_factory=list, max_length=50)
+    healing_endpoint_called: Optional[bool] = None
+    immediate_heal_executed: Optional[bool] = None
+
+
+class HealingAnalysis(BaseModel):
+    """Summary of the AI analysis step"""
+    model_config = ConfigDict(extra="ignore")
+
+    suggestions_received: Optional[bool] = None
+    analysis_summary: Optional[str] = Field(None, max_length=2048)
+
+
+class HealingTestResult(BaseModel):
+    """Outcome of one post-healing check"""
+    model_config = ConfigDict(extra="ignore")
+
+    endpoint: str = Field(..., max_length=256)
+    status: str = Field(..., max_length=32)
+
+
+class HealingValidation(BaseModel):
+    """Post-healing checks"""
+    model_config = ConfigDict(extra="ignore")
+
+    tests_total: int = Field(0, ge=0)
+    tests_passed: int = Field(0, ge=0)
+    tests_failed: int = Field(0, ge=0)
+    success_rate: Optional[str] = Field(None, max_length=16)
+    detailed_results: List[HealingTestResult] = Field(default_factory=list, max_length=50)
+
+
+class HealingReport(BaseModel):
+    """Healing report as posted by the n8n workflow"""
+    model_config = ConfigDict(
+        extra="ignore",
+        json_schema_extra={
+            "example": {
+                "workflow_id": "1700000000000",
+                "timestamp": "2024-01-01T00:00:00.000Z",
+                "original_alert": {"chaos_type": "memory_leak", "severity": "warning"},
+                "healing_performed": {"actions_taken": ["Stopped memory leak"]},
+                "overall_status": "success"
+            }
+        }
+    )
+
+    workflow_id: Optional[str] = Field(None, max_length=128)
+    timestamp: Optional[str] = Field(None, max_length=64)
+    original_alert: HealingAlert = Field(default_factory=HealingAlert)
+    healing_performed: Optional[HealingActions] = None
+    cursor_analysis: Optional[HealingAnalysis] = None
+    validation_results: Optional[HealingValidation] = None
+    overall_status: str = Field("unknown", max_length=32)
+    recommendations: Optional[str] = Field(None, max_length=2048)
+
+
+class HealingReportBatch(BaseModel):
+    """Several healing reports ingested in one request"""
+    reports: List[HealingReport] = Field(..., min_length=1, max_length=500)
+
+
+class ChaosClusterState(BaseModel):
+    """Desired chaos of the whole cluster, as replicas push it to each other"""
+    version: int = Field(..., ge=0)
+    origin: str = Field(..., max_length=256)
+    # Chaos type -> the parameters it was injected with
+    chaos: Dict[str, Dict[str, Any]] = Field(default_factory=dict, max_length=32)
+    updated_at: float = 0.0
+
+
+# Stored chaos events and healing reports. The service keeps these in memory,
+# so they are held as slotted records rather than dicts: timestamps as float
+# seconds, codes (types, statuses, action names) interned so that repeats
+# share one object, nested report sections as tuples in field order.
+# Records are read-only mappings; values such as ISO timestamps and the
+# nested dicts are rendered when a key is read, i.e. when an endpoint returns
+# the record with dict(record).
+
+
+def iso_timestamp(seconds: float) -> str:
+    """Local time ISO string, as datetime.now().isoformat() gives"""
+    return datetime.fromtimestamp(seconds).isoformat()
+
+
+# Fields holding codes (types, statuses, action names, endpoints); their
+# strings are interned. Free text and identifiers are kept as they are.
+_INTERNED_FIELDS = frozenset({"chaos_type", "severity", "actions_taken", "endpoint", "status", "success_rate"})
+_SECTION_FIELDS = {}
+
+
+def _compact(name: str, value: Any) -> Any:
+    kind = type(value)
+    if kind is str:
+        return sys.intern(value) if name in _INTERNED_FIELDS else value
+    if kind is list:
+        return tuple([_compact(name, item) for item in value])
+    if kind in _SECTION_FIELDS:
+        return _section(value)
+    return value
+
+
+def _section(model: Optional[BaseModel]) -> Optional[Tuple[Any, ...]]:
+    """Field values of a model in field order, or None"""
+    if model is None:
+        return None
+    return tuple([_compact(name, getattr(model, name)) for name in _SECTION_FIELDS[type(model)]])
+
+
+def _render(fields: Tuple[str, ...], values: Tuple[Any, ...]) -> dict:
+    """The dict model_dump(exclude_none=True) gives for a section"""
+    rendered = {}
+    for name, value in zip(fields, values):
+        if value is None:
+            continue
+        if isinstance(value, tuple):
+            nested = _NESTED_FIELDS.get(name)
+            value = [_render(nested, item) if nested else item for item in value]
+        rendered[name] = value
+    return rendered
+
+
+_SECTION_FIELDS.update(
+    (model, tuple(model.model_fields))
+    for model in (HealingAlert, HealingActions, HealingAnalysis, HealingTestResult, HealingValidation)
+)
+_NESTED_FIELDS = {"detailed_results": _SECTION_FIELDS[HealingTestResult]}
+_REPORT_SECTIONS = {
+    "original_alert": _SECTION_FIELDS[HealingAlert],
+    "healing_performed": _SECTION_FIELDS[HealingActions],
+    "cursor_analysis": _SECTION_FIELDS[HealingAnalysis],
+    "validation_results": _SECTION_FIELDS[HealingValidation],
+}
+
+
+class ChaosEvent(Mapping):
+    """One entry of the chaos history: timestamp, event_type, details"""
+
+    __slots__ = ("created", "event_type", "details")
+    _KEYS = ("timestamp", "event_type", "details")
+
+    def __init__(self, event_type: str, details: str, created: float):
+        self.created = created
+        self.event_type = sys.intern(event_type)
+        self.details = details
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "timestamp":
+            return iso_timestamp(self.created)
+        if key == "event_type":
+            return self.event_type
+        if key == "details":
+            return self.details
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+
+class StoredHealingReport(Mapping):
+    """A validated HealingReport plus when and from where it was stored"""
+
+    __slots__ = ("workflow_id", "timestamp", "original_alert", "healing_performed", "cursor_analysis",
+                 "validation_results", "overall_status", "recommendations", "stored_at", "source")
+    # Keys in the order of HealingReport.model_dump() followed by the storage fields
+    _KEYS = __slots__
+
+    def __init__(self, report: HealingReport, stored_at: float, source: str):
+        self.workflow_id = report.workflow_id
+        self.timestamp = report.timestamp
+        self.original_alert = _section(report.original_alert)
+        self.healing_performed = _section(report.healing_performed)
+        self.cursor_analysis = _section(report.cursor_analysis)
+        self.validation_results = _section(report.validation_results)
+        self.overall_status = sys.intern(report.overall_status)
+        self.recommendations = report.recommendations
+        self.stored_at = stored_at
+        self.source = sys.intern(source)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        if key == "stored_at":
+            return iso_timestamp(value)
+        fields = _REPORT_SECTIONS.get(key)
+        return _render(fields, value) if fields else value
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self._KEYS if getattr(self, key) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
@@ -0,0 +1,126 @@
+"""
+Statistical Stack Sampler
+Low-overhead wall-clock profiler for diagnosing a running process
+
+A background thread wakes up every `interval` seconds, snapshots the current
+frame of every thread with sys._current_frames() and counts identical stacks.
+Nothing is installed in the profiled code (no sys.setprofile / settrace), so
+threads run at full speed between samples.
+
+Overhead: each sample holds the GIL for roughly 10-50 microseconds per thread
+(proportional to stack depth). At the default 100 Hz with a handful of
+threads this is well under 1% of one CPU core. Memory is bounded by the
+number of distinct stacks, not the number of samples.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+# Only one profile may run per process; acquire non-blocking before sampling
+profile_lock = threading.Lock()
+
+# A frame is (function name, filename, line number)
+Frame = Tuple[str, str, int]
+
+
+class StackSampler:
+    """Periodically sample the stacks of all threads in the process"""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _walk(self, frame) -> Tuple[Frame, ...]:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((getattr(code, "co_qualname", code.co_name), code.co_filename, frame.f_lineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def sample_once(self):
+        """Record one snapshot of every thread except the sampler itself"""
+        own_ident = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            thread_name = names.get(ident, f"thread-{ident}")
+            self.samples[(thread_name, self._walk(frame))] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            self.sample_once()
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                # Fell behind (e.g. GIL contention); resynchronise instead of bursting
+                next_tick = time.perf_counter()
+
+    def start(self):
+        """Start sampling in a daemon thread"""
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.started_at is not None:
+            self.duration = time.perf_counter() - self.started_at
+
+    def collapsed(self) -> str:
+        """Render samples in Brendan Gregg's collapsed stack format"""
+        lines = []
+        for (thread_name, stack), count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            frames = [thread_name] + [f"{name} ({filename}:{line})" for name, filename, line in stack]
+            lines.append(f"{';'.join(f.replace(';', ':') for f in frames)} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Render samples as a speedscope file, one sampled profile per thread"""
+        frame_index: Dict[Frame, int] = {}
+        frames = []
+        profiles: Dict[str, Dict[str, Any]] = {}
+
+        for (thread_name, stack), count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            profile = profiles.setdefault(thread_name, {
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.duration,
+                "samples": [],
+                "weights": [],
+            })
+            profile["samples"].append(indexes)
+            profile["weights"].append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": "microservice-demo profile",
+            "exporter": "microservice-demo",
+            "shared": {"frames": frames},
+            "profiles": [profiles[name] for name in sorted(profiles)],
+        }
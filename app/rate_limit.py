@@ -0,0 +1,220 @@
+"""
+Per-Client Rate Limiting
+Token buckets per client and route template, in fixed-size LRU tables
+
+Each rule limits one route template (e.g. "/api/v1/hello") to a number of
+requests per period for every client. A client is identified by a
+configurable request header (an API key, or X-Forwarded-For behind a proxy)
+or by the peer address. For list headers the entry added by the outermost
+trusted proxy is used, never the client-controlled left-most one.
+
+Bucket state lives in two preallocated float arrays (tokens and last refill
+time) per rule. An ordered dict maps client keys to array slots in LRU order;
+when the table is full the least recently seen client loses its slot. Memory
+is therefore bounded by `max_clients` no matter how many distinct clients
+show up, and an evicted client simply starts again with a full bucket.
+"""
+import json
+import math
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.routing import compile_path
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+
+def parse_rate(spec: str) -> Tuple[float, float]:
+    """
+    Parse a rate such as "100/minute" or "10/5s".
+
+    Returns (burst, tokens_per_second); the burst is the request count.
+    """
+    count, sep, period = spec.strip().partition("/")
+    if not sep:
+        raise ValueError(f"invalid rate {spec!r}, expected '<count>/<period>'")
+    try:
+        limit = float(int(count))
+        if period in PERIODS:
+            seconds = PERIODS[period]
+        elif period.endswith("s"):
+            seconds = float(period[:-1])
+        else:
+            raise ValueError(period)
+    except ValueError:
+        raise ValueError(f"invalid rate {spec!r}, expected e.g. '100/minute' or '10/5s'") from None
+    if limit < 1 or seconds <= 0:
+        raise ValueError(f"invalid rate {spec!r}, count and period must be positive")
+    return limit, limit / seconds
+
+
+class BucketTable:
+    """Fixed-capacity token buckets with least-recently-used eviction"""
+
+    def __init__(self, limit: float, rate: float, max_clients: int = 100000):
+        self.limit = limit
+        self.rate = rate
+        self.max_clients = max_clients
+        self.tokens = array("d", bytes(8 * max_clients))
+        self.updated = array("d", bytes(8 * max_clients))
+        self.slots: "OrderedDict[str, int]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def take(self, key: str, now: float) -> Tuple[bool, float, float]:
+        """
+        Take one token for a client.
+
+        Returns (allowed, tokens_left, wait); wait is the time until the next
+        token when rejected, or until the bucket is full again when allowed.
+        """
+        slots = self.slots
+        slot = slots.get(key)
+        if slot is None:
+            if len(slots) < self.max_clients:
+                slot = len(slots)
+            else:
+                _, slot = slots.popitem(last=False)
+                self.evictions += 1
+            slots[key] = slot
+            tokens = self.limit
+        else:
+            slots.move_to_end(key)
+            tokens = min(self.limit, self.tokens[slot] + (now - self.updated[slot]) * self.rate)
+
+        self.updated[slot] = now
+        if tokens >= 1.0:
+            tokens -= 1.0
+            self.tokens[slot] = tokens
+            return True, tokens, (self.limit - tokens) / self.rate
+        self.tokens[slot] = tokens
+        return False, tokens, (1.0 - tokens) / self.rate
+
+
+class RateLimitRule:
+    """A rate limit for one route template"""
+
+    def __init__(self, template: str, spec: str, max_clients: int):
+        self.template = template
+        self.spec = spec
+        self.limit, self.rate = parse_rate(spec)
+        self.regex = compile_path(template)[0]
+        self.buckets = BucketTable(self.limit, self.rate, max_clients)
+
+
+class RateLimiter:
+    """Route template rules, each with its own bucket table"""
+
+    def __init__(self, rules: Dict[str, str], max_clients: int = 100000):
+        self.configure(rules, max_clients)
+
+    def configure(self, rules: Dict[str, str], max_clients: int = 100000):
+        """Replace all rules; every client starts again with a full bucket"""
+        self.rules: List[RateLimitRule] = [
+            RateLimitRule(template, spec, max_clients) for template, spec in rules.items()
+        ]
+        # Most rules have no path parameters; match those with a dict lookup
+        self._static = {rule.template: rule for rule in self.rules if "{" not in rule.template}
+        self._dynamic = [rule for rule in self.rules if "{" in rule.template]
+
+    def match(self, path: str) -> Optional[RateLimitRule]:
+        """Return the first rule whose template matches a path"""
+        rule = self._static.get(path)
+        if rule is None:
+            for candidate in self._dynamic:
+                if candidate.regex.match(path):
+                    return candidate
+        return rule
+
+    def check(self, rule: RateLimitRule, client: str,
+              now: Optional[float] = None) -> Tuple[bool, float, float]:
+        """Take a token for a client under a rule (see BucketTable.take)"""
+        return rule.buckets.take(client, time.monotonic() if now is None else now)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Per-rule configuration and table occupancy"""
+        return {
+            rule.template: {
+                "rate": rule.spec,
+                "clients": len(rule.buckets),
+                "max_clients": rule.buckets.max_clients,
+                "evictions": rule.buckets.evictions,
+            }
+            for rule in self.rules
+        }
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware that enforces per-client rate limits"""
+
+    def __init__(self, app, limiter: RateLimiter, settings, limited_counter=None):
+        self.app = app
+        self.limiter = limiter
+        self.settings = settings
+        self.limited_counter = limited_counter
+        self._body = json.dumps({"detail": "Rate limit exceeded, retry later"}).encode("utf-8")
+
+    def client_key(self, scope) -> str:
+        """Identify the client by the configured header, else by peer address"""
+        header = self.settings.RATE_LIMIT_KEY_HEADER
+        if header:
+            name = header.lower().encode("latin-1")
+            hops = [
+                hop.strip()
+                for key, value in scope["headers"] if key == name
+                for hop in value.decode("latin-1").split(",")
+            ]
+            if hops:
+                # X-Forwarded-For style lists: every proxy appends the address
+                # it received the request from, so only the last hops are
+                # trustworthy. The client is the one added by the outermost of
+                # our trusted proxies; anything left of it is client-supplied.
+                trusted = max(1, self.settings.RATE_LIMIT_TRUSTED_PROXIES)
+                return hops[max(0, len(hops) - trusted)]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        # Warmup requests (scope["warmup"]) are not client traffic
+        if scope["type"] != "http" or not self.settings.RATE_LIMIT_ENABLED or scope.get("warmup"):
+            await self.app(scope, receive, send)
+            return
+        rule = self.limiter.match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, tokens, wait = self.limiter.check(rule, self.client_key(scope))
+        headers = [
+            (b"ratelimit-limit", b"%d" % rule.limit),
+            (b"ratelimit-remaining", b"%d" % tokens),
+            (b"ratelimit-reset", b"%d" % math.ceil(wait)),
+        ]
+        if not allowed:
+            if self.limited_counter is not None:
+                self.limited_counter.labels(route=rule.template).inc()
+            await self._reject(send, headers, wait)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _reject(self, send, headers, wait: float):
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._body)).encode("latin-1")),
+                (b"retry-after", b"%d" % max(1, math.ceil(wait))),
+            ] + headers,
+        })
+        await send({"type": "http.response.body", "body": self._body})
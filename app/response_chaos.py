@@ -0,0 +1,163 @@
+"""
+Response Stream Chaos
+Slow links, partial bodies and connection resets at the ASGI send level
+
+slow_responses delays a request before its handler runs; clients then see
+a late but complete response. Network trouble looks different: bytes
+trickle in, a body stops short, or the connection drops mid-response.
+ResponseChaosMiddleware wraps `send` and, for a configurable share of the
+responses on matching routes, does one of:
+
+- throttle: passes the body on in slices of a tenth of `bytes_per_second`,
+  paced so the body arrives at that rate,
+- truncate: drops Content-Length and ends the body cleanly after
+  `after_bytes`, so the client gets a complete-looking short response,
+- reset: sends `after_bytes` and then raises ResponseAborted, which makes
+  the server close the connection with the response unfinished.
+
+Messages are handled one at a time as the application sends them; nothing
+beyond the current message is held. Bytes are counted on the wire, after
+compression. Responses shorter than `after_bytes` arrive complete.
+"""
+import asyncio
+import random
+from typing import Any, Dict, Iterable, Optional
+
+MODES = ("throttle", "truncate", "reset")
+
+
+class ResponseAborted(Exception):
+    """Raised from send to abort a response mid-stream"""
+
+
+class ResponseChaos:
+    """The active response stream rule, if any"""
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.bytes_per_second = 0
+        self.after_bytes = 0
+        self.route = "/"
+        self.percent = 100.0
+
+    def configure(self, mode: str, bytes_per_second: int = 16384, after_bytes: int = 1024,
+                  route: str = "/", percent: float = 100.0):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if mode == "throttle" and bytes_per_second < 1:
+            raise ValueError("bytes_per_second must be at least 1")
+        if after_bytes < 0:
+            raise ValueError("after_bytes must not be negative")
+        if not 0 < percent <= 100:
+            raise ValueError("percent must be between 0 and 100")
+        if not route.startswith("/"):
+            raise ValueError("route must be a path prefix starting with /")
+        self.mode = mode
+        self.bytes_per_second = bytes_per_second
+        self.after_bytes = after_bytes
+        self.route = route
+        self.percent = percent
+
+    def clear(self):
+        self.mode = None
+
+    def applies(self, path: str) -> bool:
+        """Whether a response on this path is affected (rolls the percentage)"""
+        return (self.mode is not None and path.startswith(self.route)
+                and (self.percent >= 100 or random.random() * 100 < self.percent))
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.mode is None:
+            return {"mode": None}
+        return {"mode": self.mode, "bytes_per_second": self.bytes_per_second, "after_bytes": self.after_bytes,
+                "route": self.route, "percent": self.percent}
+
+
+class ResponseChaosMiddleware:
+    """Pure ASGI middleware applying the ResponseChaos rule to response bodies"""
+
+    def __init__(self, app, chaos: ResponseChaos, exempt_prefixes: Iterable[str] = (), affected_counter=None):
+        self.app = app
+        self.chaos = chaos
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.affected_counter = affected_counter
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes)
+                or scope.get("warmup") or not self.chaos.applies(scope["path"])):
+            await self.app(scope, receive, send)
+            return
+
+        mode = self.chaos.mode
+        if self.affected_counter is not None:
+            self.affected_counter.labels(mode=mode).inc()
+        if mode == "throttle":
+            await self.app(scope, receive, self._throttled(send, self.chaos.bytes_per_second))
+        else:
+            await self.app(scope, receive, self._cut(send, self.chaos.after_bytes, reset=mode == "reset"))
+
+    @staticmethod
+    def _throttled(send, rate: int):
+        loop = asyncio.get_running_loop()
+        step = max(1, rate // 10)
+        started = 0.0
+        sent = 0
+
+        async def throttled_send(message):
+            nonlocal started, sent
+            if message["type"] == "http.response.start":
+                started = loop.time()
+                await send(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not body:
+                await send(message)
+                return
+            for offset in range(0, len(body), step):
+                piece = body[offset:offset + step]
+                await send({"type": "http.response.body", "body": piece,
+                            "more_body": more_body or offset + step < len(body)})
+                sent += len(piece)
+                delay = started + sent / rate - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+        return throttled_send
+
+    @staticmethod
+    def _cut(send, after_bytes: int, reset: bool):
+        sent = 0
+        finished = False
+
+        async def cut_send(message):
+            nonlocal sent, finished
+            if finished:
+                # The client has what it is going to get; the rest is dropped
+                return
+            if message["type"] == "http.response.start" and not reset:
+                # A short body must not contradict the declared length
+                headers = [(key, value) for key, value in message.get("headers", [])
+                           if key.lower() != b"content-length"]
+                await send(dict(message, headers=headers))
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            remaining = after_bytes - sent
+            if len(body) <= remaining:
+                sent += len(body)
+                await send(message)
+                return
+            sent = after_bytes
+            if reset:
+                await send({"type": "http.response.body", "body": body[:remaining], "more_body": True})
+                raise ResponseAborted(f"Response aborted by chaos after {after_bytes} bytes")
+            finished = True
+            await send({"type": "http.response.body", "body": body[:remaining], "more_body": False})
+
+        return cut_send
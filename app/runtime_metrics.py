@@ -0,0 +1,192 @@
+"""
+Process Runtime Metrics
+Prometheus collector for GC pauses, memory, file descriptors, threads and tasks
+
+GC activity is tracked incrementally through gc.callbacks (a counter bump
+and a bisect per collection). Everything else is read from /proc and the
+interpreter only when Prometheus scrapes, and the snapshot is cached for
+`cache_ttl` seconds so back-to-back scrapes do not re-read /proc.
+"""
+import asyncio
+import bisect
+import gc
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+GC_PAUSE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+PROC_SELF = "/proc/self"
+
+
+def read_proc_memory(proc_path: str = PROC_SELF) -> Dict[str, int]:
+    """Return RSS and USS in bytes from /proc (empty on non-Linux systems)"""
+    memory = {}
+    try:
+        with open(os.path.join(proc_path, "smaps_rollup")) as fh:
+            private = 0
+            for line in fh:
+                key, _, rest = line.partition(":")
+                if key == "Rss":
+                    memory["rss"] = int(rest.split()[0]) * 1024
+                elif key in ("Private_Clean", "Private_Dirty"):
+                    private += int(rest.split()[0]) * 1024
+            memory["uss"] = private
+    except (OSError, ValueError, IndexError):
+        try:
+            with open(os.path.join(proc_path, "statm")) as fh:
+                memory["rss"] = int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            pass
+    return memory
+
+
+def read_rss(proc_path: str = PROC_SELF) -> Optional[int]:
+    """Return RSS in bytes from statm (cheaper than smaps_rollup), or None"""
+    try:
+        with open(os.path.join(proc_path, "statm")) as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def count_open_fds(proc_path: str = PROC_SELF) -> Optional[int]:
+    """Return the number of open file descriptors, or None if unavailable"""
+    try:
+        return len(os.listdir(os.path.join(proc_path, "fd")))
+    except OSError:
+        return None
+
+
+class RuntimeCollector:
+    """Collect process runtime metrics lazily at scrape time"""
+
+    def __init__(self, cache_ttl: float = 5.0, prefix: str = "runtime"):
+        self.cache_ttl = cache_ttl
+        self.prefix = prefix
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        generations = range(len(gc.get_count()))
+        self._gc_collections = [0 for _ in generations]
+        self._gc_collected = [0 for _ in generations]
+        self._gc_pause_buckets = [[0] * (len(GC_PAUSE_BUCKETS) + 1) for _ in generations]
+        self._gc_pause_sum = [0.0 for _ in generations]
+        self._gc_start = 0.0
+        self._installed = False
+
+        self._snapshot: Dict[str, Optional[float]] = {}
+        self._snapshot_at = 0.0
+        self._snapshot_lock = threading.Lock()
+
+    def _gc_callback(self, phase, info):
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+            return
+        pause = time.perf_counter() - self._gc_start
+        generation = info["generation"]
+        self._gc_collections[generation] += 1
+        self._gc_collected[generation] += info.get("collected", 0)
+        self._gc_pause_buckets[generation][bisect.bisect_left(GC_PAUSE_BUCKETS, pause)] += 1
+        self._gc_pause_sum[generation] += pause
+
+    def install(self):
+        """Start tracking garbage collections"""
+        if not self._installed:
+            gc.callbacks.append(self._gc_callback)
+            self._installed = True
+
+    def uninstall(self):
+        """Stop tracking garbage collections"""
+        if self._installed:
+            gc.callbacks.remove(self._gc_callback)
+            self._installed = False
+
+    def attach_loop(self, loop: Optional[asyncio.AbstractEventLoop]):
+        """Count tasks on this event loop (the serving loop)"""
+        self.loop = loop
+
+    def _count_tasks(self) -> Optional[int]:
+        loop = self.loop
+        if loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return None
+        if loop.is_closed():
+            return None
+        # all_tasks() can race with task creation in another thread; retry briefly
+        for _ in range(3):
+            try:
+                return len(asyncio.all_tasks(loop))
+            except RuntimeError:
+                continue
+        return None
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        """Return cached /proc and interpreter readings, refreshing when stale"""
+        now = time.monotonic()
+        with self._snapshot_lock:
+            if self._snapshot and now - self._snapshot_at < self.cache_ttl:
+                return self._snapshot
+            memory = read_proc_memory()
+            self._snapshot = {
+                "rss": memory.get("rss"),
+                "uss": memory.get("uss"),
+                "open_fds": count_open_fds(),
+                "threads": threading.active_count(),
+                "asyncio_tasks": self._count_tasks(),
+            }
+            self._snapshot_at = now
+            return self._snapshot
+
+    def describe(self):
+        # Lets the registry learn metric names without triggering a collection
+        p = self.prefix
+        yield CounterMetricFamily(f"{p}_gc_collections", "Garbage collections per generation", labels=["generation"])
+        yield CounterMetricFamily(f"{p}_gc_collected_objects", "Objects collected per generation", labels=["generation"])
+        yield HistogramMetricFamily(f"{p}_gc_pause_seconds", "Garbage collection pause duration", labels=["generation"])
+        yield GaugeMetricFamily(f"{p}_memory_rss_bytes", "Resident set size")
+        yield GaugeMetricFamily(f"{p}_memory_uss_bytes", "Unique set size (private memory)")
+        yield GaugeMetricFamily(f"{p}_open_fds", "Open file descriptors")
+        yield GaugeMetricFamily(f"{p}_threads", "Live Python threads")
+        yield GaugeMetricFamily(f"{p}_asyncio_tasks", "Live asyncio tasks on the serving loop")
+
+    def collect(self):
+        p = self.prefix
+        collections = CounterMetricFamily(
+            f"{p}_gc_collections", "Garbage collections per generation", labels=["generation"])
+        collected = CounterMetricFamily(
+            f"{p}_gc_collected_objects", "Objects collected per generation", labels=["generation"])
+        pauses = HistogramMetricFamily(
+            f"{p}_gc_pause_seconds", "Garbage collection pause duration", labels=["generation"])
+
+        for generation in range(len(self._gc_collections)):
+            label = [str(generation)]
+            collections.add_metric(label, self._gc_collections[generation])
+            collected.add_metric(label, self._gc_collected[generation])
+            cumulative = 0
+            buckets = []
+            counts = self._gc_pause_buckets[generation]
+            for bound, count in zip(GC_PAUSE_BUCKETS, counts):
+                cumulative += count
+                buckets.append((str(bound), cumulative))
+            buckets.append(("+Inf", cumulative + counts[-1]))
+            pauses.add_metric(label, buckets, self._gc_pause_sum[generation])
+        yield collections
+        yield collected
+        yield pauses
+
+        snapshot = self.snapshot()
+        gauges = [
+            ("memory_rss_bytes", "Resident set size", "rss"),
+            ("memory_uss_bytes", "Unique set size (private memory)", "uss"),
+            ("open_fds", "Open file descriptors", "open_fds"),
+            ("threads", "Live Python threads", "threads"),
+            ("asyncio_tasks", "Live asyncio tasks on the serving loop", "asyncio_tasks"),
+        ]
+        for name, description, key in gauges:
+            if snapshot.get(key) is not None:
+                yield GaugeMetricFamily(f"{p}_{name}", description, value=snapshot[key])
@@ -0,0 +1,156 @@
+"""
+Per-request Server-Timing Instrumentation
+Opt-in breakdown of where a request spends its time
+
+When timing is enabled for a request, a RequestTimings object is placed in a
+context variable and code on the hot path wraps its phases in
+`with phase("name"):`. Phases nest and are accounted exclusively: time spent
+in a child phase is not counted again in its parent. The totals are sent back
+in a Server-Timing response header and observed in a per-phase histogram.
+
+When timing is disabled the context variable holds None and phase() returns a
+shared no-op context manager, so instrumented code costs one ContextVar
+lookup per phase.
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+# Header a client can send to ask for a breakdown of a single request
+REQUEST_HEADER = b"x-server-timing"
+
+
+class RequestTimings:
+    """Accumulated phase durations for one request"""
+
+    __slots__ = ("phases", "marks", "_stack")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self._stack: List["_Phase"] = []
+
+    def add(self, name: str, seconds: float):
+        """Add time to a phase"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def mark(self, name: str):
+        """Remember the current time under a name"""
+        self.marks[name] = time.perf_counter()
+
+    def header_value(self) -> str:
+        """Render phases as a Server-Timing header value (milliseconds)"""
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.phases.items())
+
+
+class _Phase:
+    __slots__ = ("timings", "name", "start", "child_time")
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self.timings = timings
+        self.name = name
+        self.child_time = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.timings._stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = self.timings._stack
+        stack.pop()
+        self.timings.add(self.name, elapsed - self.child_time)
+        if stack:
+            stack[-1].child_time += elapsed
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def current() -> Optional[RequestTimings]:
+    """Return the timings of the current request, or None when disabled"""
+    return _current.get()
+
+
+def phase(name: str):
+    """Time a block of code as a named phase of the current request"""
+    timings = _current.get()
+    if timings is None:
+        return _NULL_PHASE
+    return _Phase(timings, name)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware that enables timing for a request and adds the
+    Server-Timing header. It must be the outermost middleware so that
+    "total" covers the rest of the stack.
+    """
+
+    def __init__(self, app, settings, histogram=None):
+        self.app = app
+        self.settings = settings
+        self.histogram = histogram
+        # Phase name -> histogram child; the set of phases is small and fixed
+        self._phase_children: Dict[str, object] = {}
+
+    def _wanted(self, scope) -> bool:
+        if self.settings.SERVER_TIMING_ENABLED:
+            return True
+        if self.settings.SERVER_TIMING_ALLOW_HEADER:
+            for key, value in scope["headers"]:
+                if key == REQUEST_HEADER:
+                    return value not in (b"0", b"false")
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                self._finish(timings, time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header_value().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+    def _finish(self, timings: RequestTimings, total: float):
+        # Anything not attributed to a phase inside the app is middleware overhead
+        app_time = timings.phases.pop("app", None)
+        if app_time is not None:
+            accounted = sum(timings.phases.values())
+            timings.phases["framework"] = max(0.0, app_time - accounted)
+            timings.phases["middleware"] = max(0.0, total - app_time)
+        timings.phases["total"] = total
+        if self.histogram is not None:
+            children = self._phase_children
+            for name, seconds in timings.phases.items():
+                child = children.get(name)
+                if child is None:
+                    child = children[name] = self.histogram.labels(phase=name)
+                child.observe(seconds)
@@ -0,0 +1,215 @@
+"""
+Latency Quantile Sketches
+Per-route p50/p95/p99 over a sliding window, computed in process
+
+REQUEST_DURATION only has fixed buckets, so "what is our p99 right now"
+needs a Prometheus query. QuantileSketch keeps counts in logarithmic
+buckets (the DDSketch scheme): every value between `min_value` and
+`max_value` falls into bucket ceil(log_gamma(value)), and the estimate
+returned for a bucket is within `relative_accuracy` of every value in it.
+The bucket count is fixed by the accuracy and the value range (about 1100
+buckets for 1% between 1 µs and 1 h), so memory per sketch is bounded no
+matter how many values are added, and two sketches merge by adding counts.
+
+WindowedSketch keeps a ring of sketches, one per `window / slots` seconds,
+and merges the live ones when queried, so the window slides in steps of
+one slot. LatencySketches holds one windowed sketch per route template plus
+one across all routes.
+"""
+import math
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy guarantees"""
+
+    __slots__ = ("relative_accuracy", "gamma", "min_value", "max_value",
+                 "_multiplier", "_min_index", "_max_index", "counts", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6, max_value: float = 3600.0):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.min_value = min_value
+        self.max_value = max_value
+        self._multiplier = 1.0 / math.log(self.gamma)
+        self._min_index = math.ceil(math.log(min_value) * self._multiplier)
+        self._max_index = math.ceil(math.log(max_value) * self._multiplier)
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+
+    @property
+    def max_buckets(self) -> int:
+        """Upper bound on the number of buckets this sketch can hold"""
+        return self._max_index - self._min_index + 1
+
+    def index(self, value: float) -> int:
+        """Bucket of a value; values outside the range go to the end buckets"""
+        if value <= self.min_value:
+            return self._min_index
+        if value >= self.max_value:
+            return self._max_index
+        return math.ceil(math.log(value) * self._multiplier)
+
+    def add(self, value: float):
+        self.add_index(self.index(value))
+
+    def add_index(self, index: int):
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + 1
+        self.count += 1
+
+    def merge(self, other: "QuantileSketch"):
+        """Add the counts of a sketch with the same accuracy and range"""
+        counts = self.counts
+        for index, count in other.counts.items():
+            counts[index] = counts.get(index, 0) + count
+        self.count += other.count
+
+    def clear(self):
+        self.counts.clear()
+        self.count = 0
+
+    def value(self, index: int) -> float:
+        """Estimate for a bucket, within relative_accuracy of its values"""
+        return 2.0 * self.gamma ** index / (self.gamma + 1)
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Estimates for several quantiles in one pass (None when empty)"""
+        qs = list(qs)
+        if not self.count:
+            return [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        results: List[Optional[float]] = [None] * len(qs)
+        indexes = sorted(self.counts)
+        position = 0
+        cumulative = self.counts[indexes[0]]
+        for i in order:
+            rank = qs[i] * (self.count - 1)
+            while cumulative <= rank and position < len(indexes) - 1:
+                position += 1
+                cumulative += self.counts[indexes[position]]
+            results[i] = self.value(indexes[position])
+        return results
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+
+class WindowedSketch:
+    """Sketch over the last `window` seconds, sliding one slot at a time"""
+
+    def __init__(self, window: float = 60.0, slots: int = 6, relative_accuracy: float = 0.01,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.slot_seconds = window / slots
+        self.relative_accuracy = relative_accuracy
+        self.clock = clock
+        self._epochs = [-1] * slots
+        self._sketches = [QuantileSketch(relative_accuracy) for _ in range(slots)]
+
+    def epoch(self) -> int:
+        """Number of the current slot since the clock's origin"""
+        return int(self.clock() / self.slot_seconds)
+
+    def add(self, value: float):
+        self.add_index(self._sketches[0].index(value))
+
+    def add_index(self, index: int, epoch: Optional[int] = None):
+        """Count a bucket index; callers adding to several sketches pass the epoch"""
+        if epoch is None:
+            epoch = int(self.clock() / self.slot_seconds)
+        slot = epoch % len(self._sketches)
+        sketch = self._sketches[slot]
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            sketch.clear()
+        counts = sketch.counts
+        counts[index] = counts.get(index, 0) + 1
+        sketch.count += 1
+
+    def merged(self) -> QuantileSketch:
+        """One sketch of every value in the window"""
+        oldest = int(self.clock() / self.slot_seconds) - len(self._sketches)
+        result = QuantileSketch(self.relative_accuracy)
+        for epoch, sketch in zip(self._epochs, self._sketches):
+            if epoch > oldest:
+                result.merge(sketch)
+        return result
+
+
+class LatencySketches:
+    """Windowed latency sketches per route and across all routes"""
+
+    def __init__(self, window: float = 60.0, slots: int = 6, relative_accuracy: float = 0.01,
+                 max_routes: int = 256, cache_ttl: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.slots = slots
+        self.relative_accuracy = relative_accuracy
+        self.max_routes = max_routes
+        self.cache_ttl = cache_ttl
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """Drop all observations (tests)"""
+        self.routes: Dict[str, WindowedSketch] = {}
+        self.total = self._new()
+        self._overall = None
+        self._overall_at = float("-inf")
+
+    def _new(self) -> WindowedSketch:
+        return WindowedSketch(self.window, self.slots, self.relative_accuracy, self.clock)
+
+    def record(self, route: str, latency: float):
+        """Add one request latency in seconds"""
+        sketch = self.routes.get(route)
+        if sketch is None:
+            if len(self.routes) >= self.max_routes:
+                route = "other"
+                sketch = self.routes.get(route)
+            if sketch is None:
+                sketch = self.routes[route] = self._new()
+        # Both sketches share accuracy, range and slots; compute bucket and slot once
+        total = self.total
+        index = total._sketches[0].index(latency)
+        epoch = total.epoch()
+        sketch.add_index(index, epoch)
+        total.add_index(index, epoch)
+
+    def _summary(self, sketch: WindowedSketch, quantiles) -> Dict[str, Optional[float]]:
+        merged = sketch.merged()
+        summary: Dict[str, Optional[float]] = {"count": merged.count}
+        for q, value in zip(quantiles, merged.quantiles(quantiles)):
+            summary[quantile_name(q)] = None if value is None else round(value * 1000, 3)
+        return summary
+
+    def overall(self) -> Dict[str, Optional[float]]:
+        """Default quantiles in ms across all routes, cached for `cache_ttl`"""
+        now = self.clock()
+        if self._overall is None or now - self._overall_at >= self.cache_ttl:
+            self._overall = self._summary(self.total, DEFAULT_QUANTILES)
+            self._overall_at = now
+        return self._overall
+
+    def snapshot(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, object]:
+        """Quantiles in ms for every route seen in the window"""
+        quantiles = tuple(quantiles)
+        routes = {}
+        for route, sketch in sorted(self.routes.items()):
+            summary = self._summary(sketch, quantiles)
+            if summary["count"]:
+                routes[route] = summary
+        return {
+            "window_seconds": self.window,
+            "relative_accuracy": self.relative_accuracy,
+            "overall": self._summary(self.total, quantiles),
+            "routes": routes,
+        }
+
+
+def quantile_name(q: float) -> str:
+    """0.5 -> "p50", 0.999 -> "p99.9" """
+    return "p" + format(q * 100, "g")
@@ -0,0 +1,157 @@
+"""
+Tests for tracemalloc allocation diffs
+"""
+import inspect
+import time
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app import main
+from app.main import app, allocation_tracer, chaos_state
+from app.alloc_trace import AllocationTracer, TracingError
+
+ADMIN_HEADERS = {"X-Admin-Token": "secret"}
+
+
+def leak_here(keep):
+    keep.append([bytearray(1000) for _ in range(500)])
+
+
+@pytest.fixture
+def tracer():
+    tracer = AllocationTracer(max_seconds=5.0, max_frames=5)
+    yield tracer
+    if tracer.running:
+        tracer.stop()
+
+
+@pytest.fixture
+def client():
+    """Admin client; the application's tracer is stopped afterwards"""
+    with patch("app.main.settings.ADMIN_TOKEN", "secret"):
+        yield TestClient(app, headers=ADMIN_HEADERS)
+    if allocation_tracer.running:
+        allocation_tracer.stop()
+
+
+class TestAllocationTracer:
+    """Test tracing sessions"""
+
+    def test_attributes_growth_to_line(self, tracer):
+        """Test that the top diff is the allocating line"""
+        keep = []
+        tracer.start(seconds=5.0)
+        leak_here(keep)
+        diff = tracer.snapshot(top=5)
+        top = diff["top"][0]
+        assert top["file"] == __file__
+        assert top["line"] == inspect.getsourcelines(leak_here)[1] + 1
+        assert top["size_diff"] >= 500 * 1000
+        assert top["count_diff"] >= 500
+
+    def test_since_previous(self, tracer):
+        """Test diffs against the previous snapshot"""
+        keep = []
+        tracer.start(seconds=5.0)
+        leak_here(keep)
+        tracer.snapshot()
+        diff = tracer.snapshot(since="previous")
+        assert all(stat["size_diff"] < 500 * 1000 for stat in diff["top"])
+        assert tracer.status()["snapshots"] == 2
+
+    def test_traceback_grouping(self, tracer):
+        """Test call stacks, most recent call first"""
+        keep = []
+        tracer.start(seconds=5.0, frames=3)
+        leak_here(keep)
+        top = tracer.snapshot(group_by="traceback")["top"][0]
+        assert top["traceback"][0].endswith(f":{top['line']}")
+        assert any(frame.startswith(__file__) for frame in top["traceback"][1:])
+
+    def test_deadline_stops_tracing(self, tracer):
+        """Test that a session stops itself"""
+        tracer.start(seconds=0.1)
+        assert tracemalloc.is_tracing()
+        deadline = time.monotonic() + 2.0
+        while tracer.running and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert not tracer.running
+        assert not tracemalloc.is_tracing()
+        assert tracer.status()["stopped"] == "deadline"
+
+    def test_states_and_bounds(self, tracer):
+        """Test one session at a time and parameter limits"""
+        with pytest.raises(ValueError):
+            tracer.start(seconds=10.0)
+        with pytest.raises(ValueError):
+            tracer.start(seconds=1.0, frames=6)
+        with pytest.raises(TracingError):
+            tracer.snapshot()
+        tracer.start(seconds=1.0)
+        with pytest.raises(TracingError):
+            tracer.start(seconds=1.0)
+        with pytest.raises(ValueError):
+            tracer.snapshot(group_by="function")
+        assert tracer.status()["overhead_bytes"] > 0
+        tracer.stop()
+        with pytest.raises(TracingError):
+            tracer.stop()
+
+    def test_keeps_external_tracing(self, tracer):
+        """Test that tracing started elsewhere keeps running"""
+        tracemalloc.start()
+        try:
+            tracer.start(seconds=1.0)
+            tracer.stop()
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+
+class TestAllocationTraceEndpoints:
+    """Test the admin endpoints"""
+
+    def test_attributes_memory_leak_chaos(self, client):
+        """Test that memory_leak chaos growth is attributed to memory_leak_thread"""
+        saved = dict(chaos_state)
+        try:
+            assert client.post("/admin/memory/trace/start?seconds=30&frames=3").json()["running"] is True
+            client.post("/admin/chaos/inject?chaos_type=memory_leak")
+            deadline = time.monotonic() + 3.0
+            while not chaos_state["memory_objects"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            response = client.post("/admin/memory/trace/snapshot?top=5&group_by=traceback")
+        finally:
+            client.post("/admin/chaos/heal")
+            chaos_state.update(saved)
+        assert response.status_code == 200
+        top = response.json()["top"][0]
+        lines, first = inspect.getsourcelines(main.memory_leak_thread)
+        leak_line = first + next(i for i, line in enumerate(lines) if "data = [" in line)
+        assert top["file"] == main.__file__
+        assert top["line"] == leak_line
+        assert top["size_diff"] >= 1024 * 1024
+        assert top["traceback"][0] == f"{main.__file__}:{leak_line}"
+        assert client.post("/admin/memory/trace/stop").json()["stopped"] == "stopped"
+
+    def test_errors(self, client):
+        """Test conflicts, bad parameters and the switch"""
+        assert client.post("/admin/memory/trace/snapshot").status_code == 409
+        assert client.post("/admin/memory/trace/start?seconds=100000").status_code == 400
+        assert client.post("/admin/memory/trace/start?seconds=5").status_code == 200
+        assert client.post("/admin/memory/trace/start?seconds=5").status_code == 409
+        assert client.post("/admin/memory/trace/snapshot?group_by=nope").status_code == 400
+        assert client.get("/admin/memory/trace").json()["running"] is True
+        assert client.post("/admin/memory/trace/stop").status_code == 200
+        assert client.post("/admin/memory/trace/stop").status_code == 409
+        with patch("app.main.settings.ALLOC_TRACE_ENABLED", False):
+            assert client.get("/admin/memory/trace").status_code == 404
+
+    def test_requires_admin_token(self):
+        """Test that tracing is refused without ADMIN_TOKEN"""
+        with patch("app.main.settings.ADMIN_TOKEN", None):
+            response = TestClient(app).post("/admin/memory/trace/start", headers=ADMIN_HEADERS)
+        assert response.status_code == 403
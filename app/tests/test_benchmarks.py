@@ -0,0 +1,189 @@
+"""
+Tests for the benchmark suite and performance regression gate
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.benchmarks import regression, suite
+from app.main import app
+
+
+def make_results(scenario="hello", throughput=(1000.0, 1010.0, 990.0), p99=(0.010, 0.011, 0.009)):
+    """Build a minimal results document"""
+    return {
+        "meta": {},
+        "scenarios": {
+            scenario: {
+                "runs": [{"throughput": t, "p99": p} for t, p in zip(throughput, p99)]
+            }
+        }
+    }
+
+
+THRESHOLDS = {"throughput": 0.10, "p99": 0.15}
+
+
+class TestStatistics:
+    """Test statistical helpers"""
+
+    def test_summarize_confidence_interval(self):
+        """Test mean and confidence interval of a sample"""
+        summary = regression.summarize([10.0, 12.0, 14.0])
+        assert summary["mean"] == pytest.approx(12.0)
+        assert summary["stdev"] == pytest.approx(2.0)
+        assert summary["ci_low"] < 12.0 < summary["ci_high"]
+
+    def test_summarize_single_value(self):
+        """Test that a single run has a zero-width interval"""
+        summary = regression.summarize([5.0])
+        assert summary["ci_low"] == summary["ci_high"] == 5.0
+
+    def test_summarize_empty(self):
+        """Test that an empty sample is rejected"""
+        with pytest.raises(ValueError):
+            regression.summarize([])
+
+    def test_t_critical_values(self):
+        """Test t critical value lookup"""
+        assert regression.t_critical(4) == pytest.approx(2.776)
+        assert regression.t_critical(22) == pytest.approx(2.086)
+        assert regression.t_critical(100) == pytest.approx(1.96)
+
+    def test_percentile(self):
+        """Test nearest-rank percentile"""
+        values = [float(i) for i in range(1, 101)]
+        assert suite.percentile(values, 50) == 50.0
+        assert suite.percentile(values, 99) == 99.0
+        assert suite.percentile([], 99) == 0.0
+
+
+class TestRegressionGate:
+    """Test baseline comparison"""
+
+    def test_identical_runs_pass(self):
+        """Test that comparing a run with itself passes"""
+        results = make_results()
+        report = regression.compare(results, results, THRESHOLDS)
+        assert report["status"] == "passed"
+        assert report["regressions"] == 0
+
+    def test_throughput_regression_detected(self):
+        """Test that a large throughput drop fails the gate"""
+        baseline = make_results()
+        current = make_results(throughput=(700.0, 710.0, 690.0))
+        report = regression.compare(baseline, current, THRESHOLDS)
+        assert report["status"] == "failed"
+        failed = [r for r in report["results"] if r["status"] == "regressed"]
+        assert [r["metric"] for r in failed] == ["throughput"]
+
+    def test_p99_regression_detected(self):
+        """Test that a large p99 increase fails the gate"""
+        baseline = make_results()
+        current = make_results(p99=(0.020, 0.021, 0.019))
+        report = regression.compare(baseline, current, THRESHOLDS)
+        assert report["status"] == "failed"
+        assert report["results"][1]["metric"] == "p99"
+        assert report["results"][1]["status"] == "regressed"
+
+    def test_noisy_run_within_interval_passes(self):
+        """Test that a noisy run whose interval reaches the limit is not flagged"""
+        baseline = make_results()
+        current = make_results(throughput=(600.0, 1100.0, 900.0))
+        report = regression.compare(baseline, current, THRESHOLDS)
+        assert report["results"][0]["status"] == "ok"
+
+    def test_missing_scenario_reported(self):
+        """Test that scenarios missing from the current run are listed"""
+        baseline = make_results()
+        current = make_results(scenario="other")
+        report = regression.compare(baseline, current, THRESHOLDS)
+        assert report["missing_scenarios"] == ["hello"]
+
+    def test_baseline_spread_considered(self):
+        """Test that a drop inside the baseline's own noise is not flagged"""
+        baseline = make_results(throughput=(800.0, 1200.0, 1000.0))
+        current = make_results(throughput=(840.0, 850.0, 860.0))
+        report = regression.compare(baseline, current, THRESHOLDS)
+        assert report["results"][0]["status"] == "ok"
+
+    def test_reference_cancels_machine_speed(self):
+        """Test that a uniformly slower machine passes when normalized"""
+        baseline = make_results()
+        baseline["scenarios"].update(make_results("calibration", throughput=(5000.0, 5050.0, 4950.0))["scenarios"])
+        current = make_results(throughput=(700.0, 707.0, 693.0), p99=(0.014, 0.0154, 0.0126))
+        current["scenarios"].update(make_results(
+            "calibration", throughput=(3500.0, 3535.0, 3465.0), p99=(0.014, 0.0154, 0.0126)
+        )["scenarios"])
+
+        assert regression.compare(baseline, current, THRESHOLDS)["status"] == "failed"
+        report = regression.compare(baseline, current, THRESHOLDS, reference="calibration")
+        assert report["status"] == "passed"
+        assert report["reference"] == "calibration"
+        assert [r["scenario"] for r in report["results"]] == ["hello", "hello"]
+
+    def test_reference_detects_relative_regression(self):
+        """Test that a slowdown relative to the reference still fails"""
+        baseline = make_results()
+        baseline["scenarios"].update(make_results("calibration", throughput=(5000.0, 5050.0, 4950.0))["scenarios"])
+        current = make_results(throughput=(600.0, 606.0, 594.0))
+        current["scenarios"].update(make_results("calibration", throughput=(5000.0, 5050.0, 4950.0))["scenarios"])
+        report = regression.compare(baseline, current, THRESHOLDS, reference="calibration")
+        assert report["status"] == "failed"
+
+    def test_junit_xml_output(self):
+        """Test JUnit XML rendering of a failing report"""
+        report = regression.compare(make_results(), make_results(throughput=(1.0, 1.0, 1.0)), THRESHOLDS)
+        xml = regression.to_junit_xml(report)
+        assert 'failures="1"' in xml
+        assert 'name="hello.throughput"' in xml
+        assert "<failure" in xml
+
+    def test_cli_exit_codes(self, tmp_path, capsys):
+        """Test that the CLI exits non-zero on regression and writes reports"""
+        baseline_file = tmp_path / "baseline.json"
+        current_file = tmp_path / "current.json"
+        junit_file = tmp_path / "perf.xml"
+        baseline_file.write_text(json.dumps(make_results()))
+
+        current_file.write_text(json.dumps(make_results()))
+        assert regression.main([str(current_file), "--baseline", str(baseline_file)]) == 0
+
+        current_file.write_text(json.dumps(make_results(p99=(1.0, 1.0, 1.0))))
+        exit_code = regression.main([
+            str(current_file), "--baseline", str(baseline_file), "--junit-xml", str(junit_file)
+        ])
+        assert exit_code == 1
+        assert "regression gate failed" in capsys.readouterr().out
+        assert junit_file.exists()
+
+
+class TestBenchmarkSuite:
+    """Test the in-process benchmark runner"""
+
+    def test_asgi_request(self):
+        """Test driving a request through the ASGI app"""
+        status = asyncio.run(suite.asgi_request(app, "GET", "/api/v1/hello", "name=bench"))
+        assert status == 200
+
+    def test_run_scenario(self):
+        """Test a short scenario run produces per-run statistics"""
+        result = asyncio.run(suite.run_scenario("hello", app=app, runs=2, requests=5, warmup=1))
+        assert len(result["runs"]) == 2
+        for run in result["runs"]:
+            assert run["throughput"] > 0
+            assert run["p99"] >= run["p50"] > 0
+
+    def test_default_scenarios_registered(self):
+        """Test the hot-path scenarios are available"""
+        for name in ["hello", "healthz", "status", "hello_handler"]:
+            assert name in suite.SCENARIOS
+
+    def test_baseline_matches_scenarios(self):
+        """Test that the stored baseline covers every registered scenario"""
+        import os
+        path = os.path.join(os.path.dirname(suite.__file__), "baseline.json")
+        with open(path) as fh:
+            baseline = json.load(fh)
+        assert set(baseline["scenarios"]) == set(suite.SCENARIOS)
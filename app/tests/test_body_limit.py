@@ -0,0 +1,179 @@
+"""
+Tests for request body size limits
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from starlette.exceptions import HTTPException
+from unittest.mock import patch
+
+from app.main import app, healing_reports_storage
+from app.body_limit import BodySizeLimitMiddleware
+from app.config import Settings
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def reports():
+    """Restore the healing report storage afterwards"""
+    saved = list(healing_reports_storage)
+    yield healing_reports_storage
+    healing_reports_storage[:] = saved
+
+
+def rejected(path):
+    """Current value of the body size rejection counter"""
+    return REGISTRY.get_sample_value("http_requests_body_too_large_total", {"path": path}) or 0.0
+
+
+async def stream(app, method, path, chunks, content_length=None):
+    """Send a request body in chunks; returns status, body and whether the app saw it all"""
+    headers = [(b"content-type", b"application/json")]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = 0
+    start = {}
+    body = []
+
+    async def receive():
+        nonlocal sent
+        if sent < len(messages):
+            sent += 1
+            return messages[sent - 1]
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return start["status"], b"".join(body), sent
+
+
+class TestBodySizeLimit:
+    """Test the limits on real routes"""
+
+    def test_under_limit(self, client, reports):
+        """Test that ordinary reports are accepted"""
+        response = client.post("/admin/healing-report", json={"workflow_id": "small"})
+        assert response.status_code == 200
+
+    def test_content_length_over_limit(self, client, reports):
+        """Test that a declared oversized body is rejected before it is read"""
+        before = rejected("/admin/healing-report")
+        body = json.dumps({"workflow_id": "big", "padding": "x" * 70000})
+        response = client.post("/admin/healing-report", content=body,
+                               headers={"Content-Type": "application/json"})
+        assert response.status_code == 413
+        assert response.json()["detail"] == "Request body too large"
+        assert rejected("/admin/healing-report") == before + 1
+        assert not any(r.get("workflow_id") == "big" for r in healing_reports_storage)
+
+    def test_streamed_body_over_limit(self, reports):
+        """Test that a chunked body is cut off at the chunk crossing the limit"""
+        before = rejected("/admin/healing-report")
+        chunks = [b'{"workflow_id": "chunked", "padding": "'] + [b"x" * 16384] * 10 + [b'"}']
+        status, body, _ = asyncio.run(stream(app, "POST", "/admin/healing-report", chunks))
+        assert status == 413
+        assert json.loads(body)["detail"] == "Request body too large"
+        assert rejected("/admin/healing-report") == before + 1
+        assert not any(r.get("workflow_id") == "chunked" for r in healing_reports_storage)
+
+    def test_understated_content_length(self, reports):
+        """Test that a Content-Length smaller than the body does not bypass the limit"""
+        chunks = [b"x" * 40000, b"x" * 40000]
+        status, _, _ = asyncio.run(stream(app, "POST", "/admin/healing-report", chunks, content_length=10))
+        assert status == 413
+
+    def test_batch_has_its_own_limit(self, client, reports):
+        """Test that the batch endpoint accepts more than one report's limit"""
+        batch = {"reports": [{"workflow_id": f"r{i}", "recommendations": "x" * 1000} for i in range(100)]}
+        body = json.dumps(batch)
+        assert len(body) > 65536
+        response = client.post("/admin/healing-reports:batch", content=body,
+                               headers={"Content-Type": "application/json"})
+        assert response.status_code == 200
+        assert response.json()["stored"] == 100
+
+    def test_default_limit(self, client):
+        """Test that other paths use REQUEST_BODY_MAX_BYTES and count as other"""
+        before = rejected("other")
+        with patch("app.main.settings.REQUEST_BODY_MAX_BYTES", 100):
+            response = client.post("/chaos/heal", content=b"x" * 200)
+        assert response.status_code == 413
+        assert rejected("other") == before + 1
+
+    def test_get_not_limited(self, client):
+        """Test that GET requests are passed through"""
+        with patch("app.main.settings.REQUEST_BODY_MAX_BYTES", 0):
+            response = client.get("/api/v1/hello")
+        assert response.status_code == 200
+
+
+class TestBodySizeLimitMiddleware:
+    """Test the middleware on its own"""
+
+    def test_limit_for(self):
+        """Test per-path limits with the default as fallback"""
+        settings = Settings(REQUEST_BODY_MAX_BYTES=10, REQUEST_BODY_LIMITS={"/big": 1000})
+        middleware = BodySizeLimitMiddleware(None, settings)
+        assert middleware.limit_for("/big") == 1000
+        assert middleware.limit_for("/other") == 10
+
+    def test_exact_limit_allowed(self):
+        """Test that a body of exactly the limit reaches the app"""
+        seen = []
+
+        async def echo(scope, receive, send):
+            message = await receive()
+            seen.append(message["body"])
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        settings = Settings(REQUEST_BODY_MAX_BYTES=10, REQUEST_BODY_LIMITS={})
+        middleware = BodySizeLimitMiddleware(echo, settings)
+        status, _, _ = asyncio.run(stream(middleware, "POST", "/x", [b"x" * 10], content_length=10))
+        assert status == 200
+        assert seen == [b"x" * 10]
+
+    def test_stops_reading_at_limit(self):
+        """Test that the application never receives the chunks past the limit"""
+        received = []
+
+        async def read_all(scope, receive, send):
+            while True:
+                message = await receive()
+                received.append(message["body"])
+                if not message.get("more_body"):
+                    break
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        settings = Settings(REQUEST_BODY_MAX_BYTES=65536, REQUEST_BODY_LIMITS={})
+        middleware = BodySizeLimitMiddleware(read_all, settings)
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(stream(middleware, "POST", "/x", [b"x" * 16384] * 10))
+        assert exc_info.value.status_code == 413
+        # The fifth 16 KiB chunk crosses 64 KiB and is not handed on
+        assert len(received) == 4
+
@@ -0,0 +1,291 @@
+"""
+Tests for cluster-wide chaos coordination
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, Gauge, Histogram
+from unittest.mock import patch
+
+from app.main import app, chaos_cluster, chaos_state, cluster_heal_tasks, heal_for_healer, io_pressure
+from app.chaos_cluster import ChaosCluster
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Mesh:
+    """ChaosCluster nodes wired to each other through an in-memory transport"""
+
+    def __init__(self, names, **kwargs):
+        self.registry = CollectorRegistry()
+        self.histogram = Histogram("convergence", "", registry=self.registry)
+        self.down = set()
+        self.applied = {name: [] for name in names}
+        urls = [f"http://{name}" for name in names]
+        self.nodes = {
+            name: ChaosCluster(name, self._applier(name), peers=urls, retries=0,
+                               transport=httpx.MockTransport(self._handle),
+                               convergence_histogram=self.histogram,
+                               version_gauge=Gauge(f"version_{name}", "", registry=self.registry), **kwargs)
+            for name in names
+        }
+
+    def _applier(self, name):
+        async def apply(chaos, previous):
+            self.applied[name].append((chaos, previous))
+        return apply
+
+    async def _handle(self, request):
+        name = request.url.host
+        if name in self.down:
+            raise httpx.ConnectError("down", request=request)
+        return httpx.Response(200, json=await self.nodes[name].receive(json.loads(request.content)))
+
+    def versions(self):
+        return {name: node.state["version"] for name, node in self.nodes.items()}
+
+
+class TestChaosCluster:
+    """Test versioned state propagation"""
+
+    def test_publish_reaches_every_peer(self):
+        """Test that an inject and a heal converge on all nodes"""
+        mesh = Mesh(["a", "b", "c"])
+
+        async def scenario():
+            injected = await mesh.nodes["a"].publish("cpu_spike", {})
+            await mesh.nodes["b"].publish("loop_block", {"block_ms": 50})
+            return injected, await mesh.nodes["c"].publish(None)
+
+        injected, healed = asyncio.run(scenario())
+        assert injected["peers"] == injected["acknowledged"] == 3
+        assert injected["convergence_seconds"] is not None
+        assert mesh.versions() == {"a": 3, "b": 3, "c": 3}
+        assert all(node.state["chaos"] == {} for node in mesh.nodes.values())
+        # Each node applied every change it did not make itself
+        assert mesh.applied["a"][0][0] == {"cpu_spike": {}, "loop_block": {"block_ms": 50}}
+        assert mesh.applied["c"] == [({"cpu_spike": {}}, {}),
+                                     ({"cpu_spike": {}, "loop_block": {"block_ms": 50}}, {"cpu_spike": {}})]
+        assert healed["version"] == 3
+        assert mesh.registry.get_sample_value("convergence_count") == 3
+        assert mesh.registry.get_sample_value("version_b") == 3
+
+    def test_idempotent_and_ordered(self):
+        """Test that repeated, older and tied states are ignored deterministically"""
+        mesh = Mesh(["a"])
+        node = mesh.nodes["a"]
+
+        async def scenario():
+            state = {"version": 2, "origin": "m", "chaos": {"cpu_spike": {}}, "updated_at": 0.0}
+            results = [await node.receive(state), await node.receive(dict(state))]
+            results.append(await node.receive(dict(state, version=1, chaos={})))
+            results.append(await node.receive(dict(state, origin="l", chaos={})))
+            results.append(await node.receive(dict(state, origin="n", chaos={})))
+            return results
+
+        results = asyncio.run(scenario())
+        assert [r["applied"] for r in results] == [True, False, False, False, True]
+        assert node.state["origin"] == "n"
+        assert len(mesh.applied["a"]) == 2
+
+    def test_missed_state_catches_up(self):
+        """Test that a peer that was down reports unreachable and pulls the state on its next push"""
+        mesh = Mesh(["a", "b", "c"])
+
+        async def scenario():
+            mesh.down.add("c")
+            published = await mesh.nodes["a"].publish("memory_leak", {})
+            mesh.down.clear()
+            # c's periodic push of its version 0 state is answered with version 1
+            await mesh.nodes["c"].broadcast(mesh.nodes["c"].state)
+            return published
+
+        published = asyncio.run(scenario())
+        assert published["unreachable"] == ["http://c"]
+        assert published["acknowledged"] == 2
+        assert published["convergence_seconds"] is None
+        assert mesh.registry.get_sample_value("convergence_count") == 0
+        assert mesh.nodes["c"].state == mesh.nodes["a"].state
+        assert mesh.applied["c"] == [({"memory_leak": {}}, {})]
+
+    def test_dns_peers(self):
+        """Test that a DNS name resolves to one peer URL per address"""
+        cluster = ChaosCluster("a", None, peers=["http://static:8080/"], dns_name="localhost", port=9000)
+        peers = asyncio.run(cluster.peers())
+        assert "http://static:8080" in peers
+        assert "http://127.0.0.1:9000" in peers
+
+
+@pytest.fixture
+def cluster_client():
+    """Client with coordination enabled; the application's cluster and chaos state are restored afterwards"""
+    saved_state, saved_chaos = chaos_cluster.state, dict(chaos_state)
+    with patch("app.main.settings.CHAOS_CLUSTER_ENABLED", True):
+        yield TestClient(app)
+    client = TestClient(app)
+    client.post("/admin/chaos/heal")
+    chaos_cluster.state = saved_state
+    chaos_state.update(saved_chaos)
+
+
+class TestClusterEndpoints:
+    """Test the sync endpoint and how pushed states are applied"""
+
+    def test_sync_applies_newer_states(self, cluster_client):
+        """Test that a pushed state activates its chaos and a later heal clears it"""
+        version = chaos_cluster.state["version"]
+        state = {"version": version + 1, "origin": "peer", "updated_at": 0.0,
+                 "chaos": {"slow_responses": {}, "response_stream": {"mode": "truncate", "after_bytes": 1}}}
+        first = cluster_client.post("/admin/chaos/cluster/sync", json=state).json()
+        again = cluster_client.post("/admin/chaos/cluster/sync", json=state).json()
+        assert first["applied"] is True and again["applied"] is False
+        assert chaos_state["slow_responses_active"] and chaos_state["response_stream_active"]
+
+        state = dict(state, version=version + 3, chaos={"error_injection": {}})
+        assert cluster_client.post("/admin/chaos/cluster/sync", json=state).json()["applied"] is True
+        # The types missing from the newer state were healed in between
+        assert not chaos_state["slow_responses_active"] and not chaos_state["response_stream_active"]
+        assert chaos_state["error_injection_active"]
+        assert cluster_client.get("/admin/chaos/cluster").json()["state"]["version"] == version + 3
+
+    def test_publish_without_peers(self, cluster_client):
+        """Test that inject and heal bump the version even with no peers"""
+        version = chaos_cluster.state["version"]
+        injected = cluster_client.post("/admin/chaos/inject?chaos_type=slow_responses").json()
+        assert injected["cluster"]["version"] == version + 1
+        assert injected["cluster"]["peers"] == injected["cluster"]["acknowledged"] == 0
+        assert chaos_cluster.state["chaos"] == {"slow_responses": {}}
+        assert cluster_client.post("/admin/chaos/heal").json()["cluster"]["version"] == version + 2
+
+    def test_changed_params_restart(self, cluster_client, tmp_path):
+        """Test that new params for a type that cannot be reconfigured restart it"""
+        version = chaos_cluster.state["version"]
+        state = {"version": version + 1, "origin": "peer", "updated_at": 0.0,
+                 "chaos": {"slow_responses": {}, "io_pressure": {"iops": 10.0, "fsync_every": 0}}}
+        try:
+            with patch.object(io_pressure, "directory", str(tmp_path)):
+                cluster_client.post("/admin/chaos/cluster/sync", json=state)
+                assert io_pressure.status()["target"]["iops"] == 10.0
+                state = dict(state, version=version + 2,
+                             chaos=dict(state["chaos"], io_pressure={"iops": 20.0, "fsync_every": 0}))
+                cluster_client.post("/admin/chaos/cluster/sync", json=state)
+        finally:
+            target = io_pressure.status()["target"]
+            io_pressure.stop()
+        assert target["iops"] == 20.0
+        assert chaos_state["slow_responses_active"] and chaos_state["io_pressure_active"]
+
+    def test_already_active_not_published(self, cluster_client, tmp_path):
+        """Test that an injection that applied nothing leaves the cluster state alone"""
+        try:
+            with patch.object(io_pressure, "directory", str(tmp_path)):
+                cluster_client.post("/admin/chaos/inject?chaos_type=io_pressure&iops=10")
+                version = chaos_cluster.state["version"]
+                again = cluster_client.post("/admin/chaos/inject?chaos_type=io_pressure&iops=20").json()
+        finally:
+            io_pressure.stop()
+        assert again["status"] == "already_active"
+        assert "cluster" not in again
+        assert chaos_cluster.state["version"] == version
+        assert chaos_cluster.state["chaos"]["io_pressure"] == {"iops": 10.0}
+
+    def test_healer_heals_are_published(self, cluster_client):
+        """Test that a heal by the in-process healer clears the cluster state too"""
+        cluster_client.post("/admin/chaos/inject?chaos_type=error_injection")
+        version = chaos_cluster.state["version"]
+
+        async def scenario():
+            actions = heal_for_healer()
+            await asyncio.gather(*cluster_heal_tasks)
+            return actions
+
+        with patch("app.main.settings.CHAOS_CLUSTER_ENABLED", True):
+            assert "error_injection_stopped" in asyncio.run(scenario())
+        assert chaos_cluster.state["version"] == version + 1
+        assert chaos_cluster.state["chaos"] == {}
+
+    def test_disabled_and_token(self):
+        """Test the switch and the admin token on pushes"""
+        client = TestClient(app)
+        state = {"version": 1, "origin": "peer", "chaos": {}}
+        assert client.get("/admin/chaos/cluster").status_code == 404
+        assert "cluster" not in client.post("/admin/chaos/heal").json()
+        with patch("app.main.settings.CHAOS_CLUSTER_ENABLED", True), \
+                patch("app.main.settings.ADMIN_TOKEN", "secret"):
+            assert client.post("/admin/chaos/cluster/sync", json=state).status_code == 403
+            assert client.post("/admin/chaos/cluster/sync", json=dict(state, version=-1),
+                               headers={"X-Admin-Token": "secret"}).status_code == 422
+
+
+def free_ports(count):
+    sockets = [socket.socket() for _ in range(count)]
+    for sock in sockets:
+        sock.bind(("127.0.0.1", 0))
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets:
+        sock.close()
+    return ports
+
+
+@pytest.fixture
+def replicas():
+    """Three application processes coordinating chaos through a static peer list"""
+    ports = free_ports(3)
+    urls = [f"http://127.0.0.1:{port}" for port in ports]
+    env = dict(os.environ, CHAOS_CLUSTER_ENABLED="true", CHAOS_CLUSTER_PEERS=json.dumps(urls),
+               CHAOS_CLUSTER_SYNC_INTERVAL="0.5", TRACING_ENABLED="false", LOG_LEVEL="WARNING")
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                         cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for port in ports
+    ]
+    try:
+        deadline = time.monotonic() + 30.0
+        for url in urls:
+            while True:
+                try:
+                    if httpx.get(url + "/ready", timeout=1.0).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                assert time.monotonic() < deadline, "replicas did not become ready"
+                time.sleep(0.1)
+        yield urls
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(10)
+
+
+class TestLocalReplicas:
+    """Test coordination between real processes"""
+
+    def test_inject_and_heal_across_processes(self, replicas):
+        """Test that an inject on one replica and a heal on another reach all of them"""
+        injected = httpx.post(replicas[0] + "/admin/chaos/inject?chaos_type=response_stream&mode=throttle"
+                              "&route=/api/v1/status&bytes_per_second=100000").json()
+        assert injected["cluster"]["acknowledged"] == 3
+        assert injected["cluster"]["convergence_seconds"] < 1.0
+        for url in replicas:
+            status = httpx.get(url + "/admin/chaos/status").json()
+            assert status["active_chaos"] == ["response_stream"]
+            assert status["response_stream"]["route"] == "/api/v1/status"
+
+        healed = httpx.post(replicas[1] + "/admin/chaos/heal").json()
+        assert healed["cluster"]["version"] == 2
+        for url in replicas:
+            assert httpx.get(url + "/admin/chaos/status").json()["active_chaos"] == []
+            cluster = httpx.get(url + "/admin/chaos/cluster").json()
+            assert cluster["state"]["version"] == 2
+            assert cluster["state"]["chaos"] == {}
+        metrics = httpx.get(replicas[1] + "/metrics").text
+        assert "chaos_cluster_convergence_seconds_count 1.0" in metrics
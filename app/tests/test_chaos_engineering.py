@@ -4,11 +4,15 @@ Tests for chaos injection, healing, and monitoring functionality
 """
 import pytest
 import asyncio
+import json
 import time
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 
-from app.main import app, chaos_state, healing_reports_storage
+from prometheus_client import REGISTRY
+
+from app.main import app, chaos_state, healing_reports_storage, loop_block_tasks
+from app.warmup import asgi_request, asgi_response
 
 
 @pytest.fixture
@@ -30,6 +34,9 @@ def reset_chaos_state():
         "slow_responses_active": False,
         "error_injection_active": False,
         "cpu_spike_active": False,
+        "loop_block_active": False,
+        "io_pressure_active": False,
+        "response_stream_active": False,
         "memory_objects": [],
         "chaos_history": []
     })
@@ -127,6 +134,76 @@ class TestChaosInjection:
         client.post("/admin/health/toggle")
 
 
+async def sleep_lag(sleeps: int = 20) -> float:
+    """Largest late wake-up of `sleeps` 10ms sleeps"""
+    lags = []
+    for _ in range(sleeps):
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+    return max(lags)
+
+
+class TestLoopBlockChaos:
+    """Test blocking chaos on the event loop thread"""
+    
+    def test_blocks_loop_until_healed(self, reset_chaos_state):
+        """Test that the loop stalls for block_ms every interval_ms until healed"""
+        before = REGISTRY.get_sample_value("chaos_loop_block_seconds_count") or 0.0
+        
+        async def scenario():
+            status, _, body = await asgi_response(app, "POST", "/admin/chaos/inject",
+                                                  "chaos_type=loop_block&block_ms=100&interval_ms=50")
+            assert status == 200
+            data = json.loads(body)
+            assert data["status"] == "activated"
+            assert data["details"] == "Event loop blocked for 100ms every 50ms"
+            # A 10ms sleep wakes up late by a whole block
+            blocked = await sleep_lag()
+            _, _, body = await asgi_response(app, "GET", "/admin/chaos/status")
+            active = json.loads(body)
+            _, _, body = await asgi_response(app, "POST", "/admin/chaos/heal")
+            healed = json.loads(body)
+            await asyncio.sleep(0.1)
+            # Once healed, sleeps wake up on time
+            return blocked, active, healed, await sleep_lag()
+        
+        blocked, active, healed, after = asyncio.run(scenario())
+        assert blocked >= 0.09
+        assert active["active_chaos"] == ["loop_block"]
+        assert active["system_impact"]["performance_degraded"] is True
+        assert healed["actions_taken"] == ["loop_block_stopped"]
+        assert after < 0.05
+        assert not chaos_state["loop_block_active"]
+        assert not loop_block_tasks
+        assert REGISTRY.get_sample_value("chaos_loop_block_seconds_count") >= before + 2
+        assert REGISTRY.get_sample_value("chaos_loop_block_seconds_sum") >= 0.2
+    
+    def test_defaults_and_already_active(self, reset_chaos_state):
+        """Test the configured defaults and a second injection"""
+        async def scenario():
+            first = await asgi_response(app, "POST", "/admin/chaos/inject", "chaos_type=loop_block")
+            second = await asgi_response(app, "POST", "/admin/chaos/inject", "chaos_type=loop_block")
+            await asgi_request(app, "POST", "/admin/chaos/heal")
+            return json.loads(first[2]), json.loads(second[2])
+        
+        with patch("app.main.settings.CHAOS_LOOP_BLOCK_MS", 20.0), \
+                patch("app.main.settings.CHAOS_LOOP_BLOCK_INTERVAL_MS", 500.0):
+            first, second = asyncio.run(scenario())
+        assert first["details"] == "Event loop blocked for 20ms every 500ms"
+        assert second["status"] == "already_active"
+    
+    def test_parameter_bounds(self, client, reset_chaos_state):
+        """Test that blocks are capped and intervals have a floor"""
+        with patch("app.main.settings.CHAOS_LOOP_BLOCK_MAX_MS", 500.0):
+            response = client.post("/admin/chaos/inject?chaos_type=loop_block&block_ms=600")
+        assert response.status_code == 400
+        assert "block_ms" in response.json()["detail"]
+        assert client.post("/admin/chaos/inject?chaos_type=loop_block&block_ms=0").status_code == 400
+        assert client.post("/admin/chaos/inject?chaos_type=loop_block&interval_ms=5").status_code == 400
+        assert chaos_state["loop_block_active"] is False
+
+
 class TestChaosHealing:
     """Test chaos healing endpoints"""
     
@@ -268,6 +345,52 @@ class TestHealingReports:
         assert data["summary"]["successful_healings"] == 1
         assert data["summary"]["partial_healings"] == 1
         assert data["summary"]["failed_healings"] == 1
+    
+    def test_store_healing_report_validates(self, client, reset_chaos_state):
+        """Test that invalid reports are rejected and nothing is stored"""
+        response = client.post("/admin/healing-report", json={"workflow_id": "x" * 500})
+        assert response.status_code == 422
+        assert healing_reports_storage == []
+    
+    def test_store_healing_reports_batch(self, client, reset_chaos_state):
+        """Test storing several reports in one request"""
+        reports = [
+            {"workflow_id": f"batch_{i}", "original_alert": {"chaos_type": chaos_type}, "overall_status": "success"}
+            for i, chaos_type in enumerate(["memory_leak", "memory_leak", "cpu_spike"])
+        ]
+        response = client.post("/admin/healing-reports:batch", json={"reports": reports})
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["stored"] == 3
+        assert data["report_ids"] == ["batch_0", "batch_1", "batch_2"]
+        assert data["chaos_types"] == {"memory_leak": 2, "cpu_spike": 1}
+        assert [r["workflow_id"] for r in healing_reports_storage] == ["batch_0", "batch_1", "batch_2"]
+        assert all(r["stored_at"] == data["timestamp"] for r in healing_reports_storage)
+    
+    def test_batch_is_all_or_nothing(self, client, reset_chaos_state):
+        """Test that one invalid report rejects the whole batch"""
+        reports = [{"workflow_id": "ok"}, {"overall_status": "x" * 100}]
+        response = client.post("/admin/healing-reports:batch", json={"reports": reports})
+        assert response.status_code == 422
+        assert healing_reports_storage == []
+    
+    def test_storage_keeps_last_100(self, client, reset_chaos_state):
+        """Test that batches are trimmed to the most recent reports"""
+        reports = [{"workflow_id": f"r{i}"} for i in range(150)]
+        response = client.post("/admin/healing-reports:batch", json={"reports": reports})
+        assert response.status_code == 200
+        assert len(healing_reports_storage) == 100
+        assert healing_reports_storage[0]["workflow_id"] == "r50"
+    
+    def test_ingest_benchmark(self, reset_chaos_state):
+        """Test the ingest benchmark against the real endpoints"""
+        from app.benchmarks import ingest
+        results = asyncio.run(ingest.run(app, healing_reports_storage, count=20, batch_sizes=[1, 10]))
+        assert [r["batch_size"] for r in results] == [1, 10]
+        assert [r["requests"] for r in results] == [20, 2]
+        assert all(r["failed"] == 0 and r["reports_per_second"] > 0 for r in results)
+        assert healing_reports_storage == []
 
 
 class TestChaosMiddleware:
@@ -0,0 +1,191 @@
+"""
+Tests for single-flight request coalescing
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import patch
+
+from app.main import app, chaos_state, single_flight, REQUESTS_COALESCED
+from app.coalescing import SingleFlight
+from app.warmup import asgi_request
+
+
+def coalesced(route, role):
+    """Current value of the coalescing counter"""
+    return REQUESTS_COALESCED.labels(route=route, role=role)._value.get()
+
+
+class TestSingleFlight:
+    """Test SingleFlight"""
+
+    def test_concurrent_calls_share_one_run(self):
+        """Test that followers get the leader's result without running again"""
+        flight = SingleFlight(SimpleNamespace(COALESCING_ENABLED=True))
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        async def scenario():
+            return await asyncio.gather(*(flight.do("key", compute) for _ in range(10)))
+
+        results = asyncio.run(scenario())
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.inflight == {}
+
+    def test_exception_shared_then_retried(self):
+        """Test that a failed run fails its followers and is not remembered"""
+        flight = SingleFlight(SimpleNamespace(COALESCING_ENABLED=True))
+        attempts = []
+
+        async def compute():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+            return "ok"
+
+        async def scenario():
+            first = await asyncio.gather(*(flight.do("key", compute) for _ in range(3)),
+                                         return_exceptions=True)
+            return first, await flight.do("key", compute)
+
+        first, second = asyncio.run(scenario())
+        assert all(isinstance(result, RuntimeError) for result in first)
+        assert second == "ok"
+        assert len(attempts) == 2
+
+    def test_leader_cancellation_does_not_cancel_followers(self):
+        """Test that followers still get a result when the leader goes away"""
+        flight = SingleFlight(SimpleNamespace(COALESCING_ENABLED=True))
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def scenario():
+            leader = asyncio.ensure_future(flight.do("key", compute))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do("key", compute))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower, leader
+
+        result, leader = asyncio.run(scenario())
+        assert result == "done"
+        assert leader.cancelled()
+
+    def test_distinct_keys_not_coalesced(self):
+        """Test that different parameters run separately"""
+        flight = SingleFlight(SimpleNamespace(COALESCING_ENABLED=True))
+        calls = []
+
+        @flight.coalesce("/x")
+        async def handler(name: str = "World"):
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            return name
+
+        async def scenario():
+            return await asyncio.gather(handler(name="a"), handler(name="b"), handler(name="a"))
+
+        assert asyncio.run(scenario()) == ["a", "b", "a"]
+        assert sorted(calls) == ["a", "b"]
+
+    def test_disabled_passes_through(self):
+        """Test that every call runs the handler when coalescing is off"""
+        flight = SingleFlight(SimpleNamespace(COALESCING_ENABLED=False))
+        calls = []
+
+        @flight.coalesce("/x")
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+
+        async def scenario():
+            await asyncio.gather(*(handler() for _ in range(5)))
+
+        asyncio.run(scenario())
+        assert len(calls) == 5
+        assert flight.inflight == {}
+
+
+async def burst(count, path="/api/v1/hello", query="name=burst"):
+    """Send identical concurrent requests; exceptions stand for injected errors"""
+    async def one():
+        try:
+            return await asgi_request(app, "GET", path, query)
+        except Exception:
+            return 500
+    return await asyncio.gather(*(one() for _ in range(count)))
+
+
+@pytest.fixture
+def coalescing_enabled():
+    """Enable coalescing and reset chaos afterwards"""
+    with patch("app.main.settings.COALESCING_ENABLED", True):
+        yield single_flight
+    chaos_state["error_injection_active"] = False
+    chaos_state["slow_responses_active"] = False
+
+
+class TestCoalescedRoutes:
+    """Test coalescing on the hello and status routes"""
+
+    @pytest.mark.parametrize("path,query", [("/api/v1/hello", "name=burst"), ("/api/v1/status", "")])
+    def test_burst_served(self, coalescing_enabled, path, query):
+        """Test that every request of a burst succeeds and is counted once"""
+        before = coalesced(path, "leader") + coalesced(path, "follower")
+        statuses = asyncio.run(burst(20, path, query))
+        assert statuses == [200] * 20
+        assert coalesced(path, "leader") + coalesced(path, "follower") - before == 20
+
+    def test_shared_run_is_not_repeated(self, coalescing_enabled):
+        """Test that concurrent identical requests run the handler once"""
+        original_do = single_flight.do
+        handler_runs = []
+
+        async def scenario():
+            # Hold the shared run until the whole burst has arrived
+            gate = asyncio.Event()
+
+            async def gated_do(key, func, route=""):
+                async def gated():
+                    await gate.wait()
+                    handler_runs.append(key)
+                    return await func()
+                return await original_do(key, gated, route)
+
+            async def open_gate():
+                await asyncio.sleep(0.05)
+                gate.set()
+
+            with patch.object(single_flight, "do", side_effect=gated_do):
+                statuses, _ = await asyncio.gather(burst(10), open_gate())
+            return statuses
+
+        assert asyncio.run(scenario()) == [200] * 10
+        assert len(handler_runs) == 1
+
+    def test_injected_errors_stay_per_request(self, coalescing_enabled):
+        """Test that chaos errors only fail the requests they were injected into"""
+        chaos_state["error_injection_active"] = True
+        # Every other request draws an injected error
+        draws = iter([0.1, 0.9] * 20)
+        with patch("app.main.random.random", side_effect=lambda: next(draws)):
+            statuses = asyncio.run(burst(20))
+        assert statuses.count(500) == 10
+        assert statuses.count(200) == 10
+
+    def test_injected_delays(self, coalescing_enabled):
+        """Test that slow_responses chaos still lets every request complete"""
+        chaos_state["slow_responses_active"] = True
+        with patch("app.main.random.uniform", return_value=0.01):
+            statuses = asyncio.run(burst(10))
+        assert statuses == [200] * 10
+        assert single_flight.inflight == {}
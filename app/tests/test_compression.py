@@ -0,0 +1,139 @@
+"""
+Tests for negotiated response compression
+"""
+import asyncio
+import gzip
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, settings
+from app.compression import CompressionMiddleware, ENCODERS, compress, negotiate
+from app.benchmarks import compression as compression_benchmark
+from app.warmup import asgi_response
+
+brotli = pytest.importorskip("brotli")
+zstandard = pytest.importorskip("zstandard")
+
+PREFERENCE = ["zstd", "br", "gzip"]
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+def raw_get(path, accept_encoding, app_=app):
+    """Send a request and return status, headers and the undecoded body"""
+    return asyncio.run(asgi_response(app_, "GET", path, headers={"Accept-Encoding": accept_encoding}))
+
+
+class TestNegotiation:
+    """Test Accept-Encoding negotiation"""
+
+    @pytest.mark.parametrize("header,expected", [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("zstd, br, gzip", "zstd"),
+        ("br;q=0, gzip;q=0.5", "gzip"),
+        ("*", "zstd"),
+        ("*, zstd;q=0", "br"),
+        ("identity", None),
+        ("", None),
+    ])
+    def test_negotiate(self, header, expected):
+        """Test server preference among accepted encodings"""
+        assert negotiate(header, PREFERENCE) == expected
+
+    @pytest.mark.parametrize("encoding", list(ENCODERS))
+    def test_round_trip(self, encoding):
+        """Test every encoder produces a decodable stream"""
+        data = b"metric_line 1.0\n" * 500
+        decoders = {"gzip": gzip.decompress, "br": brotli.decompress,
+                    "zstd": lambda b: zstandard.ZstdDecompressor().decompressobj().decompress(b)}
+        assert decoders[encoding](compress(data, encoding, 3)) == data
+
+
+class TestCompressionMiddleware:
+    """Test compression on the request path"""
+
+    @pytest.mark.parametrize("encoding", ["gzip", "br", "zstd"])
+    def test_metrics_compressed(self, encoding):
+        """Test /metrics is compressed with the negotiated encoding"""
+        status, headers, body = raw_get("/metrics", encoding)
+        assert status == 200
+        assert headers["content-encoding"] == encoding
+        assert "Accept-Encoding" in headers["vary"]
+        assert int(headers["content-length"]) == len(body)
+
+    def test_client_decodes(self, client):
+        """Test clients transparently decode compressed responses"""
+        response = client.get("/metrics", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "http_requests_total" in response.text
+
+    def test_small_responses_not_compressed(self):
+        """Test responses under the size threshold are sent as is"""
+        status, headers, body = raw_get("/healthz", "gzip, br, zstd")
+        assert status == 200
+        assert "content-encoding" not in headers
+        assert b"healthy" in body
+
+    def test_no_accept_encoding(self):
+        """Test identity responses for clients that do not accept compression"""
+        _, headers, body = raw_get("/metrics", "identity")
+        assert "content-encoding" not in headers
+        assert b"http_requests_total" in body
+
+    def test_disabled(self):
+        """Test COMPRESSION_ENABLED=false"""
+        with patch("app.main.settings.COMPRESSION_ENABLED", False):
+            _, headers, _ = raw_get("/metrics", "gzip")
+        assert "content-encoding" not in headers
+
+    def test_openapi_compressed_once(self):
+        """Test the OpenAPI schema is compressed once and then served from cache"""
+        calls = []
+        original = compress
+
+        def counting_compress(data, encoding, level):
+            calls.append((encoding, level))
+            return original(data, encoding, level)
+
+        with patch("app.compression.compress", side_effect=counting_compress):
+            middleware = CompressionMiddleware(app.router, settings, static_paths=("/openapi.json",))
+            first = raw_get("/openapi.json", "br", middleware)
+            second = raw_get("/openapi.json", "br", middleware)
+            raw_get("/openapi.json", "gzip", middleware)
+        assert calls == [("br", 11), ("gzip", 9)]
+        assert first[2] == second[2]
+        assert brotli.decompress(first[2]).startswith(b"{")
+        assert first[1]["content-type"] == "application/json"
+
+    def test_streaming_response(self):
+        """Test multi-chunk bodies are encoded incrementally without Content-Length"""
+        async def streaming_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/plain")]})
+            for i in range(5):
+                await send({"type": "http.response.body", "body": b"chunk %d\n" % i, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        middleware = CompressionMiddleware(streaming_app, settings)
+        _, headers, body = raw_get("/stream", "gzip", middleware)
+        assert headers["content-encoding"] == "gzip"
+        assert "content-length" not in headers
+        assert gzip.decompress(body) == b"".join(b"chunk %d\n" % i for i in range(5))
+
+
+class TestCompressionBenchmark:
+    """Test the per-level compression benchmark"""
+
+    def test_run(self):
+        """Test every encoding and level is measured"""
+        results = compression_benchmark.run({"sample": b"x=1\n" * 1000}, repeat=1)
+        rows = results["sample"]
+        assert len(rows) == sum(len(compression_benchmark.LEVELS[e]) for e in ENCODERS)
+        assert all(row["ratio"] > 1 for row in rows)
@@ -0,0 +1,233 @@
+"""
+Tests for adaptive concurrency limiting and load shedding
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, concurrency_limiter
+from app.concurrency_limit import GradientLimiter
+from app.benchmarks import load
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def limiter_enabled():
+    """Enable load shedding with a freshly reset shared limiter"""
+    concurrency_limiter.reset()
+    with patch("app.main.settings.CONCURRENCY_LIMIT_ENABLED", True):
+        yield concurrency_limiter
+    concurrency_limiter.reset()
+
+
+@pytest.fixture
+def saturated_limiter(limiter_enabled):
+    """Make the shared limiter look fully occupied"""
+    original_inflight = concurrency_limiter.inflight
+    concurrency_limiter.limit = 10.0
+    concurrency_limiter.inflight = 10
+    yield concurrency_limiter
+    concurrency_limiter.inflight = original_inflight
+
+
+class TestGradientLimiter:
+    """Test GradientLimiter"""
+
+    def test_admits_up_to_limit(self):
+        """Test admission control"""
+        limiter = GradientLimiter(initial_limit=2, min_limit=1)
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        limiter.release(0.01)
+        assert limiter.try_acquire()
+
+    def test_additive_increase_when_busy(self):
+        """Test that the limit grows while there is no queueing delay"""
+        limiter = GradientLimiter(initial_limit=10, min_limit=1, max_limit=100)
+        for _ in range(200):
+            while limiter.try_acquire():
+                pass
+            limiter.release(0.01)
+        assert limiter.current_limit > 10
+
+    def test_no_increase_when_idle(self):
+        """Test that an unused limit does not grow"""
+        limiter = GradientLimiter(initial_limit=10, min_limit=1)
+        for _ in range(100):
+            limiter.try_acquire()
+            limiter.release(0.01)
+        assert limiter.current_limit == 10
+
+    def test_decrease_on_queueing_delay(self):
+        """Test that queueing delay past the target cuts the limit"""
+        limiter = GradientLimiter(initial_limit=100, min_limit=5, queue_delay_target=0.05,
+                                  decrease_interval=0, short_window=1)
+        limiter.try_acquire()
+        limiter.release(0.01)
+        for _ in range(10):
+            limiter.try_acquire()
+            limiter.release(0.5)
+        assert limiter.gradient == 0.5
+        assert 5 <= limiter.current_limit < 100
+
+    def test_decrease_rate_limited(self):
+        """Test that a burst of slow completions only cuts once per interval"""
+        limiter = GradientLimiter(initial_limit=100, decrease_interval=60, short_window=1)
+        limiter.try_acquire()
+        limiter.release(0.01)
+        for _ in range(10):
+            limiter.try_acquire()
+            limiter.release(0.5)
+        assert limiter.current_limit == 90
+
+    def test_limit_bounds(self):
+        """Test min and max limits"""
+        limiter = GradientLimiter(initial_limit=10, min_limit=8, max_limit=11,
+                                  decrease_interval=0, short_window=1)
+        limiter.try_acquire()
+        limiter.release(0.01)
+        for _ in range(50):
+            limiter.try_acquire()
+            limiter.release(1.0)
+        assert limiter.current_limit == 8
+
+        limiter = GradientLimiter(initial_limit=10, min_limit=1, max_limit=11)
+        for _ in range(1000):
+            while limiter.try_acquire():
+                pass
+            limiter.release(0.01)
+        assert limiter.current_limit == 11
+
+    def test_queueing_below_target_not_shed(self):
+        """Test that a steady queue under the delay target keeps the limit"""
+        limiter = GradientLimiter(initial_limit=20, decrease_interval=0)
+        limiter.try_acquire()
+        limiter.release(0.001)
+        # 16 requests in flight, each waiting ~20ms behind the others
+        for _ in range(16):
+            limiter.try_acquire()
+        for _ in range(500):
+            limiter.release(0.021)
+            limiter.try_acquire()
+        assert limiter.current_limit >= 20
+
+    def test_route_mix_uses_per_route_baseline(self):
+        """Test that a slow route is not mistaken for queueing on a fast one"""
+        limiter = GradientLimiter(initial_limit=20, decrease_interval=0)
+        for _ in range(500):
+            limiter.try_acquire()
+            limiter.release(0.001, "/fast")
+            limiter.try_acquire()
+            limiter.release(0.2, "/slow")
+        assert limiter.current_limit == 20
+        assert limiter.baseline("/fast") == pytest.approx(0.001)
+        assert limiter.baseline("/slow") == pytest.approx(0.2)
+
+    def test_baseline_recovers_after_window(self):
+        """Test that the windowed baseline tracks a new minimum"""
+        limiter = GradientLimiter(baseline_window=5)
+        limiter.try_acquire()
+        limiter.release(0.001, "/x")
+        for _ in range(10):
+            limiter.try_acquire()
+            limiter.release(0.01, "/x")
+        assert limiter.baseline("/x") == pytest.approx(0.01)
+
+    def test_route_cardinality_bounded(self):
+        """Test that unknown paths beyond max_routes share one baseline"""
+        limiter = GradientLimiter(max_routes=4)
+        for i in range(100):
+            limiter.try_acquire()
+            limiter.release(0.01, f"/missing/{i}")
+        assert len(limiter._routes) <= 5
+
+    def test_reset(self):
+        """Test that reset forgets learned state"""
+        limiter = GradientLimiter(initial_limit=30, decrease_interval=0, short_window=1)
+        limiter.try_acquire()
+        limiter.release(0.001, "/x")
+        limiter.try_acquire()
+        limiter.release(1.0, "/x")
+        assert limiter.current_limit < 30
+        limiter.reset()
+        assert limiter.current_limit == 30
+        assert limiter.baseline("/x") is None
+
+
+class TestConcurrencyLimitMiddleware:
+    """Test load shedding on the request path"""
+
+    def test_sheds_with_retry_after(self, client, saturated_limiter):
+        """Test fast 503 with Retry-After when over the limit"""
+        response = client.get("/api/v1/hello")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert "overloaded" in response.json()["detail"]
+
+    @pytest.mark.parametrize("path", ["/healthz", "/ready", "/metrics", "/admin/chaos/status"])
+    def test_exempt_paths_always_admitted(self, client, saturated_limiter, path):
+        """Test that probes, metrics and admin endpoints bypass the limiter"""
+        from app.main import app_state
+        app_state["ready"] = True
+        assert client.get(path).status_code == 200
+
+    def test_shed_metrics(self, client, saturated_limiter):
+        """Test shed counter and limit gauge are exported"""
+        client.get("/api/v1/hello")
+        content = client.get("/metrics").text
+        shed_line = [line for line in content.splitlines() if line.startswith("http_requests_shed_total ")][0]
+        assert float(shed_line.split()[1]) >= 1
+        assert "http_concurrency_limit " in content
+
+    def test_disabled_limiter_admits(self, client, saturated_limiter):
+        """Test that CONCURRENCY_LIMIT_ENABLED=false turns shedding off"""
+        with patch("app.main.settings.CONCURRENCY_LIMIT_ENABLED", False):
+            assert client.get("/api/v1/hello").status_code == 200
+
+    def test_inflight_released(self, client, limiter_enabled):
+        """Test that admitted requests release their slot"""
+        before = concurrency_limiter.inflight
+        assert client.get("/api/v1/hello").status_code == 200
+        assert concurrency_limiter.inflight == before
+
+    def test_chaos_delay_excluded_from_latency(self, client, limiter_enabled):
+        """Test that injected chaos delays are not fed to the limiter"""
+        from app.main import chaos_state
+        samples = []
+        original_release = concurrency_limiter.release
+        chaos_state["slow_responses_active"] = True
+        try:
+            with patch("app.main.random.uniform", return_value=0.2), \
+                    patch.object(concurrency_limiter, "release",
+                                 side_effect=lambda l, route: (samples.append(l), original_release(l, route))):
+                assert client.get("/api/v1/hello").status_code == 200
+        finally:
+            chaos_state["slow_responses_active"] = False
+        assert samples and samples[0] < 0.2
+
+
+class TestLoadSweep:
+    """Test the saturation load test harness"""
+
+    def test_run_level(self):
+        """Test a tiny load level reports goodput"""
+        result = asyncio.run(load.run_level(app, concurrency=4, duration=0.2, slo=1.0))
+        assert result["concurrency"] == 4
+        assert result["throughput"] > 0
+        assert result["goodput"] <= result["throughput"]
+        assert result["errors"] == 0
+
+    def test_no_shedding_below_saturation(self, limiter_enabled):
+        """Test that a steady client population under the delay target is never shed"""
+        result = asyncio.run(load.run_level(app, concurrency=16, duration=1.0, slo=1.0))
+        assert result["shed_per_second"] == 0
+        assert result["errors"] == 0
+        assert limiter_enabled.current_limit >= 16
@@ -24,7 +24,9 @@ class TestSettings:
         assert settings.TRACING_ENABLED is True
         assert settings.JAEGER_ENDPOINT is None
         assert settings.JAEGER_PORT == 6831
-        assert settings.STARTUP_DELAY == 2
+        assert settings.STARTUP_DELAY == 0
+        assert settings.SERVER_TIMING_ALLOW_HEADER is False
+        assert settings.CONCURRENCY_LIMIT_ENABLED is False
     
     @patch.dict(os.environ, {
         "PORT": "9000",
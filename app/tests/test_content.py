@@ -0,0 +1,169 @@
+"""
+Tests for MessagePack/CBOR content negotiation
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, healing_reports_storage
+from app.content import CBOR, CODECS, MSGPACK, NegotiatedRoute, decoder_for, negotiate
+from app.benchmarks import content as content_benchmark
+
+msgpack = pytest.importorskip("msgpack")
+cbor2 = pytest.importorskip("cbor2")
+
+PREFERENCE = [MSGPACK, CBOR]
+DECODERS = {MSGPACK: msgpack.unpackb, CBOR: cbor2.loads}
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def reports():
+    """Restore the healing report storage afterwards"""
+    saved = list(healing_reports_storage)
+    yield healing_reports_storage
+    healing_reports_storage[:] = saved
+
+
+class TestNegotiation:
+    """Test Accept negotiation"""
+
+    @pytest.mark.parametrize("header,expected", [
+        ("application/msgpack", MSGPACK),
+        ("application/x-msgpack", MSGPACK),
+        ("application/cbor", CBOR),
+        ("application/cbor, application/msgpack", MSGPACK),
+        ("application/msgpack;q=0.5, application/cbor", CBOR),
+        ("application/msgpack, application/json", MSGPACK),
+        ("application/json, application/msgpack;q=0.9", None),
+        ("application/msgpack;q=0", None),
+        ("*/*", None),
+        ("application/json", None),
+        ("text/html", None),
+        ("", None),
+    ])
+    def test_negotiate(self, header, expected):
+        """Test that binary formats are only chosen when named and preferred"""
+        assert negotiate(header, PREFERENCE) == expected
+
+    def test_decoder_for(self):
+        """Test request Content-Type lookup"""
+        assert decoder_for("application/msgpack") is CODECS[MSGPACK][1]
+        assert decoder_for("application/cbor; charset=binary") is CODECS[CBOR][1]
+        assert decoder_for("application/json") is None
+        assert decoder_for(None) is None
+
+
+class TestNegotiatedResponses:
+    """Test negotiated encodings on real routes"""
+
+    @pytest.mark.parametrize("media_type", [MSGPACK, CBOR])
+    @pytest.mark.parametrize("path", ["/api/v1/hello?name=Binary", "/healthz", "/ready", "/admin/healing-reports"])
+    def test_same_schema_as_json(self, client, media_type, path):
+        """Test that binary responses carry exactly the JSON fields"""
+        from app.main import app_state
+        app_state["ready"] = True
+        as_json = client.get(path).json()
+        response = client.get(path, headers={"Accept": media_type})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == media_type
+        decoded = DECODERS[media_type](response.content)
+        assert decoded.keys() == as_json.keys()
+        for key in ("message", "status", "version", "total_reports"):
+            if key in as_json:
+                assert decoded[key] == as_json[key]
+
+    def test_json_by_default(self, client):
+        """Test that browsers and plain clients still get JSON"""
+        for accept in (None, "*/*", "text/html,application/xhtml+xml,*/*;q=0.8"):
+            headers = {"Accept": accept} if accept else {}
+            response = client.get("/api/v1/hello", headers=headers)
+            assert response.headers["content-type"] == "application/json"
+            assert response.headers["vary"] == "Accept"
+
+    def test_errors_stay_json(self, client):
+        """Test that error responses are not negotiated"""
+        with patch("app.main.settings.ADMIN_TOKEN", None):
+            response = client.get("/admin/profile", headers={"Accept": MSGPACK})
+        assert response.status_code == 403
+        assert response.headers["content-type"] == "application/json"
+
+    def test_disabled(self, client):
+        """Test that CONTENT_NEGOTIATION_ENABLED=false always answers JSON"""
+        with patch("app.main.settings.CONTENT_NEGOTIATION_ENABLED", False):
+            response = client.get("/api/v1/hello", headers={"Accept": MSGPACK})
+        assert response.headers["content-type"] == "application/json"
+
+
+class TestNegotiatedBodies:
+    """Test binary request bodies"""
+
+    @pytest.mark.parametrize("media_type", [MSGPACK, CBOR])
+    def test_healing_report_body(self, client, reports, media_type):
+        """Test that a binary healing report is stored like a JSON one"""
+        report = content_benchmark.sample_report(7)
+        body = CODECS[media_type][0](report)
+        response = client.post("/admin/healing-report", content=body,
+                               headers={"Content-Type": media_type, "Accept": media_type})
+        assert response.status_code == 200
+        result = DECODERS[media_type](response.content)
+        assert result["report_id"] == "wf-000007"
+        assert result["chaos_type"] == "memory_leak"
+        assert healing_reports_storage[-1]["original_alert"] == report["original_alert"]
+
+    def test_undecodable_body(self, client, reports):
+        """Test that a corrupt binary body is a 400"""
+        response = client.post("/admin/healing-report", content=b"\xc1\xc1",
+                               headers={"Content-Type": MSGPACK})
+        assert response.status_code == 400
+        assert "decoded" in response.json()["detail"]
+
+    def test_wrong_shape_is_validation_error(self, client, reports):
+        """Test that decoded bodies go through the usual validation"""
+        response = client.post("/admin/healing-report", content=msgpack.packb([1, 2, 3]),
+                               headers={"Content-Type": MSGPACK})
+        assert response.status_code == 422
+
+    def test_rebuilt_request(self):
+        """Test that the handler gets a plain JSON request, built from the scope"""
+        body = msgpack.packb({"a": [1, 2]})
+        messages = [{"type": "http.request", "body": body, "more_body": False}, {"type": "http.disconnect"}]
+
+        async def receive():
+            return messages.pop(0)
+
+        async def scenario():
+            scope = {"type": "http", "method": "POST", "path": "/x",
+                     "headers": [(b"content-type", MSGPACK.encode()), (b"content-length", str(len(body)).encode()),
+                                 (b"x-other", b"1")]}
+            request = await NegotiatedRoute._decode_body(Request(scope, receive), msgpack.unpackb)
+            return request, await request.body(), await request.receive()
+
+        request, decoded, after = asyncio.run(scenario())
+        assert json.loads(decoded) == {"a": [1, 2]}
+        assert request.headers["content-type"] == "application/json"
+        assert request.headers["content-length"] == str(len(decoded))
+        assert request.headers["x-other"] == "1"
+        assert after == {"type": "http.disconnect"}
+
+
+class TestContentBenchmark:
+    """Test the content type benchmark"""
+
+    def test_run(self):
+        """Test one measurement per format and payload"""
+        results = content_benchmark.run(content_benchmark.sample_payloads(), repeat=2)
+        assert set(results) == {"hello", "health", "healing_report", "healing_reports"}
+        for rows in results.values():
+            assert [r["media_type"] for r in rows] == list(content_benchmark.FORMATS)
+            json_row, binary_rows = rows[0], rows[1:]
+            assert all(r["bytes"] < json_row["bytes"] for r in binary_rows)
@@ -0,0 +1,170 @@
+"""
+Tests for graceful drain
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, app_state, chaos_state, drain_controller
+from app.drain import DrainController, DRAINED, PROPAGATING
+from app.warmup import asgi_request
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    with patch("app.main.settings.ADMIN_TOKEN", "secret"):
+        yield TestClient(app, headers={"X-Admin-Token": "secret"})
+
+
+@pytest.fixture
+def restore_serving():
+    """Undo a drain of the shared application"""
+    yield drain_controller
+    drain_controller.reset()
+    app_state["ready"] = True
+    chaos_state["slow_responses_active"] = False
+
+
+class TestDrainController:
+    """Test DrainController"""
+
+    def test_steps_in_order(self):
+        """Test readiness flips first and new work is refused only after the delay"""
+        events = []
+        controller = DrainController(on_start=lambda: events.append("not_ready"))
+
+        async def scenario():
+            task = controller.start(propagation_delay=0.05, timeout=1.0)
+            assert events == ["not_ready"]
+            assert controller.state == PROPAGATING
+            assert controller.accepting
+            await asyncio.sleep(0.01)
+            assert controller.accepting
+            return await task
+
+        result = asyncio.run(scenario())
+        assert controller.state == DRAINED
+        assert not controller.accepting
+        assert result["abandoned"] == 0
+        assert result["duration"] >= 0.05
+
+    def test_waits_for_in_flight(self):
+        """Test that the drain finishes once in-flight requests complete"""
+        controller = DrainController(poll_interval=0.01)
+        controller.active = 3
+
+        async def finish_requests():
+            for _ in range(3):
+                await asyncio.sleep(0.02)
+                controller.active -= 1
+
+        async def scenario():
+            result, _ = await asyncio.gather(controller.drain(0, 5.0), finish_requests())
+            return result
+
+        result = asyncio.run(scenario())
+        assert result["abandoned"] == 0
+        assert 0.05 <= result["duration"] < 1.0
+
+    def test_deadline_abandons(self):
+        """Test abandoned requests are counted at the deadline"""
+        from app.main import DRAIN_ABANDONED
+        controller = DrainController(poll_interval=0.01, abandoned_counter=DRAIN_ABANDONED)
+        controller.active = 2
+        before = DRAIN_ABANDONED._value.get()
+        result = asyncio.run(controller.drain(0, 0.05))
+        assert result["abandoned"] == 2
+        assert DRAIN_ABANDONED._value.get() - before == 2
+
+    def test_request_caller_not_waited_for(self):
+        """Test that a drain started from a request does not wait for itself"""
+        controller = DrainController(poll_interval=0.01)
+        controller.active = 1
+        result = asyncio.run(controller.drain(0, 5.0, from_request=True))
+        assert result["abandoned"] == 0
+        assert result["duration"] < 1.0
+
+    def test_single_drain(self):
+        """Test that concurrent triggers join the same drain"""
+        controller = DrainController()
+
+        async def scenario():
+            return await asyncio.gather(controller.drain(0.01, 1.0), controller.drain(0, 0))
+
+        first, second = asyncio.run(scenario())
+        assert first is second
+
+
+class TestDrainEndpoint:
+    """Test the admin drain endpoint and request rejection"""
+
+    def test_drain_and_reject(self, client, restore_serving):
+        """Test drain with wait, then 503 for new work while probes keep working"""
+        response = client.post("/admin/drain?wait=true&propagation_delay=0&timeout=1")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["state"] == "drained"
+        assert data["result"]["abandoned"] == 0
+
+        assert client.get("/ready").status_code == 503
+        assert client.get("/healthz").status_code == 200
+        assert client.get("/metrics").status_code == 200
+        rejected = client.get("/api/v1/hello")
+        assert rejected.status_code == 503
+        assert rejected.headers["connection"] == "close"
+        assert "draining" in rejected.json()["detail"]
+
+    def test_drain_metrics(self, client, restore_serving):
+        """Test drain duration and state gauges are exported"""
+        client.post("/admin/drain?wait=true&propagation_delay=0&timeout=1")
+        content = client.get("/metrics").text
+        assert "application_drain_duration_seconds " in content
+        assert "application_draining 1.0" in content
+        assert "application_drain_abandoned_requests_total " in content
+
+    def test_invalid_params(self, client, restore_serving):
+        """Test negative durations are rejected"""
+        assert client.post("/admin/drain?timeout=-1").status_code == 400
+        assert drain_controller.accepting
+
+    def test_admin_token_required(self, restore_serving):
+        """Test the endpoint is guarded by ADMIN_TOKEN"""
+        with patch("app.main.settings.ADMIN_TOKEN", "secret"):
+            response = TestClient(app).post("/admin/drain", headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 403
+        assert drain_controller.accepting
+
+    def test_remote_caller_refused_without_token(self, restore_serving):
+        """Test that nobody but loopback can drain when ADMIN_TOKEN is unset"""
+        with patch("app.main.settings.ADMIN_TOKEN", None):
+            response = TestClient(app).post("/admin/drain")
+        assert response.status_code == 403
+        assert drain_controller.accepting
+
+    def test_loopback_allowed_without_token(self, restore_serving):
+        """Test that the preStop hook (127.0.0.1) can drain when ADMIN_TOKEN is unset"""
+        with patch("app.main.settings.ADMIN_TOKEN", None):
+            status = asyncio.run(asgi_request(app, "POST", "/admin/drain", "propagation_delay=0&timeout=1"))
+        assert status == 200
+        assert not drain_controller.accepting
+
+    def test_in_flight_chaos_delay_completes(self, restore_serving):
+        """Test a chaos-delayed request in flight finishes before the drain ends"""
+        chaos_state["slow_responses_active"] = True
+
+        async def scenario():
+            with patch("app.main.random.uniform", return_value=0.3):
+                slow = asyncio.ensure_future(asgi_request(app, "GET", "/api/v1/hello"))
+                await asyncio.sleep(0.05)
+                result = await drain_controller.drain(0.05, 5.0)
+                new_status = await asgi_request(app, "GET", "/api/v1/hello")
+                return result, await slow, new_status
+
+        result, slow_status, new_status = asyncio.run(scenario())
+        assert slow_status == 200
+        assert result["abandoned"] == 0
+        assert result["duration"] >= 0.25
+        assert new_status == 503
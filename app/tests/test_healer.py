@@ -0,0 +1,277 @@
+"""
+Tests for the in-process healer
+"""
+import asyncio
+import time
+
+import pytest
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram
+from unittest.mock import patch
+
+from app.main import app, chaos_state, healer, healing_reports_storage, request_window
+from app.healer import Healer, RequestWindow
+from app.warmup import asgi_request
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def metrics():
+    """Healer metrics in a private registry"""
+    registry = CollectorRegistry()
+    return registry, {
+        "recover_histogram": Histogram("ttr", "", ["chaos_type"], registry=registry),
+        "breach_counter": Counter("breaches", "", ["signal"], registry=registry),
+    }
+
+
+def make_healer(clock, metrics=None, active=("error_injection",), rss=None, **kwargs):
+    """Healer with recording callbacks"""
+    calls = {"heal": 0, "reports": []}
+    active = list(active)
+
+    def heal():
+        calls["heal"] += 1
+        stopped = [f"{t}_stopped" for t in active]
+        active.clear()
+        return stopped
+
+    window = RequestWindow(seconds=10, clock=clock)
+    options = dict(min_requests=10, cooldown=5.0, max_rss=100.0)
+    options.update(kwargs)
+    h = Healer(
+        window, heal=heal, active_chaos=lambda: list(active),
+        report=lambda chaos_type, actions, breaches: calls["reports"].append((chaos_type, actions, breaches)),
+        rss_reader=(lambda: rss[0]) if rss else None, clock=clock,
+        **options, **(metrics[1] if metrics else {})
+    )
+    return h, window, calls, active
+
+
+@pytest.fixture
+def app_healer():
+    """Reset the application's healer and chaos state around a test"""
+    saved_state = dict(chaos_state)
+    saved_reports = list(healing_reports_storage)
+    healer.reset()
+    request_window.clear()
+    yield healer
+    healer.reset()
+    request_window.clear()
+    chaos_state.update(saved_state)
+    healing_reports_storage[:] = saved_reports
+
+
+class TestRequestWindow:
+    """Test the sliding window"""
+
+    def test_totals(self, clock):
+        """Test request, error and latency bucket counts"""
+        window = RequestWindow(seconds=10, bounds=(0.1, 1.0, float("inf")), clock=clock)
+        window.record(0.05, False)
+        window.record(0.5, True)
+        window.record(5.0, True)
+        assert window.totals() == (3, 2, [1, 1, 1])
+
+    def test_slides(self, clock):
+        """Test that seconds older than the window are ignored and reused"""
+        window = RequestWindow(seconds=3, clock=clock)
+        window.record(0.01, True)
+        clock.now += 1
+        window.record(0.01, False)
+        clock.now += 2
+        assert window.totals()[:2] == (1, 0)
+        window.record(0.01, False)
+        assert window.totals()[:2] == (2, 0)
+        clock.now += 10
+        assert window.totals()[:2] == (0, 0)
+
+    def test_quantile(self, clock):
+        """Test the quantile as the upper bound of its bucket"""
+        window = RequestWindow(seconds=10, bounds=(0.1, 1.0, 2.5, float("inf")), clock=clock)
+        assert window.quantile(0.95) is None
+        for _ in range(94):
+            window.record(0.05, False)
+        for _ in range(6):
+            window.record(2.0, False)
+        assert window.quantile(0.5) == 0.1
+        assert window.quantile(0.95) == 2.5
+        window.clear()
+        assert window.totals()[0] == 0
+
+
+class TestHealer:
+    """Test policy evaluation and the healing episode"""
+
+    def test_heals_sustained_error_rate(self, clock, metrics):
+        """Test that a breach over breach_checks checks heals and reports once"""
+        registry, _ = metrics
+        h, window, calls, _ = make_healer(clock, metrics)
+        for i in range(20):
+            window.record(0.01, i % 2 == 0)
+        assert h.check() == {"error_rate": 0.5}
+        assert calls["heal"] == 0
+        clock.now += 0.25
+        h.check()
+        assert calls["heal"] == 1
+        assert calls["reports"] == [("error_injection", ["error_injection_stopped"], {"error_rate": 0.5})]
+        assert window.totals()[0] == 0
+        assert registry.get_sample_value("breaches_total", {"signal": "error_rate"}) == 1
+
+        # Healthy checks after healing end the episode
+        for _ in range(20):
+            window.record(0.01, False)
+        clock.now += 0.25
+        h.check()
+        assert registry.get_sample_value("ttr_count", {"chaos_type": "error_injection"}) is None
+        clock.now += 0.25
+        h.check()
+        assert registry.get_sample_value("ttr_count", {"chaos_type": "error_injection"}) == 1
+        assert registry.get_sample_value("ttr_sum", {"chaos_type": "error_injection"}) == pytest.approx(0.75)
+        assert h.onset is None
+
+    def test_transient_breach_ignored(self, clock):
+        """Test that a single breaching check does not heal"""
+        h, _, calls, _ = make_healer(clock, max_loop_lag=0.1)
+        h.check(loop_lag=0.5)
+        h.check(loop_lag=0.0)
+        h.check(loop_lag=0.5)
+        assert calls["heal"] == 0
+
+    def test_latency_and_min_requests(self, clock):
+        """Test the p95 policy and that sparse traffic is not judged"""
+        h, window, _, _ = make_healer(clock, max_p95=1.0)
+        for _ in range(5):
+            window.record(3.0, False)
+        assert h.evaluate() == {}
+        for _ in range(5):
+            window.record(3.0, False)
+        assert h.evaluate() == {"latency_p95": 5.0}
+
+    def test_loop_lag_and_rss(self, clock):
+        """Test the loop lag and RSS policies"""
+        rss = [50]
+        h, _, _, _ = make_healer(clock, rss=rss, max_loop_lag=0.25)
+        assert h.evaluate(loop_lag=0.1) == {}
+        rss[0] = 200
+        assert h.evaluate(loop_lag=0.3) == {"loop_lag": 0.3, "rss": 200.0}
+
+    def test_cooldown(self, clock):
+        """Test that healing is not repeated within the cooldown"""
+        h, _, calls, active = make_healer(clock, max_loop_lag=0.1, cooldown=5.0)
+        for _ in range(3):
+            h.check(loop_lag=1.0)
+            clock.now += 0.25
+        assert calls["heal"] == 1
+        active.append("cpu_spike")
+        h.check(loop_lag=1.0)
+        assert calls["heal"] == 1
+        clock.now += 5.0
+        h.check(loop_lag=1.0)
+        assert calls["heal"] == 2
+        assert [r[0] for r in calls["reports"]] == ["error_injection", "cpu_spike"]
+
+    def test_no_active_chaos(self, clock, metrics):
+        """Test that a breach without active chaos is counted but not acted on"""
+        registry, _ = metrics
+        h, _, calls, _ = make_healer(clock, metrics, active=(), max_loop_lag=0.1)
+        h.check(loop_lag=1.0)
+        h.check(loop_lag=1.0)
+        assert calls["heal"] == 0
+        assert registry.get_sample_value("breaches_total", {"signal": "loop_lag"}) == 1
+        h.check()
+        h.check()
+        # Nothing was healed, so no recovery time is observed
+        assert registry.get_sample_value("ttr_count", {"chaos_type": "error_injection"}) is None
+
+
+class TestApplicationHealer:
+    """Test the healer wired into the application"""
+
+    def test_heals_error_injection_within_a_second(self, app_healer):
+        """Test that injected errors are healed within a second and reported as self"""
+        before = REGISTRY.get_sample_value("chaos_healing_total",
+                                           {"chaos_type": "error_injection", "source": "self"}) or 0.0
+
+        async def scenario():
+            chaos_state["error_injection_active"] = True
+            app_healer.start()
+            try:
+                start = time.perf_counter()
+                with patch("app.main.random.random", return_value=0.0):
+                    while chaos_state["error_injection_active"] and time.perf_counter() - start < 5.0:
+                        # Injected errors propagate out of the ASGI app after the 500 is sent
+                        await asyncio.gather(*(asgi_request(app, "GET", "/api/v1/hello") for _ in range(5)),
+                                             return_exceptions=True)
+                        await asyncio.sleep(0.01)
+                return time.perf_counter() - start
+            finally:
+                await app_healer.stop()
+
+        with patch("app.main.settings.HEALER_ENABLED", True), \
+                patch("app.main.settings.WEBHOOK_URLS", []):
+            elapsed = asyncio.run(scenario())
+
+        assert not chaos_state["error_injection_active"]
+        assert elapsed < 1.0
+        report = healing_reports_storage[-1]
+        assert report["source"] == "self"
+        assert report["original_alert"]["chaos_type"] == "error_injection"
+        assert report["healing_performed"]["actions_taken"] == ["error_injection_stopped"]
+        assert "error_rate" in report["original_alert"]["summary"]
+        assert REGISTRY.get_sample_value("chaos_healing_total",
+                                         {"chaos_type": "error_injection", "source": "self"}) == before + 1
+
+    def test_heals_loop_block_on_loop_lag(self, app_healer):
+        """Test that loop_block chaos is healed through the loop lag policy"""
+        async def scenario():
+            app_healer.start()
+            try:
+                await asgi_request(app, "POST", "/admin/chaos/inject",
+                                   "chaos_type=loop_block&block_ms=400&interval_ms=100")
+                start = time.perf_counter()
+                while chaos_state["loop_block_active"] and time.perf_counter() - start < 5.0:
+                    await asyncio.sleep(0.01)
+                return time.perf_counter() - start
+            finally:
+                await app_healer.stop()
+
+        with patch("app.main.settings.HEALER_ENABLED", True), \
+                patch("app.main.settings.WEBHOOK_URLS", []):
+            elapsed = asyncio.run(scenario())
+
+        assert not chaos_state["loop_block_active"]
+        assert elapsed < 3.0
+        report = healing_reports_storage[-1]
+        assert report["original_alert"]["chaos_type"] == "loop_block"
+        assert report["healing_performed"]["actions_taken"] == ["loop_block_stopped"]
+        assert "loop_lag" in report["original_alert"]["summary"]
+
+    def test_window_only_when_enabled(self, app_healer):
+        """Test that requests are not recorded while the healer is disabled"""
+        asyncio.run(asgi_request(app, "GET", "/api/v1/hello"))
+        assert request_window.totals()[0] == 0
+        with patch("app.main.settings.HEALER_ENABLED", True):
+            asyncio.run(asgi_request(app, "GET", "/api/v1/hello"))
+            asyncio.run(asgi_request(app, "GET", "/healthz"))
+        assert request_window.totals()[0] == 1
+
+    def test_status_shows_healer(self, app_healer):
+        """Test the healer section of the chaos status"""
+        from fastapi.testclient import TestClient
+        data = TestClient(app).get("/admin/chaos/status").json()
+        assert data["healer"]["enabled"] is False
+        assert data["healer"]["heals"] == 0
@@ -0,0 +1,153 @@
+"""
+Tests for background health checks
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from unittest.mock import patch
+
+from app.main import app, app_state, drain_controller, health_checker
+from app.health_checks import FAILING, PASSING, PENDING, HealthCheck, HealthChecker
+
+
+class Flaky:
+    """A probe whose outcomes are scripted"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+
+    async def __call__(self):
+        outcome = self.outcomes.pop(0) if self.outcomes else True
+        if outcome == "hang":
+            await asyncio.sleep(10)
+        if not outcome:
+            raise ConnectionError("unreachable")
+        return {"ok": True}
+
+
+def run(checker, check, times):
+    async def scenario():
+        return [await checker.run_check(check) for _ in range(times)]
+    return asyncio.run(scenario())
+
+
+class TestHealthChecker:
+    """Test hysteresis, timeouts and the composite verdict"""
+
+    def test_hysteresis(self):
+        """Test that a check fails after `fall` failures and recovers after `rise` successes"""
+        check = HealthCheck("db", Flaky(True, False, False, True, False, False, False, True, True), fall=3, rise=2)
+        checker = HealthChecker([check])
+        assert checker.healthy and check.status == PENDING
+        statuses = []
+        for _ in range(9):
+            run(checker, check, 1)
+            statuses.append(check.status)
+        assert statuses == [PASSING, PASSING, PASSING, PASSING, PASSING, PASSING, FAILING, FAILING, PASSING]
+        assert checker.healthy
+        assert check.runs == 9 and check.consecutive_successes == 2
+
+    def test_first_result_taken_as_is(self):
+        """Test that a dependency down at startup fails the composite at once"""
+        check = HealthCheck("db", Flaky(False), fall=3)
+        checker = HealthChecker([check])
+        assert run(checker, check, 1) == [False]
+        assert check.status == FAILING
+        assert not checker.healthy
+        assert checker.failing == ["db"]
+        assert check.snapshot()["error"] == "ConnectionError: unreachable"
+
+    def test_timeout_and_latency(self):
+        """Test that a hanging probe fails at its timeout and latency is recorded"""
+        check = HealthCheck("slow", Flaky("hang"), timeout=0.05)
+        checker = HealthChecker([check])
+        start = time.perf_counter()
+        run(checker, check, 1)
+        assert time.perf_counter() - start < 1.0
+        snapshot = check.snapshot()
+        assert snapshot["error"] == "timed out after 0.05s"
+        assert 40 <= snapshot["latency_ms"] < 1000
+
+    def test_non_critical_checks(self):
+        """Test that a failing non-critical check is reported but does not fail the composite"""
+        check = HealthCheck("cache", Flaky(False), critical=False)
+        checker = HealthChecker([check])
+        run(checker, check, 1)
+        assert check.status == FAILING
+        assert checker.healthy
+
+    def test_background_schedule(self):
+        """Test that each check runs on its own interval"""
+        fast, slow = HealthCheck("fast", Flaky(), interval=0.02), HealthCheck("slow", Flaky(), interval=0.5)
+        checker = HealthChecker([fast, slow])
+
+        async def scenario():
+            checker.start()
+            assert checker.running
+            await asyncio.sleep(0.25)
+            await checker.stop()
+
+        asyncio.run(scenario())
+        assert not checker.running
+        assert fast.runs >= 5
+        assert slow.runs == 0
+
+    def test_invalid_checks(self):
+        """Test that bad limits and duplicate names are rejected"""
+        with pytest.raises(ValueError):
+            HealthCheck("x", Flaky(), interval=0)
+        with pytest.raises(ValueError):
+            HealthCheck("x", Flaky(), fall=0)
+        with pytest.raises(ValueError):
+            HealthChecker([HealthCheck("x", Flaky()), HealthCheck("x", Flaky())])
+
+
+@pytest.fixture
+def checked_client():
+    """Client whose lifespan ran the application's checks once"""
+    app_state["ready"] = True
+    with TestClient(app) as client:
+        yield client
+    # Leaving the client ran the shutdown drain
+    drain_controller.reset()
+    health_checker.reset()
+    app_state["ready"] = True
+
+
+class TestReadinessEndpoint:
+    """Test /ready against the cached verdict"""
+
+    def test_verbose(self, checked_client):
+        """Test per-check state and latency in the verbose view"""
+        response = checked_client.get("/ready?verbose=1")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert data["failing"] == []
+        assert set(data["checks"]) == {"event_loop", "disk"}
+        assert data["checks"]["disk"]["status"] == PASSING
+        assert data["checks"]["disk"]["latency_ms"] > 0
+        assert data["checks"]["event_loop"]["detail"]["lag_ms"] >= 0
+        # The plain probe stays small
+        assert set(checked_client.get("/ready").json()) == {"status", "timestamp", "version", "uptime"}
+        assert REGISTRY.get_sample_value("health_check_passing", {"check": "disk"}) == 1
+
+    def test_failing_check(self, checked_client, tmp_path):
+        """Test that an unwritable disk takes the pod out of rotation after `fall` failures"""
+        disk = health_checker.checks["disk"]
+        with patch("app.main.settings.HEALTH_CHECK_DISK_DIR", str(tmp_path / "missing")):
+            for _ in range(disk.fall):
+                assert checked_client.get("/ready").status_code == 200
+                asyncio.run(health_checker.run_check(disk))
+            response = checked_client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["detail"] == "Health checks failing: disk"
+            verbose = checked_client.get("/ready?verbose=1")
+            assert verbose.status_code == 503
+            assert verbose.json()["status"] == "not_ready"
+            assert verbose.json()["failing"] == ["disk"]
+            assert "FileNotFoundError" in verbose.json()["checks"]["disk"]["error"]
+        assert REGISTRY.get_sample_value("health_check_passing", {"check": "disk"}) == 0
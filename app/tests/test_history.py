@@ -0,0 +1,172 @@
+"""
+Tests for the per-second metrics history
+"""
+import asyncio
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, metrics_history
+from app.history import MetricsHistory
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def history():
+    """Start the application's history empty"""
+    metrics_history.reset()
+    yield metrics_history
+    metrics_history.reset()
+
+
+class TestMetricsHistory:
+    """Test the ring buffer"""
+
+    def test_aggregates(self):
+        """Test rates, error ratio, latency and in-flight over a window"""
+        clock = FakeClock()
+        h = MetricsHistory(seconds=60, bounds=(0.01, 0.1, float("inf")), clock=clock)
+        for _ in range(4):
+            h.begin()
+        for status, latency in ((200, 0.005), (200, 0.005), (500, 0.05), (503, 0.5)):
+            h.end(latency, status)
+        h.sample(rss=1024)
+        clock.now += 1
+        h.begin()
+        h.end(0.005, 200)
+        clock.now += 1
+        result = h.query(window=10, step=5)
+        summary = result["summary"]
+        assert summary["requests"] == 5
+        assert summary["request_rate"] == 0.5
+        assert summary["errors"] == 2
+        assert summary["error_ratio"] == 0.4
+        assert summary["latency_max_ms"] == 500.0
+        assert summary["latency_avg_ms"] == pytest.approx(113.0)
+        assert summary["latency_p50_ms"] == 10.0
+        # Bucket upper bounds, capped at the largest latency
+        assert summary["latency_p99_ms"] == 500.0
+        assert summary["inflight_max"] == 4
+        assert summary["rss_bytes"] == 1024
+        assert [point["requests"] for point in result["series"]] == [0, 5]
+        assert result["end"] == 1002
+        assert h.inflight == 0
+
+    def test_current_second_excluded(self):
+        """Test that only complete seconds are reported"""
+        clock = FakeClock()
+        h = MetricsHistory(seconds=60, clock=clock)
+        h.begin()
+        h.end(0.001, 200)
+        assert h.query(window=5)["summary"]["requests"] == 0
+        clock.now += 1
+        assert h.query(window=5)["summary"]["requests"] == 1
+
+    def test_rows_reused(self):
+        """Test that a row is cleared when its second comes round again"""
+        clock = FakeClock()
+        h = MetricsHistory(seconds=10, clock=clock)
+        h.begin()
+        h.end(0.001, 500)
+        clock.now += 10
+        h.sample()
+        clock.now += 1
+        summary = h.query(window=9)["summary"]
+        assert summary["requests"] == 0
+        assert summary["errors"] == 0
+
+    def test_window_clamped(self):
+        """Test that the window never exceeds the ring"""
+        h = MetricsHistory(seconds=10, clock=FakeClock())
+        result = h.query(window=1000, step=0)
+        assert result["window_seconds"] == 9
+        assert result["step_seconds"] == 1
+        assert len(result["series"]) == 9
+
+    def test_record_allocates_nothing(self):
+        """Test that recording keeps no per-request objects"""
+        h = MetricsHistory(seconds=60, clock=FakeClock())
+        for _ in range(100):
+            h.begin()
+            h.end(0.002, 200)
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for _ in range(10000):
+                h.begin()
+                h.end(0.002, 200)
+            grown = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        assert grown < 1024
+
+    def test_sampler(self):
+        """Test that the background task fills idle seconds with RSS"""
+        clock = FakeClock()
+        h = MetricsHistory(seconds=60, clock=clock)
+
+        async def scenario():
+            h.start(lambda: 4096, interval=0.01)
+            await asyncio.sleep(0.05)
+            await h.stop()
+
+        asyncio.run(scenario())
+        clock.now += 1
+        assert h.query(window=1)["summary"]["rss_bytes"] == 4096
+
+
+class TestHistoryEndpoint:
+    """Test the history on real routes"""
+
+    def test_endpoint(self, client, history):
+        """Test the response shape"""
+        client.get("/api/v1/hello")
+        data = client.get("/admin/metrics/history", params={"window": 5, "step": 5}).json()
+        assert data["window_seconds"] == 5
+        assert len(data["series"]) == 1
+        assert set(data["summary"]) >= {"request_rate", "error_ratio", "latency_p95_ms", "inflight_max", "rss_bytes"}
+        assert history.inflight == 0
+
+    def test_counts_requests(self, client, history):
+        """Test that the middleware records each finished request"""
+        clock = FakeClock(2000.0)
+        with patch.object(history, "clock", clock):
+            for _ in range(3):
+                client.get("/api/v1/hello")
+            client.get("/does-not-exist")
+            clock.now += 1
+            summary = client.get("/admin/metrics/history", params={"window": 5}).json()["summary"]
+        assert summary["requests"] == 4
+        assert summary["errors"] == 0
+        assert summary["inflight_max"] >= 1
+
+    def test_bad_parameters(self, client, history):
+        """Test parameter validation"""
+        assert client.get("/admin/metrics/history", params={"window": 0}).status_code == 422
+
+    def test_disabled(self, client, history):
+        """Test METRICS_HISTORY_ENABLED=false"""
+        clock = FakeClock(3000.0)
+        with patch("app.main.settings.METRICS_HISTORY_ENABLED", False), patch.object(history, "clock", clock):
+            client.get("/api/v1/hello")
+            assert client.get("/admin/metrics/history").status_code == 404
+        clock.now += 1
+        with patch.object(history, "clock", clock):
+            assert history.query(window=5)["summary"]["requests"] == 0
@@ -0,0 +1,157 @@
+"""
+Tests for io_pressure chaos
+"""
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from unittest.mock import patch
+
+from app.main import app, chaos_state, io_pressure
+from app.io_pressure import IOPressure
+
+
+def run_for(pressure, seconds, **kwargs):
+    pressure.start(**kwargs)
+    time.sleep(seconds)
+    return pressure.stop()
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestIOPressure:
+    """Test the worker pool"""
+
+    def test_iops_limit(self, tmp_path):
+        """Test that operations are paced to the IOPS target across workers"""
+        pressure = IOPressure(directory=str(tmp_path), workers=4, block_size=4096)
+        status = run_for(pressure, 0.5, mb_per_second=1000.0, iops=100.0, fsync_every=0)
+        ops = status["totals"]["write"] + status["totals"]["read"]
+        assert 25 <= ops <= 100 * status["elapsed_seconds"] + 4
+        assert status["totals"]["fsync"] == 0
+        assert status["achieved"]["iops"] <= 110
+
+    def test_throughput_limit(self, tmp_path):
+        """Test that bytes are paced to the MB/s target"""
+        pressure = IOPressure(directory=str(tmp_path), workers=2, block_size=64 * 1024)
+        status = run_for(pressure, 0.5, mb_per_second=1.0, iops=10000.0, fsync_every=0)
+        moved = status["totals"]["write_bytes"] + status["totals"]["read_bytes"]
+        assert 0 < moved <= 1024 * 1024 * status["elapsed_seconds"] + 2 * 64 * 1024
+        assert status["achieved"]["write_mb_per_second"] + status["achieved"]["read_mb_per_second"] <= 1.3
+
+    def test_fsync_every(self, tmp_path):
+        """Test that fsync follows every n-th write and reads read back data"""
+        pressure = IOPressure(directory=str(tmp_path), workers=1, block_size=4096)
+        status = run_for(pressure, 0.3, mb_per_second=1000.0, iops=200.0, fsync_every=2)
+        totals = status["totals"]
+        assert totals["write"] >= 4
+        assert totals["fsync"] == totals["write"] // 2
+        assert totals["read_bytes"] == totals["read"] * 4096
+        assert totals["errors"] == 0
+
+    def test_scratch_bounded_and_removed(self, tmp_path):
+        """Test that files wrap at max_bytes and stop removes the directory"""
+        pressure = IOPressure(directory=str(tmp_path), max_bytes=4 * 4096, workers=2, block_size=4096)
+        pressure.start(mb_per_second=1000.0, iops=2000.0, fsync_every=0)
+        scratch = pressure.status()["directory"]
+        assert os.path.dirname(scratch) == str(tmp_path)
+        assert wait_for(lambda: pressure.status()["totals"]["write"] >= 20)
+        sizes = [os.path.getsize(os.path.join(scratch, name)) for name in os.listdir(scratch)]
+        assert len(sizes) == 2 and max(sizes) <= 2 * 4096
+        status = pressure.stop()
+        assert status["running"] is False
+        assert os.listdir(tmp_path) == []
+        assert pressure.stop()["running"] is False
+
+    def test_stop_without_waiting(self, tmp_path):
+        """Test that stop(wait=False) returns at once and a new session can start meanwhile"""
+        pressure = IOPressure(directory=str(tmp_path), workers=2, block_size=4096)
+        pressure.start(mb_per_second=1000.0, iops=200.0, fsync_every=1)
+        first = pressure.status()["directory"]
+        release = threading.Event()
+        remove = shutil.rmtree
+
+        def slow_rmtree(path, **kwargs):
+            # Stands in for workers stuck in fsync and a large scratch directory
+            release.wait(5)
+            remove(path, **kwargs)
+
+        with patch("app.io_pressure.shutil.rmtree", side_effect=slow_rmtree):
+            start = time.perf_counter()
+            status = pressure.stop(wait=False)
+            assert time.perf_counter() - start < 0.1
+            assert status["running"] is False
+            pressure.start(mb_per_second=1000.0, iops=200.0, fsync_every=0)
+            assert pressure.running and os.path.isdir(first)
+            release.set()
+            assert wait_for(lambda: not os.path.exists(first))
+        pressure.stop()
+        assert os.listdir(tmp_path) == []
+
+    def test_invalid_parameters(self, tmp_path):
+        """Test that rates must be positive and fsync_every not negative"""
+        pressure = IOPressure(directory=str(tmp_path))
+        with pytest.raises(ValueError):
+            pressure.start(mb_per_second=0.0, iops=10.0)
+        with pytest.raises(ValueError):
+            pressure.start(mb_per_second=1.0, iops=10.0, fsync_every=-1)
+        assert not pressure.running
+        assert os.listdir(tmp_path) == []
+
+
+class TestIOPressureChaos:
+    """Test io_pressure through the chaos endpoints"""
+
+    def test_inject_and_heal(self, tmp_path):
+        """Test injection, achieved throughput in status and metrics, and cleanup on heal"""
+        client = TestClient(app)
+        before = REGISTRY.get_sample_value("chaos_io_bytes_total", {"op": "write"}) or 0.0
+        saved = dict(chaos_state)
+        try:
+            with patch.object(io_pressure, "directory", str(tmp_path)):
+                response = client.post("/admin/chaos/inject?chaos_type=io_pressure"
+                                       "&mb_per_second=5&iops=100&fsync_every=4")
+                assert response.status_code == 200
+                assert response.json()["details"] == \
+                    "I/O pressure started - up to 5MB/s and 100 IOPS, fsync every 4 writes"
+                assert wait_for(lambda: io_pressure.status()["totals"]["fsync"] >= 1)
+                assert client.post("/admin/chaos/inject?chaos_type=io_pressure").json()["status"] == \
+                    "already_active"
+                status = client.get("/admin/chaos/status").json()
+                healed = client.post("/admin/chaos/heal").json()
+        finally:
+            io_pressure.stop()
+            chaos_state.update(saved)
+        assert "io_pressure" in status["active_chaos"]
+        assert status["system_impact"]["performance_degraded"] is True
+        assert status["io_pressure"]["target"] == {"mb_per_second": 5.0, "iops": 100.0, "fsync_every": 4}
+        assert status["io_pressure"]["achieved"]["write_mb_per_second"] > 0
+        assert "io_pressure_stopped" in healed["actions_taken"]
+        assert wait_for(lambda: os.listdir(tmp_path) == [])
+        assert REGISTRY.get_sample_value("chaos_io_bytes_total", {"op": "write"}) > before
+        assert REGISTRY.get_sample_value("chaos_io_fsync_seconds_count") >= 1
+
+    def test_missing_directory(self, tmp_path):
+        """Test that an unusable CHAOS_IO_DIR is a client error, not a 500"""
+        with patch.object(io_pressure, "directory", str(tmp_path / "missing")):
+            response = TestClient(app).post("/admin/chaos/inject?chaos_type=io_pressure")
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Cannot create I/O scratch directory")
+        assert chaos_state["io_pressure_active"] is False
+        assert not io_pressure.running
+
+    def test_invalid_parameters(self):
+        """Test that bad rates are rejected without starting workers"""
+        response = TestClient(app).post("/admin/chaos/inject?chaos_type=io_pressure&iops=0")
+        assert response.status_code == 400
+        assert chaos_state["io_pressure_active"] is False
+        assert not io_pressure.running
@@ -0,0 +1,96 @@
+"""
+Tests for the event loop health monitor
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+from app.main import app
+from app.loop_monitor import LoopMonitor
+
+
+def blocking_callback(duration):
+    """Block the event loop like a sync call inside an async handler"""
+    time.sleep(duration)
+
+
+async def run_with_block(monitor, block_for):
+    """Run the monitor, block the loop once, then stop the monitor"""
+    monitor.start()
+    await asyncio.sleep(0.05)
+    blocking_callback(block_for)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+
+class TestLoopMonitor:
+    """Test LoopMonitor"""
+
+    def test_record_counts_slow_callbacks(self):
+        """Test lag bookkeeping"""
+        monitor = LoopMonitor(threshold=0.1)
+        monitor.record(0.01)
+        monitor.record(0.25)
+        monitor.record(-0.001)
+
+        assert monitor.samples == 3
+        assert monitor.slow_callbacks == 1
+        assert monitor.max_lag == pytest.approx(0.25)
+        assert monitor.last_lag == 0.0
+
+    def test_detects_blocked_loop(self):
+        """Test that blocking the loop is measured as lag"""
+        registry = CollectorRegistry()
+        histogram = Histogram("test_loop_lag_seconds", "lag", registry=registry)
+        counter = Counter("test_loop_slow_callbacks", "slow", registry=registry)
+        monitor = LoopMonitor(interval=0.01, threshold=0.05,
+                              lag_histogram=histogram, slow_callback_counter=counter)
+
+        asyncio.run(run_with_block(monitor, 0.15))
+
+        assert monitor.max_lag >= 0.1
+        assert monitor.slow_callbacks >= 1
+        assert registry.get_sample_value("test_loop_slow_callbacks_total") >= 1
+        assert registry.get_sample_value("test_loop_lag_seconds_count") == monitor.samples
+        assert not monitor.running
+
+    def test_debug_mode_captures_blocking_stack(self):
+        """Test that the watchdog captures the stack of the blocking callback"""
+        monitor = LoopMonitor(interval=0.01, threshold=0.05, debug=True)
+
+        asyncio.run(run_with_block(monitor, 0.3))
+
+        assert monitor.slow_callback_stacks
+        assert "blocking_callback" in monitor.slow_callback_stacks[0]["stack"]
+        assert "slow_callback_stacks" in monitor.snapshot()
+
+    def test_snapshot_without_debug(self):
+        """Test snapshot fields"""
+        monitor = LoopMonitor(threshold=0.1)
+        monitor.record(0.002)
+        snapshot = monitor.snapshot()
+
+        assert snapshot["monitoring"] is False
+        assert snapshot["lag_last_ms"] == pytest.approx(2.0)
+        assert snapshot["threshold_ms"] == pytest.approx(100.0)
+        assert "slow_callback_stacks" not in snapshot
+
+
+class TestLoopMonitorEndpoints:
+    """Test loop health exposure"""
+
+    def test_status_includes_event_loop(self):
+        """Test /api/v1/status reports loop health"""
+        response = TestClient(app).get("/api/v1/status")
+        data = response.json()["event_loop"]
+        assert "lag_last_ms" in data
+        assert "slow_callbacks" in data
+
+    def test_metrics_include_event_loop(self):
+        """Test /metrics exposes loop lag metrics"""
+        content = TestClient(app).get("/metrics").text
+        assert "event_loop_lag_seconds_bucket" in content
+        assert "event_loop_slow_callbacks_total" in content
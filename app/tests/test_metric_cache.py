@@ -0,0 +1,98 @@
+"""
+Tests for the metric child cache
+"""
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, generate_latest
+
+from app.main import app, REQUEST_COUNT_CHILDREN
+from app.metric_cache import LabelCache
+from app.benchmarks import metrics as metric_benchmark
+
+
+@pytest.fixture
+def counter():
+    return Counter("requests", "", ["method", "endpoint", "status"], registry=CollectorRegistry())
+
+
+class TestLabelCache:
+    """Test the cache itself"""
+
+    def test_same_child_as_labels(self, counter):
+        """Test that cached children are the ones labels() returns"""
+        cache = LabelCache(counter)
+        child = cache.get("GET", "/a", 200)
+        assert child is counter.labels(method="GET", endpoint="/a", status="200")
+        assert cache.get("GET", "/a", 200) is child
+        assert cache.get("GET", "/a", "200") is child
+        assert len(cache) == 2
+
+    def test_max_size(self, counter):
+        """Test that lookups beyond max_size still work but are not cached"""
+        cache = LabelCache(counter, max_size=2)
+        for i in range(5):
+            cache.get("GET", f"/{i}", 404).inc()
+        assert len(cache) == 2
+        assert cache.get("GET", "/4", 404) is counter.labels("GET", "/4", "404")
+        assert counter.labels("GET", "/4", "404")._value.get() == 1
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_concurrent_misses(self, counter):
+        """Test that threads missing at the same time share one child"""
+        cache = LabelCache(counter)
+        barrier = threading.Barrier(8)
+
+        def work():
+            barrier.wait()
+            for _ in range(1000):
+                cache.get("GET", "/a", 200).inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.labels("GET", "/a", "200")._value.get() == 8000
+
+    def test_exposition_identical(self, counter):
+        """Test that the cache does not change the exposition"""
+        plain = Counter("requests", "", ["method", "endpoint", "status"], registry=CollectorRegistry())
+        cache = LabelCache(counter)
+        for method, path, status in metric_benchmark.sample_requests(50):
+            plain.labels(method=method, endpoint=path, status=status).inc()
+            cache.get(method, path, status).inc()
+        registry_a, registry_b = CollectorRegistry(), CollectorRegistry()
+        registry_a.register(plain)
+        registry_b.register(counter)
+        assert metric_benchmark.exposition(registry_a) == metric_benchmark.exposition(registry_b)
+
+
+class TestRequestCount:
+    """Test http_requests_total through the application"""
+
+    def test_counts(self):
+        """Test that requests are counted per method, path and status"""
+        labels = {"method": "GET", "endpoint": "/api/v1/hello", "status": "200"}
+        before = REGISTRY.get_sample_value("http_requests_total", labels) or 0.0
+        client = TestClient(app)
+        for _ in range(3):
+            client.get("/api/v1/hello")
+        assert REGISTRY.get_sample_value("http_requests_total", labels) == before + 3
+        assert ("GET", "/api/v1/hello", 200) in REQUEST_COUNT_CHILDREN._children
+        assert b'http_requests_total{endpoint="/api/v1/hello",method="GET",status="200"}' \
+            in generate_latest(REGISTRY)
+
+
+class TestMetricBenchmark:
+    """Test the label benchmark"""
+
+    def test_run(self):
+        """Test that every variant is measured and exposition matches"""
+        results = metric_benchmark.run(requests=2000)
+        assert set(results["ns_per_request"]) == {"labels(...).inc", "LabelCache.get(...).inc",
+                                                  "Counter.inc (no labels)"}
+        assert all(ns > 0 for ns in results["ns_per_request"].values())
+        assert results["exposition_identical"] is True
@@ -1,10 +1,17 @@
 """
 Unit tests for Pydantic models
 """
+import json
+
 import pytest
 from pydantic import ValidationError
 
-from app.models import HelloResponse, HealthResponse
+from app.models import (
+    HelloResponse, HealthResponse, HealingReport, HealingReportBatch,
+    ChaosEvent, StoredHealingReport, iso_timestamp
+)
+from app.benchmarks import records as record_benchmark
+from app.benchmarks.content import sample_report
 
 
 class TestHelloResponse:
@@ -137,4 +144,92 @@ class TestHealthResponse:
         assert "status" in example
         assert "timestamp" in example
         assert "version" in example
-        assert "uptime" in example 
\ No newline at end of file
+        assert "uptime" in example
+
+
+class TestHealingReport:
+    """Test HealingReport model"""
+    
+    def test_defaults(self):
+        """Test that an empty report gets the unknown chaos type and status"""
+        report = HealingReport()
+        assert report.original_alert.chaos_type == "unknown"
+        assert report.overall_status == "unknown"
+    
+    def test_unknown_fields_dropped(self):
+        """Test that fields outside the schema are not kept"""
+        report = HealingReport(
+            workflow_id="wf-1",
+            original_alert={"chaos_type": "memory_leak", "raw": "x" * 10000},
+            validation_results={"detailed_results": [{"endpoint": "/healthz", "status": "passed", "response": {}}]},
+            debug={"anything": True}
+        )
+        dumped = report.model_dump(exclude_none=True)
+        assert "debug" not in dumped
+        assert "raw" not in dumped["original_alert"]
+        assert dumped["validation_results"]["detailed_results"] == [{"endpoint": "/healthz", "status": "passed"}]
+    
+    @pytest.mark.parametrize("report", [
+        {"workflow_id": "x" * 129},
+        {"original_alert": {"chaos_type": "x" * 65}},
+        {"recommendations": "x" * 2049},
+        {"healing_performed": {"actions_taken": ["a"] * 51}},
+        {"validation_results": {"tests_failed": -1}},
+    ])
+    def test_bounds(self, report):
+        """Test that oversized strings and lists are rejected"""
+        with pytest.raises(ValidationError):
+            HealingReport(**report)
+    
+    def test_batch_bounds(self):
+        """Test that a batch holds between 1 and 500 reports"""
+        assert len(HealingReportBatch(reports=[{}] * 500).reports) == 500
+        with pytest.raises(ValidationError):
+            HealingReportBatch(reports=[])
+        with pytest.raises(ValidationError):
+            HealingReportBatch(reports=[{}] * 501)
+
+
+class TestStoredRecords:
+    """Test the compact chaos event and healing report records"""
+    
+    @pytest.mark.parametrize("body", [
+        sample_report(7),
+        {"workflow_id": "wf-1", "cursor_analysis": {}, "validation_results": {}},
+        {},
+    ])
+    def test_report_renders_like_model_dump(self, body):
+        """Test that a stored report reads exactly like the dict it replaces"""
+        report = HealingReport.model_validate(body)
+        stored = StoredHealingReport(report, 1700000000.5, "self")
+        expected = report.model_dump(exclude_none=True)
+        expected["stored_at"] = iso_timestamp(1700000000.5)
+        expected["source"] = "self"
+        assert list(dict(stored).items()) == list(expected.items())
+        assert json.loads(json.dumps(dict(stored))) == expected
+        assert stored.get("recommendations") is None
+    
+    def test_codes_interned(self):
+        """Test that repeated short strings share one object"""
+        first, second = (
+            StoredHealingReport(HealingReport.model_validate_json(json.dumps(sample_report(i))), 0.0, "n8n_workflow")
+            for i in (1, 2)
+        )
+        assert first.original_alert[0] is second.original_alert[0]
+        assert first.overall_status is second.overall_status
+        assert first.original_alert[2] is not second.original_alert[2]
+    
+    def test_chaos_event(self):
+        """Test that a chaos event renders its timestamp on read"""
+        event = ChaosEvent("memory_leak", "started", 1700000000.25)
+        assert dict(event) == {"timestamp": iso_timestamp(1700000000.25), "event_type": "memory_leak",
+                               "details": "started"}
+        assert "timestamp" in event
+        assert not hasattr(event, "__dict__")
+    
+    def test_memory_per_record(self):
+        """Test bytes per record at 100k events (and 5k parsed reports) against dicts"""
+        results = record_benchmark.run(count=100000, reports=5000)
+        events, reports = results["bytes_per_event"], results["bytes_per_report"]
+        assert events["ChaosEvent"] < events["dict"] * 0.6
+        assert reports["StoredHealingReport"] < reports["dict"] * 0.5
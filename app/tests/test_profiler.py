@@ -0,0 +1,157 @@
+"""
+Tests for the statistical stack sampler and the profiling endpoint
+"""
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app
+from app.profiler import StackSampler
+
+
+ADMIN_HEADERS = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_client():
+    """Test client that sends a configured admin token"""
+    with patch("app.main.settings.ADMIN_TOKEN", "secret"):
+        yield TestClient(app, headers=ADMIN_HEADERS)
+
+
+def busy_worker(stop_event):
+    """Spin until told to stop so the sampler has something to see"""
+    while not stop_event.is_set():
+        sum(i * i for i in range(1000))
+
+
+class TestStackSampler:
+    """Test StackSampler"""
+
+    def test_samples_other_threads(self):
+        """Test that samples include a named worker thread"""
+        stop_event = threading.Event()
+        worker = threading.Thread(target=busy_worker, args=(stop_event,), name="busy-worker")
+        worker.start()
+        try:
+            sampler = StackSampler(interval=0.005)
+            sampler.start()
+            time.sleep(0.2)
+            sampler.stop()
+        finally:
+            stop_event.set()
+            worker.join()
+
+        assert sampler.sample_count > 0
+        assert sampler.duration > 0
+        thread_names = {thread_name for thread_name, _ in sampler.samples}
+        assert "busy-worker" in thread_names
+        assert "stack-sampler" not in thread_names
+
+    def test_collapsed_format(self):
+        """Test collapsed stack output"""
+        stop_event = threading.Event()
+        worker = threading.Thread(target=busy_worker, args=(stop_event,), name="busy-worker")
+        worker.start()
+        try:
+            sampler = StackSampler()
+            sampler.sample_once()
+        finally:
+            stop_event.set()
+            worker.join()
+        output = sampler.collapsed()
+        line = output.splitlines()[0]
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) >= 1
+        assert "busy-worker;" in output
+        assert "busy_worker (" in output
+        assert ";" in stack
+
+    def test_speedscope_format(self):
+        """Test speedscope document structure"""
+        stop_event = threading.Event()
+        worker = threading.Thread(target=busy_worker, args=(stop_event,), name="busy-worker")
+        worker.start()
+        try:
+            sampler = StackSampler(interval=0.01)
+            sampler.sample_once()
+        finally:
+            stop_event.set()
+            worker.join()
+        sampler.duration = 0.01
+        document = sampler.speedscope()
+        assert document["$schema"].startswith("https://www.speedscope.app")
+        assert document["shared"]["frames"]
+        profile = document["profiles"][0]
+        assert profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"])
+        for sample in profile["samples"]:
+            assert all(index < len(document["shared"]["frames"]) for index in sample)
+
+
+class TestProfileEndpoint:
+    """Test /admin/profile"""
+
+    def test_profile_collapsed(self, admin_client):
+        """Test a short collapsed profile"""
+        response = admin_client.get("/admin/profile?seconds=0.1&interval_ms=5")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.text.strip()
+
+    def test_profile_speedscope(self, admin_client):
+        """Test a short speedscope profile"""
+        response = admin_client.get("/admin/profile?seconds=0.1&format=speedscope")
+        assert response.status_code == 200
+        assert "profiles" in response.json()
+
+    def test_profile_invalid_parameters(self, admin_client):
+        """Test parameter validation"""
+        assert admin_client.get("/admin/profile?seconds=0").status_code == 400
+        assert admin_client.get("/admin/profile?seconds=100000").status_code == 400
+        assert admin_client.get("/admin/profile?seconds=1&format=pprof").status_code == 400
+        assert admin_client.get("/admin/profile?seconds=1&interval_ms=0.01").status_code == 400
+
+    def test_profile_already_running(self, admin_client):
+        """Test that concurrent profiles are rejected"""
+        from app.main import profile_lock
+        profile_lock.acquire()
+        try:
+            response = admin_client.get("/admin/profile?seconds=0.1")
+            assert response.status_code == 409
+        finally:
+            profile_lock.release()
+
+    def test_profile_disabled(self, admin_client):
+        """Test that profiling can be switched off"""
+        with patch("app.main.settings.PROFILING_ENABLED", False):
+            response = admin_client.get("/admin/profile?seconds=0.1")
+            assert response.status_code == 404
+
+    def test_profile_requires_admin_token(self, client):
+        """Test the admin token guard"""
+        with patch("app.main.settings.ADMIN_TOKEN", "secret"):
+            response = client.get("/admin/profile?seconds=0.1")
+            assert response.status_code == 403
+
+            response = client.get("/admin/profile?seconds=0.1", headers={"X-Admin-Token": "wrong"})
+            assert response.status_code == 403
+
+            response = client.get("/admin/profile?seconds=0.1", headers=ADMIN_HEADERS)
+            assert response.status_code == 200
+
+    def test_profile_refused_without_configured_token(self, client):
+        """Test that profiling is unavailable when ADMIN_TOKEN is unset"""
+        with patch("app.main.settings.ADMIN_TOKEN", None):
+            response = client.get("/admin/profile?seconds=0.1", headers=ADMIN_HEADERS)
+        assert response.status_code == 403
+        assert "ADMIN_TOKEN" in response.json()["detail"]
@@ -0,0 +1,182 @@
+"""
+Tests for per-client token-bucket rate limiting
+"""
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, rate_limiter, settings
+from app.rate_limit import BucketTable, RateLimiter, parse_rate
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def tight_limits():
+    """Enable rate limiting with a small per-client limit on hello"""
+    rate_limiter.configure({"/api/v1/hello": "2/minute"})
+    try:
+        with patch("app.main.settings.RATE_LIMIT_ENABLED", True):
+            yield rate_limiter
+    finally:
+        rate_limiter.configure(settings.RATE_LIMIT_RULES, settings.RATE_LIMIT_MAX_CLIENTS)
+
+
+class TestParseRate:
+    """Test rate specifications"""
+
+    @pytest.mark.parametrize("spec,expected", [
+        ("100/minute", (100.0, 100 / 60.0)),
+        ("10/second", (10.0, 10.0)),
+        ("10/5s", (10.0, 2.0)),
+        ("3600/hour", (3600.0, 1.0)),
+    ])
+    def test_valid(self, spec, expected):
+        """Test supported formats"""
+        limit, rate = parse_rate(spec)
+        assert limit == expected[0]
+        assert rate == pytest.approx(expected[1])
+
+    @pytest.mark.parametrize("spec", ["100", "x/minute", "10/fortnight", "0/second", "10/0s"])
+    def test_invalid(self, spec):
+        """Test malformed rates are rejected"""
+        with pytest.raises(ValueError):
+            parse_rate(spec)
+
+
+class TestBucketTable:
+    """Test BucketTable"""
+
+    def test_burst_then_refill(self):
+        """Test that a full bucket allows a burst and refills over time"""
+        table = BucketTable(limit=3, rate=1.0, max_clients=10)
+        assert [table.take("a", 0.0)[0] for _ in range(4)] == [True, True, True, False]
+        allowed, _, wait = table.take("a", 0.5)
+        assert not allowed
+        assert wait == pytest.approx(0.5)
+        assert table.take("a", 1.0)[0]
+
+    def test_clients_are_independent(self):
+        """Test per-client buckets"""
+        table = BucketTable(limit=1, rate=1.0, max_clients=10)
+        assert table.take("a", 0.0)[0]
+        assert not table.take("a", 0.0)[0]
+        assert table.take("b", 0.0)[0]
+
+    def test_memory_bounded_with_lru_eviction(self):
+        """Test that the table never grows past max_clients"""
+        table = BucketTable(limit=1, rate=1.0, max_clients=100)
+        for i in range(10000):
+            table.take(f"client-{i}", 0.0)
+        assert len(table) == 100
+        assert table.evictions == 9900
+        assert len(table.tokens) == 100
+
+    def test_recently_used_client_kept(self):
+        """Test that eviction drops the least recently used client"""
+        table = BucketTable(limit=1, rate=0.001, max_clients=2)
+        table.take("a", 0.0)
+        table.take("b", 0.0)
+        table.take("a", 0.0)
+        table.take("c", 0.0)
+        assert "a" in table.slots
+        assert "b" not in table.slots
+
+
+class TestRateLimiter:
+    """Test route template matching"""
+
+    def test_match(self):
+        """Test static and parameterised templates"""
+        limiter = RateLimiter({"/api/v1/hello": "1/second", "/api/v1/items/{item_id}": "1/second"})
+        assert limiter.match("/api/v1/hello").template == "/api/v1/hello"
+        assert limiter.match("/api/v1/items/42").template == "/api/v1/items/{item_id}"
+        assert limiter.match("/api/v1/status") is None
+
+
+class TestRateLimitMiddleware:
+    """Test rate limiting on the request path"""
+
+    def test_headers_and_429(self, client, tight_limits):
+        """Test rate-limit headers, then 429 with Retry-After"""
+        first = client.get("/api/v1/hello")
+        assert first.status_code == 200
+        assert first.headers["ratelimit-limit"] == "2"
+        assert first.headers["ratelimit-remaining"] == "1"
+        assert client.get("/api/v1/hello").status_code == 200
+
+        limited = client.get("/api/v1/hello")
+        assert limited.status_code == 429
+        assert limited.headers["ratelimit-remaining"] == "0"
+        assert int(limited.headers["retry-after"]) >= 1
+        assert "Rate limit" in limited.json()["detail"]
+
+    def test_unmatched_routes_not_limited(self, client, tight_limits):
+        """Test that routes without a rule are untouched"""
+        for _ in range(5):
+            response = client.get("/api/v1/status")
+            assert response.status_code == 200
+            assert "ratelimit-limit" not in response.headers
+
+    def test_key_header(self, client, tight_limits):
+        """Test that clients behind one address are told apart by header"""
+        with patch("app.main.settings.RATE_LIMIT_KEY_HEADER", "X-Forwarded-For"):
+            for _ in range(2):
+                client.get("/api/v1/hello", headers={"X-Forwarded-For": "10.0.0.1"})
+            assert client.get("/api/v1/hello", headers={"X-Forwarded-For": "10.0.0.1"}).status_code == 429
+            assert client.get("/api/v1/hello", headers={"X-Forwarded-For": "10.0.0.2"}).status_code == 200
+
+    def test_spoofed_forwarded_for(self, client, tight_limits):
+        """Test that a client cannot escape its bucket by prepending fake hops"""
+        with patch("app.main.settings.RATE_LIMIT_KEY_HEADER", "X-Forwarded-For"):
+            # The router appends the real client address (203.0.113.7)
+            statuses = [
+                client.get("/api/v1/hello",
+                           headers={"X-Forwarded-For": f"198.51.100.{i}, 203.0.113.7"}).status_code
+                for i in range(5)
+            ]
+        assert statuses == [200, 200, 429, 429, 429]
+
+    def test_trusted_proxy_count(self, client, tight_limits):
+        """Test that the client is taken from behind the configured number of proxies"""
+        with patch("app.main.settings.RATE_LIMIT_KEY_HEADER", "X-Forwarded-For"), \
+                patch("app.main.settings.RATE_LIMIT_TRUSTED_PROXIES", 2):
+            for i in range(2):
+                client.get("/api/v1/hello", headers={"X-Forwarded-For": f"1.1.1.{i}, 10.0.0.1, 172.16.0.1"})
+            spoofed = client.get("/api/v1/hello", headers={"X-Forwarded-For": "9.9.9.9, 10.0.0.1, 172.16.0.1"})
+            other = client.get("/api/v1/hello", headers={"X-Forwarded-For": "10.0.0.2, 172.16.0.1"})
+        assert spoofed.status_code == 429
+        assert other.status_code == 200
+
+    def test_repeated_key_headers_combined(self, client, tight_limits):
+        """Test that a proxy adding its own header line is honoured"""
+        with patch("app.main.settings.RATE_LIMIT_KEY_HEADER", "X-Forwarded-For"):
+            for i in range(3):
+                response = client.get("/api/v1/hello", headers=[
+                    ("X-Forwarded-For", f"198.51.100.{i}"), ("X-Forwarded-For", "203.0.113.9")
+                ])
+        assert response.status_code == 429
+
+    def test_limited_metric(self, client, tight_limits):
+        """Test the limited counter is exported per route template"""
+        for _ in range(3):
+            client.get("/api/v1/hello")
+        content = client.get("/metrics").text
+        assert 'http_requests_rate_limited_total{route="/api/v1/hello"}' in content
+
+    def test_status_reports_tables(self, client, tight_limits):
+        """Test table occupancy in the status endpoint"""
+        client.get("/api/v1/hello")
+        limits = client.get("/api/v1/status").json()["rate_limits"]
+        assert limits["/api/v1/hello"]["clients"] == 1
+        assert limits["/api/v1/hello"]["rate"] == "2/minute"
+
+    def test_disabled_by_default(self, client):
+        """Test that no limit is applied unless enabled"""
+        response = client.get("/api/v1/hello")
+        assert response.status_code == 200
+        assert "ratelimit-limit" not in response.headers
@@ -0,0 +1,173 @@
+"""
+Tests for response stream chaos
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.main import app, chaos_state, response_chaos
+from app.response_chaos import ResponseAborted, ResponseChaos, ResponseChaosMiddleware
+from app.warmup import asgi_response
+
+BODY = bytes(range(256)) * 40  # 10240 bytes
+
+
+def chunked_app(chunk):
+    """An app sending BODY with a Content-Length in `chunk` byte messages"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/octet-stream"),
+                                (b"content-length", str(len(BODY)).encode())]})
+        for offset in range(0, len(BODY), chunk):
+            await send({"type": "http.response.body", "body": BODY[offset:offset + chunk],
+                        "more_body": offset + chunk < len(BODY)})
+
+    return app
+
+
+def call(chaos, path="/data", chunk=1024):
+    """Run one request; returns the response start, body messages and the error raised"""
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def scenario():
+        middleware = ResponseChaosMiddleware(chunked_app(chunk), chaos, exempt_prefixes=("/admin",))
+        scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+        try:
+            await middleware(scope, None, send)
+        except ResponseAborted as e:
+            return e
+
+    error = asyncio.run(scenario())
+    return messages[0], messages[1:], error
+
+
+def rule(mode, **kwargs):
+    chaos = ResponseChaos()
+    chaos.configure(mode, **kwargs)
+    return chaos
+
+
+class TestResponseChaosMiddleware:
+    """Test the send wrappers"""
+
+    def test_throttle(self):
+        """Test that the body arrives whole, in slices, at the configured rate"""
+        start = time.perf_counter()
+        first, bodies, error = call(rule("throttle", bytes_per_second=40960), chunk=len(BODY))
+        elapsed = time.perf_counter() - start
+        assert error is None
+        assert b"".join(m["body"] for m in bodies) == BODY
+        assert [len(m["body"]) for m in bodies] == [4096, 4096, 2048]
+        assert all(m["more_body"] for m in bodies[:-1]) and not bodies[-1]["more_body"]
+        # 10240 bytes at 40960 bytes/s
+        assert 0.2 <= elapsed < 1.0
+
+    def test_truncate(self):
+        """Test a clean short response without Content-Length"""
+        first, bodies, error = call(rule("truncate", after_bytes=2500))
+        assert error is None
+        assert b"content-length" not in dict(first["headers"])
+        assert b"".join(m["body"] for m in bodies) == BODY[:2500]
+        assert bodies[-1]["more_body"] is False
+        # Messages after the cut are dropped
+        assert len(bodies) == 3
+
+    def test_reset(self):
+        """Test that the response is aborted after the configured bytes"""
+        first, bodies, error = call(rule("reset", after_bytes=2500))
+        assert isinstance(error, ResponseAborted)
+        assert dict(first["headers"])[b"content-length"] == b"10240"
+        assert b"".join(m["body"] for m in bodies) == BODY[:2500]
+        assert all(m["more_body"] for m in bodies)
+
+    def test_short_responses_complete(self):
+        """Test that bodies shorter than after_bytes are not cut"""
+        _, bodies, error = call(rule("reset", after_bytes=len(BODY)))
+        assert error is None
+        assert b"".join(m["body"] for m in bodies) == BODY
+
+    def test_targeting(self):
+        """Test route prefixes, exempt paths, percentages and clearing"""
+        chaos = rule("truncate", after_bytes=10, route="/api/", percent=25.0)
+        assert not chaos.applies("/other")
+        hits = sum(chaos.applies("/api/v1/hello") for _ in range(4000))
+        assert 800 <= hits <= 1200
+        chaos.configure("truncate", after_bytes=10, route="/admin")
+        _, bodies, _ = call(chaos, path="/admin/x")
+        assert b"".join(m["body"] for m in bodies) == BODY
+        chaos.clear()
+        assert not chaos.applies("/api/v1/hello")
+        assert chaos.snapshot() == {"mode": None}
+
+    def test_invalid_rules(self):
+        """Test that bad rules are rejected"""
+        for kwargs in ({"mode": "drop"}, {"mode": "throttle", "bytes_per_second": 0},
+                       {"mode": "reset", "after_bytes": -1}, {"mode": "truncate", "percent": 0},
+                       {"mode": "truncate", "route": "api"}):
+            with pytest.raises(ValueError):
+                ResponseChaos().configure(**kwargs)
+
+
+@pytest.fixture
+def reset_chaos_state():
+    saved = dict(chaos_state)
+    yield
+    response_chaos.clear()
+    chaos_state.update(saved)
+
+
+class TestResponseStreamChaos:
+    """Test response_stream through the chaos endpoints"""
+
+    def test_inject_and_heal(self, reset_chaos_state):
+        """Test truncation of a matching route, status, metrics and healing"""
+        before = REGISTRY.get_sample_value("chaos_response_stream_total", {"mode": "truncate"}) or 0.0
+
+        async def scenario():
+            _, _, injected = await asgi_response(
+                app, "POST", "/admin/chaos/inject",
+                "chaos_type=response_stream&mode=truncate&after_bytes=5&route=/api/v1/hello")
+            cut = await asgi_response(app, "GET", "/api/v1/hello")
+            other = await asgi_response(app, "GET", "/api/v1/status")
+            _, _, status = await asgi_response(app, "GET", "/admin/chaos/status")
+            _, _, healed = await asgi_response(app, "POST", "/admin/chaos/heal")
+            whole = await asgi_response(app, "GET", "/api/v1/hello")
+            return json.loads(injected), cut, other, json.loads(status), json.loads(healed), whole
+
+        injected, cut, other, status, healed, whole = asyncio.run(scenario())
+        assert injected["details"] == ("Response stream chaos activated - bodies truncated after 5 bytes "
+                                       "for 100% of /api/v1/hello responses")
+        assert cut[0] == 200 and len(cut[2]) == 5 and "content-length" not in cut[1]
+        assert json.loads(other[2])
+        assert "response_stream" in status["active_chaos"]
+        assert status["response_stream"] == {"mode": "truncate", "bytes_per_second": 16384, "after_bytes": 5,
+                                             "route": "/api/v1/hello", "percent": 100.0}
+        assert "response_stream_stopped" in healed["actions_taken"]
+        assert json.loads(whole[2])["message"]
+        assert REGISTRY.get_sample_value("chaos_response_stream_total", {"mode": "truncate"}) == before + 1
+
+    def test_reset_propagates(self, reset_chaos_state):
+        """Test that reset aborts the response through the whole middleware stack"""
+        async def scenario():
+            await asgi_response(app, "POST", "/admin/chaos/inject",
+                                "chaos_type=response_stream&mode=reset&after_bytes=5")
+            await asgi_response(app, "GET", "/api/v1/hello")
+
+        # main imports the module as response_chaos, not app.response_chaos
+        with pytest.raises(Exception) as error:
+            asyncio.run(scenario())
+        assert type(error.value).__name__ == "ResponseAborted"
+
+    def test_invalid_parameters(self, reset_chaos_state):
+        """Test that a bad rule is rejected and nothing is activated"""
+        status, _, _ = asyncio.run(asgi_response(app, "POST", "/admin/chaos/inject",
+                                                 "chaos_type=response_stream&mode=drop"))
+        assert status == 400
+        assert chaos_state["response_stream_active"] is False
+        assert response_chaos.snapshot() == {"mode": None}
@@ -0,0 +1,136 @@
+"""
+Tests for the process runtime metrics collector
+"""
+import asyncio
+import gc
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry
+from unittest.mock import patch
+
+from app.main import app
+from app.runtime_metrics import RuntimeCollector, count_open_fds, read_proc_memory, read_rss
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="requires /proc")
+
+
+@pytest.fixture
+def collector():
+    """Collector registered with a private registry"""
+    collector = RuntimeCollector(cache_ttl=60)
+    registry = CollectorRegistry()
+    registry.register(collector)
+    collector.install()
+    yield collector, registry
+    collector.uninstall()
+
+
+class TestProcReaders:
+    """Test /proc readers"""
+
+    @linux_only
+    def test_read_proc_memory(self):
+        """Test RSS and USS are read"""
+        memory = read_proc_memory()
+        assert memory["rss"] > 0
+        assert 0 < memory.get("uss", 1) <= memory["rss"]
+
+    @linux_only
+    def test_read_rss(self):
+        """Test the cheap RSS reader"""
+        assert read_rss() > 0
+
+    @linux_only
+    def test_count_open_fds(self):
+        """Test open FD counting"""
+        before = count_open_fds()
+        with open(__file__):
+            assert count_open_fds() == before + 1
+
+    def test_missing_proc(self, tmp_path):
+        """Test graceful handling without /proc"""
+        assert read_proc_memory(str(tmp_path)) == {}
+        assert count_open_fds(str(tmp_path)) is None
+        assert read_rss(str(tmp_path)) is None
+
+
+class TestRuntimeCollector:
+    """Test RuntimeCollector"""
+
+    def test_gc_callbacks_tracked(self, collector):
+        """Test per-generation collections and pause histogram"""
+        runtime, registry = collector
+        gc.collect(2)
+
+        assert registry.get_sample_value("runtime_gc_collections_total", {"generation": "2"}) >= 1
+        assert registry.get_sample_value("runtime_gc_pause_seconds_count", {"generation": "2"}) >= 1
+        assert registry.get_sample_value("runtime_gc_pause_seconds_sum", {"generation": "2"}) > 0
+        assert registry.get_sample_value(
+            "runtime_gc_pause_seconds_bucket", {"generation": "2", "le": "+Inf"}
+        ) == registry.get_sample_value("runtime_gc_pause_seconds_count", {"generation": "2"})
+
+    def test_uninstall_stops_tracking(self, collector):
+        """Test that uninstall removes the gc callback"""
+        runtime, registry = collector
+        runtime.uninstall()
+        before = registry.get_sample_value("runtime_gc_collections_total", {"generation": "2"})
+        gc.collect(2)
+        assert registry.get_sample_value("runtime_gc_collections_total", {"generation": "2"}) == before
+
+    @linux_only
+    def test_process_gauges(self, collector):
+        """Test memory, FD and thread gauges"""
+        runtime, registry = collector
+        assert registry.get_sample_value("runtime_memory_rss_bytes") > 0
+        assert registry.get_sample_value("runtime_open_fds") > 0
+        assert registry.get_sample_value("runtime_threads") >= 1
+
+    def test_snapshot_is_cached(self, collector):
+        """Test that /proc is not re-read within the cache TTL"""
+        runtime, registry = collector
+        first = runtime.snapshot()
+        with patch("app.runtime_metrics.read_proc_memory") as reader:
+            assert runtime.snapshot() is first
+            reader.assert_not_called()
+
+        runtime.cache_ttl = 0
+        with patch("app.runtime_metrics.read_proc_memory", return_value={"rss": 1}) as reader:
+            assert runtime.snapshot()["rss"] == 1
+            reader.assert_called_once()
+
+    def test_asyncio_task_count(self, collector):
+        """Test live task counting on an attached loop"""
+        runtime, _ = collector
+        runtime.cache_ttl = 0
+
+        async def scenario():
+            runtime.attach_loop(asyncio.get_running_loop())
+            tasks = [asyncio.create_task(asyncio.sleep(0.1)) for _ in range(3)]
+            count = runtime.snapshot()["asyncio_tasks"]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return count
+
+        assert asyncio.run(scenario()) >= 4
+        runtime.attach_loop(None)
+        assert runtime.snapshot()["asyncio_tasks"] is None
+
+    def test_describe_does_not_collect(self):
+        """Test that registering the collector does not read /proc"""
+        runtime = RuntimeCollector()
+        with patch("app.runtime_metrics.read_proc_memory") as reader:
+            CollectorRegistry().register(runtime)
+            reader.assert_not_called()
+
+
+class TestRuntimeMetricsEndpoint:
+    """Test runtime metrics on /metrics"""
+
+    def test_metrics_include_runtime(self):
+        """Test the collector is registered with the default registry"""
+        content = TestClient(app).get("/metrics").text
+        assert "runtime_gc_pause_seconds_bucket" in content
+        assert "runtime_threads" in content
@@ -0,0 +1,133 @@
+"""
+Tests for per-request Server-Timing instrumentation
+"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app
+from app.benchmarks import suite
+from app.server_timing import RequestTimings, _NULL_PHASE, _current, phase
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def header_allowed():
+    """Let clients opt in with X-Server-Timing"""
+    with patch("app.main.settings.SERVER_TIMING_ALLOW_HEADER", True):
+        yield
+
+
+def parse_server_timing(value):
+    """Parse a Server-Timing header into {name: milliseconds}"""
+    result = {}
+    for entry in value.split(","):
+        name, duration = entry.strip().split(";dur=")
+        result[name] = float(duration)
+    return result
+
+
+class TestRequestTimings:
+    """Test phase accounting"""
+
+    def test_phase_disabled_is_noop(self):
+        """Test that phase() returns the shared no-op when timing is off"""
+        assert phase("anything") is _NULL_PHASE
+        with phase("anything"):
+            pass
+
+    def test_nested_phases_are_exclusive(self):
+        """Test that child time is not counted in the parent phase"""
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            with phase("outer"):
+                time.sleep(0.01)
+                with phase("inner"):
+                    time.sleep(0.02)
+        finally:
+            _current.reset(token)
+
+        assert timings.phases["inner"] >= 0.02
+        assert 0.01 <= timings.phases["outer"] < 0.02
+
+    def test_repeated_phase_accumulates(self):
+        """Test that re-entering a phase adds to its total"""
+        timings = RequestTimings()
+        timings.add("log", 0.001)
+        timings.add("log", 0.002)
+        assert timings.phases["log"] == pytest.approx(0.003)
+
+    def test_header_value(self):
+        """Test Server-Timing header rendering in milliseconds"""
+        timings = RequestTimings()
+        timings.add("validate", 0.0015)
+        timings.add("total", 0.01)
+        assert timings.header_value() == "validate;dur=1.500, total;dur=10.000"
+
+
+class TestServerTimingMiddleware:
+    """Test Server-Timing on real requests"""
+
+    def test_no_header_by_default(self, client):
+        """Test that timing is off unless requested"""
+        response = client.get("/api/v1/hello")
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    def test_header_ignored_by_default(self, client):
+        """Test that clients cannot opt in unless the header is allowed"""
+        response = client.get("/api/v1/hello", headers={"X-Server-Timing": "1"})
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    def test_header_opt_in(self, client, header_allowed):
+        """Test per-request opt-in via X-Server-Timing"""
+        response = client.get("/api/v1/hello?name=Timing", headers={"X-Server-Timing": "1"})
+        assert response.status_code == 200
+        assert response.json()["message"] == "Hello, Timing!"
+
+        phases = parse_server_timing(response.headers["server-timing"])
+        for name in ["trace", "log", "validate", "serialize", "framework", "middleware", "total"]:
+            assert name in phases
+            assert phases[name] >= 0
+        assert phases["total"] >= phases["middleware"]
+
+    def test_header_opt_out_value(self, client, header_allowed):
+        """Test that X-Server-Timing: 0 does not enable timing"""
+        response = client.get("/api/v1/hello", headers={"X-Server-Timing": "0"})
+        assert "server-timing" not in response.headers
+
+    def test_enabled_via_settings(self, client):
+        """Test that SERVER_TIMING_ENABLED times every request"""
+        with patch("app.main.settings.SERVER_TIMING_ENABLED", True):
+            response = client.get("/healthz")
+        phases = parse_server_timing(response.headers["server-timing"])
+        assert "total" in phases
+        assert "middleware" in phases
+
+    def test_phase_histogram_exported(self, client, header_allowed):
+        """Test that phase durations are aggregated in /metrics"""
+        client.get("/api/v1/hello", headers={"X-Server-Timing": "1"})
+        content = client.get("/metrics").text
+        assert 'http_request_phase_duration_seconds_count{phase="validate"}' in content
+        assert 'http_request_phase_duration_seconds_count{phase="total"}' in content
+
+
+class TestDisabledOverhead:
+    """Verify that disabled instrumentation stays negligible"""
+
+    def test_phase_disabled_benchmark(self):
+        """Test the per-phase cost of disabled timing from the benchmark suite"""
+        result = asyncio.run(suite.run_scenario("phase_disabled", runs=3, requests=200, warmup=10))
+        # Each operation runs 100 disabled phases
+        per_phase = min(run["mean"] for run in result["runs"]) / 100
+        assert per_phase < 5e-6
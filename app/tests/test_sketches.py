@@ -0,0 +1,208 @@
+"""
+Tests for latency quantile sketches
+"""
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, latency_sketches
+from app.sketches import LatencySketches, QuantileSketch, WindowedSketch, quantile_name
+from app.benchmarks import sketches as sketch_benchmark
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def client():
+    """Test client fixture"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def sketches():
+    """Start the application's sketches empty"""
+    latency_sketches.reset()
+    yield latency_sketches
+    latency_sketches.reset()
+
+
+class TestQuantileSketch:
+    """Test the sketch itself"""
+
+    @pytest.mark.parametrize("accuracy", [0.01, 0.02])
+    def test_relative_accuracy(self, accuracy):
+        """Test that every quantile is within the relative accuracy"""
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-6, 1.0) for _ in range(20000)]
+        sketch = QuantileSketch(accuracy)
+        for value in values:
+            sketch.add(value)
+        ordered = sorted(values)
+        qs = [0.0, 0.1, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0]
+        for q, estimate in zip(qs, sketch.quantiles(qs)):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert abs(estimate - exact) <= accuracy * exact * 1.0001
+
+    def test_bounded_buckets(self):
+        """Test that memory does not grow with the number or range of values"""
+        sketch = QuantileSketch(0.01)
+        for exponent in range(-12, 8):
+            for mantissa in range(1, 1000):
+                sketch.add(mantissa * 10.0 ** exponent)
+        assert len(sketch.counts) <= sketch.max_buckets < 1200
+        assert sketch.quantile(0.0) == pytest.approx(1e-6, rel=0.01)
+        assert sketch.quantile(1.0) == pytest.approx(3600.0, rel=0.01)
+
+    def test_merge(self):
+        """Test that merging equals adding everything to one sketch"""
+        rng = random.Random(1)
+        a, b, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for i in range(5000):
+            value = rng.expovariate(100.0)
+            (a if i % 3 else b).add(value)
+            both.add(value)
+        a.merge(b)
+        assert a.count == both.count
+        assert a.counts == both.counts
+
+    def test_empty(self):
+        """Test that an empty sketch has no quantiles"""
+        assert QuantileSketch().quantiles([0.5, 0.99]) == [None, None]
+
+    def test_quantile_order(self):
+        """Test that quantiles may be requested in any order"""
+        sketch = QuantileSketch()
+        for value in range(1, 101):
+            sketch.add(value / 1000)
+        p99, p50 = sketch.quantiles([0.99, 0.5])
+        assert p99 == pytest.approx(0.099, rel=0.01)
+        assert p50 == pytest.approx(0.050, rel=0.01)
+
+    def test_quantile_name(self):
+        """Test quantile labels"""
+        assert [quantile_name(q) for q in (0.5, 0.95, 0.99, 0.999)] == ["p50", "p95", "p99", "p99.9"]
+
+
+class TestWindowedSketch:
+    """Test the sliding window"""
+
+    def test_slides_by_slot(self):
+        """Test that values leave the window one slot at a time"""
+        clock = FakeClock(0.0)
+        sketch = WindowedSketch(window=60.0, slots=6, clock=clock)
+        sketch.add(0.001)
+        clock.now = 30.0
+        sketch.add(0.002)
+        assert sketch.merged().count == 2
+        clock.now = 60.0
+        assert sketch.merged().count == 1
+        clock.now = 95.0
+        assert sketch.merged().count == 0
+
+    def test_reuses_slots(self):
+        """Test that a slot is cleared when its time comes round again"""
+        clock = FakeClock(0.0)
+        sketch = WindowedSketch(window=6.0, slots=6, clock=clock)
+        sketch.add(0.5)
+        clock.now = 6.0
+        sketch.add(0.001)
+        merged = sketch.merged()
+        assert merged.count == 1
+        assert merged.quantile(0.5) == pytest.approx(0.001, rel=0.01)
+
+
+class TestLatencySketches:
+    """Test per-route sketches"""
+
+    def test_routes_and_overall(self):
+        """Test per-route and across-route quantiles in ms"""
+        sketches = LatencySketches(clock=FakeClock())
+        for _ in range(99):
+            sketches.record("/fast", 0.001)
+        sketches.record("/slow", 0.5)
+        snapshot = sketches.snapshot()
+        assert snapshot["routes"]["/fast"] == {"count": 99, "p50": pytest.approx(1.0, rel=0.01),
+                                               "p95": pytest.approx(1.0, rel=0.01),
+                                               "p99": pytest.approx(1.0, rel=0.01)}
+        assert snapshot["routes"]["/slow"]["p50"] == pytest.approx(500.0, rel=0.01)
+        assert snapshot["overall"]["count"] == 100
+        assert snapshot["overall"]["p99"] == pytest.approx(1.0, rel=0.01)
+        assert sketches.overall()["count"] == 100
+
+    def test_max_routes(self):
+        """Test that route cardinality is bounded"""
+        sketches = LatencySketches(max_routes=2, clock=FakeClock())
+        for i in range(5):
+            sketches.record(f"/r{i}", 0.001)
+        assert set(sketches.routes) == {"/r0", "/r1", "other"}
+        assert sketches.snapshot()["routes"]["other"]["count"] == 3
+
+    def test_overall_cached(self):
+        """Test that the status summary is recomputed at most once per cache_ttl"""
+        clock = FakeClock()
+        sketches = LatencySketches(cache_ttl=1.0, clock=clock)
+        sketches.record("/a", 0.001)
+        assert sketches.overall()["count"] == 1
+        sketches.record("/a", 0.001)
+        assert sketches.overall()["count"] == 1
+        clock.now += 1.0
+        assert sketches.overall()["count"] == 2
+
+
+class TestLatencyEndpoints:
+    """Test the sketches on real routes"""
+
+    def test_admin_latency(self, client, sketches):
+        """Test per-route quantiles grouped by route template"""
+        for name in ("a", "b", "c"):
+            client.get(f"/api/v1/hello?name={name}")
+        client.get("/does-not-exist")
+        data = client.get("/admin/latency").json()
+        assert data["window_seconds"] == 60.0
+        assert data["routes"]["/api/v1/hello"]["count"] == 3
+        assert data["routes"]["unmatched"]["count"] == 1
+        assert set(data["overall"]) == {"count", "p50", "p95", "p99"}
+
+    def test_custom_quantiles(self, client, sketches):
+        """Test the q parameter"""
+        client.get("/api/v1/hello")
+        data = client.get("/admin/latency", params=[("q", "0.999"), ("q", "0.5")]).json()
+        assert set(data["overall"]) == {"count", "p99.9", "p50"}
+        assert client.get("/admin/latency", params={"q": "2"}).status_code == 400
+
+    def test_status(self, client, sketches):
+        """Test the overall quantiles in /api/v1/status"""
+        client.get("/api/v1/hello")
+        latency = client.get("/api/v1/status").json()["latency_ms"]
+        assert latency["count"] >= 1
+        assert latency["p99"] > 0
+
+    def test_disabled(self, client, sketches):
+        """Test LATENCY_SKETCH_ENABLED=false"""
+        with patch("app.main.settings.LATENCY_SKETCH_ENABLED", False):
+            client.get("/api/v1/hello")
+            assert client.get("/api/v1/status").json()["latency_ms"] is None
+            assert client.get("/admin/latency").status_code == 404
+        assert latency_sketches.total.merged().count == 0
+
+
+class TestSketchBenchmark:
+    """Test the sketch benchmark"""
+
+    def test_run(self):
+        """Test that every measurement is reported"""
+        results = sketch_benchmark.run(observations=2000)
+        assert set(results["add_ns"]) == {"QuantileSketch.add", "WindowedSketch.add",
+                                          "LatencySketches.record", "Histogram.observe"}
+        assert all(ns > 0 for ns in results["add_ns"].values())
+        assert all(error <= 0.0101 for error in results["relative_error"].values())
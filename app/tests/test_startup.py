@@ -0,0 +1,125 @@
+"""
+Tests for cold start: lazy imports, warmup and readiness gating
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from app.main import app, app_state, drain_controller, WARMUP_ROUTES, warmup_models
+from app.warmup import warm_up
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fail if importing the application grows past this many seconds
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS", "4.0"))
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "modules": sorted(m for m in sys.modules if m.startswith("opentelemetry.")),
+}))
+"""
+
+
+def import_main(env_overrides):
+    """Import main in a fresh interpreter and report time and loaded modules"""
+    env = {**os.environ, **env_overrides}
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestLazyImports:
+    """Test that optional tracing modules are only loaded when configured"""
+
+    def test_tracing_disabled_skips_sdk(self):
+        """Test that the OTel SDK, exporter and instrumentor are not imported"""
+        probe = import_main({"TRACING_ENABLED": "false"})
+        for prefix in ("opentelemetry.sdk", "opentelemetry.exporter", "opentelemetry.instrumentation"):
+            assert not [m for m in probe["modules"] if m.startswith(prefix)], prefix
+
+    def test_tracing_enabled_loads_instrumentor(self):
+        """Test that tracing still instruments the app when enabled"""
+        probe = import_main({"TRACING_ENABLED": "true"})
+        assert "opentelemetry.instrumentation.fastapi" in probe["modules"]
+        assert "opentelemetry.exporter.jaeger.thrift" not in probe["modules"]
+
+    def test_import_time_budget(self):
+        """Test that cold import of the application stays within budget"""
+        probe = import_main({"TRACING_ENABLED": "false"})
+        assert probe["seconds"] < IMPORT_TIME_BUDGET, (
+            f"importing main took {probe['seconds']:.2f}s (budget {IMPORT_TIME_BUDGET}s)"
+        )
+
+
+class TestWarmup:
+    """Test warmup before readiness"""
+
+    def test_warm_up_exercises_routes(self):
+        """Test that warmup routes all succeed"""
+        result = asyncio.run(warm_up(app, WARMUP_ROUTES, warmup_models()))
+        assert result["duration"] > 0
+        assert [status for _, status in result["routes"]] == [200] * len(WARMUP_ROUTES)
+
+    def test_warm_up_bypasses_request_metrics(self):
+        """Test that warmup requests are not counted as traffic"""
+        from app.main import REQUEST_COUNT
+        child = REQUEST_COUNT.labels(method="GET", endpoint="/api/v1/status", status=200)
+        before = child._value.get()
+        asyncio.run(warm_up(app, [("GET", "/api/v1/status")]))
+        assert child._value.get() == before
+
+    def test_warm_up_builds_middleware_stack(self):
+        """Test that warmup goes through the middleware, compressed and in every negotiated format"""
+        from app.main import app as application
+        application.middleware_stack = None
+        result = asyncio.run(warm_up(application, WARMUP_ROUTES))
+        assert application.middleware_stack is not None
+        assert ("/openapi.json", 200) in result["routes"]
+        assert len(result["routes"]) == len(WARMUP_ROUTES)
+
+    def test_warm_up_skips_traffic_accounting(self):
+        """Test that rate limits, the healer window and chaos leave warmup requests alone"""
+        from app.main import chaos_state, rate_limiter, request_window
+        with patch("app.main.settings.RATE_LIMIT_ENABLED", True), \
+                patch("app.main.settings.HEALER_ENABLED", True), \
+                patch.dict(chaos_state, {"error_injection_active": True}), \
+                patch("app.main.random.random", return_value=0.0), \
+                patch.object(rate_limiter, "check") as check, \
+                patch.object(request_window, "record") as record:
+            result = asyncio.run(warm_up(app, WARMUP_ROUTES))
+        assert [status for _, status in result["routes"]] == [200] * len(WARMUP_ROUTES)
+        check.assert_not_called()
+        record.assert_not_called()
+
+    def test_lifespan_ready_after_warmup(self):
+        """Test that readiness flips only once warmup has run"""
+        app_state["ready"] = False
+        try:
+            with patch("app.main.settings.STARTUP_DELAY", 0):
+                with TestClient(app) as client:
+                    assert app_state["ready"] is True
+                    assert client.get("/ready").status_code == 200
+                    content = client.get("/metrics").text
+                    warmup_line = [
+                        line for line in content.splitlines()
+                        if line.startswith("application_warmup_seconds ")
+                    ][0]
+                    assert float(warmup_line.split()[1]) > 0
+        finally:
+            # Leaving the client ran the shutdown drain
+            drain_controller.reset()
+            app_state["ready"] = True
+            app_state["healthy"] = True
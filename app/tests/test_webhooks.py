@@ -0,0 +1,302 @@
+"""
+Tests for outbound webhook delivery
+"""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from unittest.mock import patch
+
+from app.main import app, chaos_state
+from app.webhooks import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, WebhookDispatcher
+
+
+class StubReceiver:
+    """Local HTTP receiver that records requests and answers scripted statuses"""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.requests.append({"peer": self.client_address, "body": json.loads(body)})
+                status = receiver.statuses.pop(0) if receiver.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/webhook/chaos-alert"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def events(self):
+        return [event for request in self.requests for event in request["body"]["events"]]
+
+
+@pytest.fixture
+def receiver():
+    """A running stub receiver"""
+    with StubReceiver() as stub:
+        yield stub
+
+
+@pytest.fixture
+def metrics():
+    """Webhook metrics in a private registry"""
+    registry = CollectorRegistry()
+    return registry, {
+        "latency_histogram": Histogram("latency", "", ["target"], registry=registry),
+        "requests_counter": Counter("requests", "", ["target", "result"], registry=registry),
+        "dropped_counter": Counter("dropped", "", ["reason"], registry=registry),
+        "queue_gauge": Gauge("queue", "", registry=registry),
+        "circuit_gauge": Gauge("circuit", "", ["target"], registry=registry),
+    }
+
+
+def dispatcher(urls, metrics=None, **kwargs):
+    """Dispatcher with fast timings for tests"""
+    options = dict(flush_interval=0.02, retry_base=0.01, retry_max=0.05, timeout=1.0)
+    options.update(kwargs)
+    return WebhookDispatcher(urls, **options, **(metrics[1] if metrics else {}))
+
+
+async def emit_and_stop(d, events, gap=0.0):
+    """Start a dispatcher, emit (kind, fields) events and stop it after delivery"""
+    d.start()
+    for kind, fields in events:
+        d.emit(kind, **fields)
+        if gap:
+            await asyncio.sleep(gap)
+    await d.flush()
+    await d.stop()
+
+
+class TestCircuitBreaker:
+    """Test the breaker state machine"""
+
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the breaker"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=lambda: now[0])
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.allow() and breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+    def test_half_open_trial(self):
+        """Test that one trial is allowed after the reset timeout"""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10.0
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN and breaker.opened_at == 10.0
+        now[0] = 20.0
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.failures == 0
+
+    def test_success_resets_count(self):
+        """Test that only consecutive failures count"""
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+
+class TestWebhookDispatcher:
+    """Test delivery against a local receiver"""
+
+    def test_batches_burst(self, receiver, metrics):
+        """Test that events emitted together share one request"""
+        registry, _ = metrics
+        d = dispatcher([receiver.url], metrics)
+        asyncio.run(emit_and_stop(d, [("chaos", {"event_type": "memory_leak", "n": i}) for i in range(5)]))
+        assert len(receiver.requests) == 1
+        body = receiver.requests[0]["body"]
+        assert body["source"] == "microservice-demo"
+        assert [e["n"] for e in body["events"]] == [0, 1, 2, 3, 4]
+        assert all(e["kind"] == "chaos" and "timestamp" in e for e in body["events"])
+        target = f"127.0.0.1:{receiver.server.server_port}"
+        assert registry.get_sample_value("requests_total", {"target": target, "result": "2xx"}) == 1
+        assert registry.get_sample_value("latency_count", {"target": target}) == 5
+        assert registry.get_sample_value("queue") == 0
+
+    def test_batch_size(self, receiver):
+        """Test that large bursts are split into batches"""
+        d = dispatcher([receiver.url], batch_size=4)
+        asyncio.run(emit_and_stop(d, [("chaos", {"n": i}) for i in range(10)]))
+        assert [len(r["body"]["events"]) for r in receiver.requests] == [4, 4, 2]
+        assert [e["n"] for e in receiver.events] == list(range(10))
+
+    def test_reuses_connections(self, receiver):
+        """Test that separate batches go over one pooled keep-alive connection"""
+        d = dispatcher([receiver.url])
+        asyncio.run(emit_and_stop(d, [("chaos", {"n": i}) for i in range(3)], gap=0.1))
+        assert len(receiver.requests) == 3
+        assert len({r["peer"] for r in receiver.requests}) == 1
+
+    def test_every_target(self, receiver):
+        """Test that each receiver gets every batch"""
+        with StubReceiver() as other:
+            d = dispatcher([receiver.url, other.url])
+            asyncio.run(emit_and_stop(d, [("health", {"healthy": False})]))
+            assert receiver.events == other.events
+            assert receiver.events[0]["healthy"] is False
+
+    def test_retries_server_errors(self, metrics):
+        """Test that 5xx and 429 are retried until delivered"""
+        registry, _ = metrics
+        with StubReceiver(statuses=[503, 429]) as stub:
+            d = dispatcher([stub.url], metrics)
+            asyncio.run(emit_and_stop(d, [("chaos", {"n": 1})]))
+            assert len(stub.requests) == 3
+            assert stub.requests[0]["body"] == stub.requests[2]["body"]
+            target = f"127.0.0.1:{stub.server.server_port}"
+            assert registry.get_sample_value("requests_total", {"target": target, "result": "5xx"}) == 1
+            assert registry.get_sample_value("requests_total", {"target": target, "result": "4xx"}) == 1
+            assert registry.get_sample_value("requests_total", {"target": target, "result": "2xx"}) == 1
+            assert registry.get_sample_value("dropped_total", {"reason": "failed"}) is None
+
+    def test_client_errors_not_retried(self, metrics):
+        """Test that a 4xx other than 429 drops the batch at once"""
+        registry, _ = metrics
+        with StubReceiver(statuses=[404]) as stub:
+            d = dispatcher([stub.url], metrics)
+            asyncio.run(emit_and_stop(d, [("chaos", {"n": i}) for i in range(3)]))
+            assert len(stub.requests) == 1
+        assert registry.get_sample_value("dropped_total", {"reason": "failed"}) == 3
+
+    def test_gives_up_after_retries(self, metrics):
+        """Test that a batch is dropped after max_retries"""
+        registry, _ = metrics
+        with StubReceiver(statuses=[500] * 10) as stub:
+            d = dispatcher([stub.url], metrics, max_retries=2)
+            asyncio.run(emit_and_stop(d, [("chaos", {"n": 1})]))
+            assert len(stub.requests) == 3
+        assert registry.get_sample_value("dropped_total", {"reason": "failed"}) == 1
+
+    def test_circuit_opens_for_dead_receiver(self, metrics):
+        """Test that an unreachable receiver is skipped once the breaker opens"""
+        registry, _ = metrics
+        with StubReceiver() as stub:
+            url = stub.url
+        # The stub is shut down: connections are refused
+        d = dispatcher([url], metrics, max_retries=1, breaker_failures=2, breaker_reset=60.0)
+
+        async def scenario():
+            d.start()
+            d.emit("chaos", n=1)
+            await d.flush()
+            d.emit("chaos", n=2)
+            await d.flush()
+            snapshot = d.snapshot()
+            await d.stop()
+            return snapshot
+
+        snapshot = asyncio.run(scenario())
+        target = url.split("/")[2]
+        assert snapshot["targets"][target] == OPEN
+        assert registry.get_sample_value("requests_total", {"target": target, "result": "error"}) == 2
+        assert registry.get_sample_value("requests_total", {"target": target, "result": "circuit_open"}) == 1
+        assert registry.get_sample_value("dropped_total", {"reason": "circuit_open"}) == 1
+        assert registry.get_sample_value("circuit", {"target": target}) == 1
+
+    def test_bounded_queue(self, receiver, metrics):
+        """Test that emit drops events instead of growing the queue"""
+        registry, _ = metrics
+        d = dispatcher([receiver.url], metrics, queue_size=3, flush_interval=0.05)
+
+        async def scenario():
+            d.start()
+            accepted = [d.emit("chaos", n=i) for i in range(5)]
+            await d.flush()
+            await d.stop()
+            return accepted
+
+        assert asyncio.run(scenario()) == [True, True, True, False, False]
+        assert [e["n"] for e in receiver.events] == [0, 1, 2]
+        assert registry.get_sample_value("dropped_total", {"reason": "queue_full"}) == 2
+
+    def test_emit_from_thread(self, receiver):
+        """Test that worker threads can emit"""
+        d = dispatcher([receiver.url])
+
+        async def scenario():
+            d.start()
+            thread = threading.Thread(target=d.emit, args=("chaos",), kwargs={"n": 1})
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0.1)
+            await d.flush()
+            await d.stop()
+
+        asyncio.run(scenario())
+        assert [e["n"] for e in receiver.events] == [1]
+
+    def test_not_running(self):
+        """Test that emit is a no-op without URLs or before start"""
+        assert not WebhookDispatcher([]).enabled
+        assert WebhookDispatcher(["http://127.0.0.1:1/"]).emit("chaos") is False
+
+    def test_backoff(self):
+        """Test jittered backoff bounds and Retry-After"""
+        d = dispatcher(["http://127.0.0.1:1/"], retry_base=0.1, retry_max=1.0)
+        assert all(0.0 <= d._backoff(0) <= 0.1 for _ in range(50))
+        assert all(0.0 <= d._backoff(10) <= 1.0 for _ in range(50))
+        assert d._backoff(0, "0.5") == 0.5
+        assert d._backoff(0, "120") == 1.0
+        assert 0.0 <= d._backoff(0, "Wed, 21 Oct 2015 07:28:00 GMT") <= 0.1
+
+
+class TestApplicationEvents:
+    """Test the events the application pushes"""
+
+    def test_chaos_and_health_events(self, receiver):
+        """Test that chaos activation, healing and health toggles reach the receiver"""
+        d = dispatcher([receiver.url])
+        saved = dict(chaos_state)
+        try:
+            with patch("app.main.webhook_dispatcher", d), TestClient(app, raise_server_exceptions=False) as client:
+                client.post("/admin/chaos/inject", params={"chaos_type": "error_injection"})
+                with patch("app.main.random.random", return_value=0.0):
+                    client.get("/api/v1/hello")
+                client.post("/admin/chaos/heal")
+                client.post("/admin/health/toggle")
+                client.post("/admin/health/toggle")
+        finally:
+            chaos_state.update(saved)
+        events = [(e["kind"], e.get("event_type", e.get("healthy"))) for e in receiver.events]
+        assert events == [
+            ("chaos", "error_injection"),
+            ("chaos", "healing"),
+            ("health", False),
+            ("health", True),
+        ]
@@ -0,0 +1,131 @@
+"""
+Application Warmup
+Exercise the request path once before the pod reports ready
+
+The first request through FastAPI pays for lazy work: building route
+dependants, compiling pydantic validators and serializers, generating the
+OpenAPI schema and the first Prometheus exposition. The middleware stack
+is lazy too: Starlette builds it on the first call, and compression,
+content negotiation and Server-Timing set up their codecs and caches on
+first use. Running that work during startup keeps it out of the first real
+request's latency.
+
+Warmup requests therefore go through the whole application. They carry
+`scope["warmup"] = True`, which clients cannot set (unlike a header), and
+middleware that counts or limits traffic (request metrics, rate and
+concurrency limits, the healer window, chaos) lets them pass untouched.
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from prometheus_client import generate_latest
+
+# Scope key marking warmup requests
+WARMUP_SCOPE_KEY = "warmup"
+
+
+def _scope(method: str, path: str, query: str, headers: Optional[Dict[str, str]], body: bytes,
+           warmup: bool = False):
+    raw_headers = [(b"host", b"localhost")]
+    for key, value in (headers or {}).items():
+        raw_headers.append((key.lower().encode("latin-1"), value.encode("latin-1")))
+    if body:
+        raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("latin-1"),
+        "query_string": query.encode("latin-1"),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    if warmup:
+        scope[WARMUP_SCOPE_KEY] = True
+    return scope
+
+
+def _receive(body: bytes):
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Block until cancelled, like a client that keeps the connection open
+        await asyncio.Event().wait()
+
+    return receive
+
+
+async def asgi_request(app, method: str, path: str, query: str = "",
+                       headers: Optional[Dict[str, str]] = None, body: bytes = b"", warmup: bool = False) -> int:
+    """Send a single request to an ASGI app and return the response status"""
+    status = 0
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(_scope(method, path, query, headers, body, warmup), _receive(body), send)
+    return status
+
+
+async def asgi_response(app, method: str, path: str, query: str = "",
+                        headers: Optional[Dict[str, str]] = None,
+                        body: bytes = b"") -> Tuple[int, Dict[str, str], bytes]:
+    """Send a single request and return status, headers and the raw (undecoded) body"""
+    start: Dict[str, object] = {}
+    chunks: List[bytes] = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(_scope(method, path, query, headers, body), _receive(body), send)
+    response_headers = {
+        key.decode("latin-1"): value.decode("latin-1") for key, value in start.get("headers", [])
+    }
+    return start.get("status", 0), response_headers, b"".join(chunks)
+
+
+async def warm_up(app, routes: Iterable[Sequence], models: Iterable = ()) -> Dict[str, object]:
+    """
+    Warm up an application and return what was exercised.
+
+    Routes are (method, target) or (method, target, headers). Every request
+    goes through the full middleware stack, marked as warmup, and asks for
+    gzip so that the compression path is exercised as well.
+    """
+    started = time.perf_counter()
+    statuses: List[Tuple[str, int]] = []
+
+    for method, target, *extra in routes:
+        path, _, query = target.partition("?")
+        headers = {"Accept-Encoding": "gzip", **(extra[0] if extra else {})}
+        statuses.append((target, await asgi_request(app, method, path, query, headers, warmup=True)))
+
+    # Prime pydantic serializers and the JSON encoder for response models
+    for model in models:
+        jsonable_encoder(model)
+        model.model_dump_json()
+
+    app.openapi()
+    generate_latest()
+
+    return {
+        "duration": time.perf_counter() - started,
+        "routes": statuses,
+    }
@@ -0,0 +1,279 @@
+"""
+Outbound Webhooks
+Push chaos and health events to webhook receivers (n8n) as they happen
+
+Events are queued without blocking the caller and delivered by one
+background task over a pooled httpx.AsyncClient, so a burst of events costs
+one keep-alive request per receiver instead of one connection per event.
+After the first event of a burst the dispatcher lingers `flush_interval`
+seconds to collect the rest, then posts them in batches of at most
+`batch_size`:
+
+    {"source": "microservice-demo", "sent_at": "...", "events": [{...}, ...]}
+
+The queue is bounded; when it is full new events are dropped and counted
+rather than holding memory or slowing down requests. Failed requests
+(connection errors, 429 and 5xx) are retried with exponentially growing,
+fully jittered delays, honouring Retry-After. Each receiver has a circuit
+breaker: after `breaker_failures` consecutive failures it is skipped for
+`breaker_reset` seconds, then one trial batch decides whether it closes
+again. Batches that cannot be delivered are dropped and counted; events
+are best-effort notifications, Prometheus alerts remain the fallback.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            return True
+        return self.state == CLOSED
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+
+class WebhookTarget:
+    """One receiver URL with its breaker"""
+
+    def __init__(self, url: str, breaker: CircuitBreaker):
+        self.url = url
+        # Metrics label: the path of a webhook URL is often its secret
+        self.name = urlsplit(url).netloc or url
+        self.breaker = breaker
+
+
+class WebhookDispatcher:
+    """Batches events and delivers them to every configured receiver"""
+
+    def __init__(self, urls: Iterable[str], batch_size: int = 50, flush_interval: float = 0.2,
+                 queue_size: int = 1000, timeout: float = 5.0, max_retries: int = 3,
+                 retry_base: float = 0.1, retry_max: float = 5.0, breaker_failures: int = 5,
+                 breaker_reset: float = 30.0, max_connections: int = 10, source: str = "microservice-demo",
+                 transport: Optional[httpx.AsyncBaseTransport] = None, latency_histogram=None,
+                 requests_counter=None, dropped_counter=None, queue_gauge=None, circuit_gauge=None):
+        self.targets = [WebhookTarget(url, CircuitBreaker(breaker_failures, breaker_reset)) for url in urls]
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_connections = max_connections
+        self.source = source
+        self.transport = transport
+        self.latency_histogram = latency_histogram
+        self.requests_counter = requests_counter
+        self.dropped_counter = dropped_counter
+        self.queue_gauge = queue_gauge
+        self.circuit_gauge = circuit_gauge
+        # (enqueued at, event)
+        self._queue: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sending = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.targets)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        """Open the connection pool and start delivering (inside the event loop)"""
+        if not self.enabled or self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            transport=self.transport,
+        )
+        self._task = asyncio.create_task(self._run())
+        if self._queue:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = 5.0):
+        """Deliver what is queued (up to `timeout` seconds) and close the pool"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self._client.aclose()
+        self._task = self._client = self._loop = self._wakeup = None
+
+    def emit(self, kind: str, **fields: Any) -> bool:
+        """
+        Queue an event; never blocks. Returns False when it was dropped.
+
+        Safe to call from other threads (chaos worker threads).
+        """
+        if not self.running:
+            return False
+        if len(self._queue) >= self.queue_size:
+            if self.dropped_counter is not None:
+                self.dropped_counter.labels(reason="queue_full").inc()
+            return False
+        event = {"kind": kind, "timestamp": datetime.now().isoformat(), **fields}
+        self._queue.append((time.perf_counter(), event))
+        self._set_queue_gauge()
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._wakeup.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # Loop closed under us (shutdown); the event stays queued
+                pass
+        return True
+
+    async def flush(self):
+        """Wait until every queued event has been delivered or dropped"""
+        while self.running and (self._queue or self._sending):
+            self._wakeup.set()
+            await asyncio.sleep(0.01)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue and breaker state for diagnostics"""
+        return {
+            "queued": len(self._queue),
+            "targets": {t.name: t.breaker.state for t in self.targets},
+        }
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._queue:
+                continue
+            self._sending = True
+            try:
+                if len(self._queue) < self.batch_size:
+                    # Linger so that events emitted together share a request
+                    await asyncio.sleep(self.flush_interval)
+                while self._queue:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    self._set_queue_gauge()
+                    await self._deliver_all(batch)
+            finally:
+                self._sending = False
+
+    async def _deliver_all(self, batch: List[Tuple[float, Dict[str, Any]]]):
+        body = json.dumps({
+            "source": self.source,
+            "sent_at": datetime.now().isoformat(),
+            "events": [event for _, event in batch],
+        }).encode("utf-8")
+        await asyncio.gather(*(self._deliver(target, body, batch) for target in self.targets))
+
+    async def _deliver(self, target: WebhookTarget, body: bytes, batch: List[Tuple[float, Dict[str, Any]]]):
+        for attempt in range(self.max_retries + 1):
+            if not target.breaker.allow():
+                self._count_request(target, "circuit_open")
+                self._drop(batch, "circuit_open")
+                break
+            retry_after = None
+            try:
+                response = await self._client.post(
+                    target.url, content=body, headers={"content-type": "application/json"})
+                status = response.status_code
+                result = f"{status // 100}xx"
+                retryable = status == 429 or status >= 500
+                retry_after = response.headers.get("retry-after")
+            except httpx.HTTPError:
+                status, result, retryable = 0, "error", True
+            self._count_request(target, result)
+
+            if 200 <= status < 300:
+                target.breaker.record_success()
+                self._observe(target, batch)
+                break
+            target.breaker.record_failure()
+            if not retryable or attempt == self.max_retries:
+                self._drop(batch, "failed")
+                break
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+        self._set_circuit_gauge(target)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff; Retry-After (seconds) overrides it"""
+        if retry_after is not None:
+            try:
+                return min(self.retry_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0.0, min(self.retry_max, self.retry_base * (2 ** attempt)))
+
+    def _observe(self, target: WebhookTarget, batch: List[Tuple[float, Dict[str, Any]]]):
+        if self.latency_histogram is not None:
+            now = time.perf_counter()
+            child = self.latency_histogram.labels(target=target.name)
+            for enqueued, _ in batch:
+                child.observe(now - enqueued)
+
+    def _drop(self, batch, reason: str):
+        if self.dropped_counter is not None:
+            self.dropped_counter.labels(reason=reason).inc(len(batch))
+
+    def _count_request(self, target: WebhookTarget, result: str):
+        if self.requests_counter is not None:
+            self.requests_counter.labels(target=target.name, result=result).inc()
+
+    def _set_queue_gauge(self):
+        if self.queue_gauge is not None:
+            self.queue_gauge.set(len(self._queue))
+
+    def _set_circuit_gauge(self, target: WebhookTarget):
+        if self.circuit_gauge is not None:
+            self.circuit_gauge.labels(target=target.name).set(0 if target.breaker.state == CLOSED else 1)
@@ -135,10 +135,17 @@ monitor_metrics() {
     log_info "Waiting for monitoring system to detect the issue..."
     sleep 10
     
+    # Request rate, error ratio and latency over the last 30 seconds, straight from the service
+    curl -s "$MICROSERVICE_URL/admin/metrics/history?window=30&step=30" \
+        | jq '.summary | {request_rate, error_ratio, latency_p95_ms, inflight_max}' 2>/dev/null \
+        || echo "Could not read metrics history"
+    
     # Check Prometheus metrics (if available)
     if check_service "$PROMETHEUS_URL" "Prometheus" > /dev/null 2>&1; then
         log_info "Prometheus is available - checking for alerts"
-        # You could add actual Prometheus query here
+        curl -s "$PROMETHEUS_URL/api/v1/alerts" \
+            | jq -r '.data.alerts[] | select(.labels.alertname | startswith("Chaos")) | "\(.labels.alertname): \(.state)"' 2>/dev/null \
+            || echo "Could not read Prometheus alerts"
     fi
 }
 
@@ -342,6 +349,9 @@ show_help() {
     echo "  slow_responses  - Add artificial delays"
     echo "  error_injection - Inject random 500 errors"
     echo "  cpu_spike       - Create CPU intensive load"
+    echo "  loop_block      - Block the event loop thread periodically"
+    echo "  io_pressure     - Write, read and fsync scratch files"
+    echo "  response_stream - Throttle, truncate or reset response bodies"
     echo "  random          - Randomly select scenario (default)"
     echo ""
     echo "Example:"